@@ -1,4 +1,5 @@
-from collections.abc import Generator
+import asyncio
+from collections.abc import Callable, Generator
 from pathlib import Path
 from ssl import SSLContext
 from typing import Any
@@ -26,6 +27,8 @@ from custom_components.supernotify import (
     CONF_PERSON,
 )
 from custom_components.supernotify.configuration import Context
+from custom_components.supernotify.media_cache import MediaCache
+from custom_components.supernotify.routing import DeliveryRouter
 from custom_components.supernotify.snoozer import Snoozer
 
 
@@ -49,14 +52,27 @@ class MockAction(BaseNotificationService):
         self.calls.append((message, title, target, kwargs))
 
 
+def run_executor_job(target: Callable[..., Any], *args: Any) -> "asyncio.Future[Any]":
+    """Run the job immediately, returning a future as HomeAssistant.async_add_executor_job does"""
+    future: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+    try:
+        future.set_result(target(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
 @pytest.fixture
 def mock_hass() -> HomeAssistant:
     hass = Mock(spec=MockableHomeAssistant)
     hass.states = Mock(StateMachine)
+    # unknown entities, rather than mock states that leak into serialised notifications
+    hass.states.get.return_value = None
     hass.services = Mock(ServiceRegistry)
     hass.config.internal_url = "http://127.0.0.1:28123"
     hass.config.external_url = "https://my.home"
     hass.data = {}
+    hass.async_add_executor_job = Mock(side_effect=run_executor_job)
     hass.data["device_registry"] = Mock(spec=DeviceRegistry)
     hass.data["entity_registry"] = Mock(spec=EntityRegistry)
     hass.data["issue_registry"] = Mock(spec=IssueRegistry)
@@ -74,11 +90,17 @@ def mock_context(mock_hass: HomeAssistant) -> Context:
     context.cameras = {}
     context.snoozer = Snoozer()
     context.delivery_by_scenario = {}
+    context.concurrent_delivery = False
+    context.compiled_conditions = {}
+    context.delivery_router = DeliveryRouter(context)
     context.mobile_actions = {}
     context.content_scenario_templates = {}
     context.hass_internal_url = "http://hass-dev"
     context.hass_external_url = "http://hass-dev.nabu.casa"
     context.media_path = Path("/nosuchpath")
+    context.media_housekeeper = None
+    context.media_cache = MediaCache()
+    context.media_options = {}
     context.template_path = Path("/templates_here")
     context.people = {
         "person.new_home_owner": {CONF_PERSON: "person.new_home_owner"},
@@ -1,6 +1,6 @@
 """The SuperNotification integration"""
 
-from dataclasses import dataclass, field
+from dataclasses import asdict, dataclass, field
 from enum import StrEnum
 from typing import Any
 
@@ -41,6 +41,17 @@ CONF_URI = "uri"
 CONF_RECIPIENTS = "recipients"
 CONF_TEMPLATE_PATH = "template_path"
 CONF_MEDIA_PATH = "media_path"
+CONF_MEDIA_OPTIONS = "media_options"
+CONF_MEDIA_MAX_AGE_DAYS = "max_age_days"
+CONF_MEDIA_MAX_SIZE_MB = "max_size_mb"
+CONF_MEDIA_HOUSEKEEPING_INTERVAL = "housekeeping_interval"
+CONF_MEDIA_HOUSEKEEPING_BUDGET = "housekeeping_budget"
+CONF_MEDIA_CACHE_TTL = "cache_ttl"
+CONF_MEDIA_MAX_SNAPSHOT_MB = "max_snapshot_mb"
+CONF_CONNECT_TIMEOUT = "connect_timeout"
+CONF_READ_TIMEOUT = "read_timeout"
+CONF_TOTAL_TIMEOUT = "total_timeout"
+CONF_MEDIA_MAX_CAMERA_CAPTURES = "max_camera_captures"
 CONF_HOUSEKEEPING = "housekeeping"
 CONF_HOUSEKEEPING_TIME = "housekeeping_time"
 CONF_ARCHIVE_PATH = "archive_path"
@@ -49,6 +60,38 @@ CONF_ARCHIVE_DAYS = "archive_days"
 CONF_ARCHIVE_MQTT_TOPIC = "archive_mqtt_topic"
 CONF_ARCHIVE_MQTT_QOS = "archive_mqtt_qos"
 CONF_ARCHIVE_MQTT_RETAIN = "archive_mqtt_retain"
+CONF_ARCHIVE_MQTT_BATCH = "archive_mqtt_batch"
+CONF_ARCHIVE_MQTT_COMPRESS = "archive_mqtt_compress"
+CONF_ARCHIVE_MQTT_WINDOW = "archive_mqtt_window"
+CONF_ARCHIVE_MQTT_PAYLOAD = "archive_mqtt_payload"
+CONF_ARCHIVE_BACKGROUND = "archive_background"
+CONF_ARCHIVE_FLUSH_INTERVAL = "archive_flush_interval"
+CONF_ARCHIVE_QUEUE_SIZE = "archive_queue_size"
+CONF_ARCHIVE_FORMAT = "archive_format"
+CONF_ARCHIVE_SEGMENT = "archive_segment"
+CONF_ARCHIVE_COMPRESS = "archive_compress"
+CONF_ARCHIVE_INDEX = "archive_index"
+CONF_ARCHIVE_EVENT = "archive_event"
+CONF_ARCHIVE_PROFILE = "archive_profile"
+CONF_ARCHIVE_MAX_BYTES = "archive_max_bytes"
+CONF_ARCHIVE_SAMPLING = "archive_sampling"
+CONF_SAMPLE_EVERY = "every"
+CONF_SAMPLE_PER_MINUTE = "per_minute"
+ARCHIVE_FORMAT_FILES = "files"
+ARCHIVE_FORMAT_SEGMENTS = "segments"
+ARCHIVE_SEGMENT_HOURLY = "hourly"
+ARCHIVE_SEGMENT_DAILY = "daily"
+ARCHIVE_PROFILE_SUMMARY = "summary"
+ARCHIVE_PROFILE_STANDARD = "standard"
+ARCHIVE_PROFILE_FORENSIC = "forensic"
+ARCHIVE_PROFILES = [ARCHIVE_PROFILE_SUMMARY, ARCHIVE_PROFILE_STANDARD, ARCHIVE_PROFILE_FORENSIC]
+# minimal notification contents as published before archive profiles, or the archived record itself
+ARCHIVE_MQTT_PAYLOAD_MINIMAL = "minimal"
+ARCHIVE_MQTT_PAYLOAD_ARCHIVE = "archive"
+OUTCOME_DELIVERED = "delivered"
+OUTCOME_ERRORED = "errored"
+OUTCOME_SKIPPED = "skipped"
+OUTCOME_UNDELIVERED = "undelivered"
 CONF_TEMPLATE = "template"
 CONF_LINKS = "links"
 CONF_PERSON = "person"
@@ -56,6 +99,8 @@ CONF_METHOD = "method"
 CONF_METHODS = "methods"
 CONF_DELIVERY = "delivery"
 CONF_SELECTION = "selection"
+CONF_CONCURRENT_DELIVERY = "concurrent_delivery"
+CONF_RECENT_SIZE = "recent_size"
 
 CONF_DATA: str = "data"
 CONF_OPTIONS: str = "options"
@@ -75,6 +120,7 @@ CONF_DEVICE_DOMAIN: str = "device_domain"
 CONF_MODEL: str = "model"
 CONF_MESSAGE: str = "message"
 CONF_TARGETS_REQUIRED: str = "targets_required"
+CONF_CONCURRENCY: str = "concurrency"
 CONF_MOBILE_DEVICES: str = "mobile_devices"
 CONF_MOBILE_DISCOVERY: str = "mobile_discovery"
 CONF_ACTION_TEMPLATE: str = "action_template"
@@ -88,6 +134,7 @@ CONF_SNAPSHOT_URL: str = "snapshot_url"
 CONF_PTZ_DELAY: str = "ptz_delay"
 CONF_PTZ_METHOD: str = "ptz_method"
 CONF_PTZ_PRESET_DEFAULT: str = "ptz_default_preset"
+CONF_PTZ_RETURN_DELAY: str = "ptz_return_delay"
 CONF_ALT_CAMERA: str = "alt_camera"
 CONF_CAMERAS: str = "cameras"
 CONF_DEFAULT_ACTION: str = "default_action"
@@ -119,6 +166,7 @@ ATTR_MEDIA_CAMERA_ENTITY_ID = "camera_entity_id"
 ATTR_MEDIA_CAMERA_DELAY = "camera_delay"
 ATTR_MEDIA_CAMERA_PTZ_PRESET = "camera_ptz_preset"
 ATTR_MEDIA_CLIP_URL = "clip_url"
+ATTR_MEDIA_FRESH = "fresh"
 ATTR_ACTION_GROUPS = "action_groups"
 CONF_ACTION_GROUP_NAMES = "action_groups"
 ATTR_ACTION_CATEGORY = "action_category"
@@ -126,6 +174,12 @@ ATTR_ACTION_URL = "action_url"
 ATTR_ACTION_URL_TITLE = "action_url_title"
 ATTR_MESSAGE_HTML = "message_html"
 ATTR_JPEG_OPTS = "jpeg_opts"
+CONF_MAX_WIDTH = "max_width"
+CONF_MAX_HEIGHT = "max_height"
+CONF_FORMAT = "format"
+CONF_QUALITY = "quality"
+MEDIA_PROFILE_FORMATS = ["JPEG", "PNG", "WEBP"]
+OPTION_MEDIA_PROFILE = "media_profile"
 ATTR_TIMESTAMP = "timestamp"
 ATTR_DEBUG = "debug"
 ATTR_ACTIONS = "actions"
@@ -199,6 +253,18 @@ CONF_SIZE = "size"
 ATTR_DUPE_POLICY_MTSLP = "dupe_policy_message_title_same_or_lower_priority"
 ATTR_DUPE_POLICY_NONE = "dupe_policy_none"
 
+CONF_QUEUE = "queue"
+CONF_WORKERS = "workers"
+CONF_OVERFLOW = "overflow"
+CONF_DRAIN_TIMEOUT = "drain_timeout"
+OVERFLOW_BLOCK = "block"
+OVERFLOW_DROP_NEWEST = "drop_newest"
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_VALUES = [OVERFLOW_BLOCK, OVERFLOW_DROP_NEWEST, OVERFLOW_DROP_OLDEST]
+
+CONF_PERSISTENCE = "persistence"
+CONF_SAVE_DELAY = "save_delay"
+
 DATA_SCHEMA = vol.Schema({vol.NotIn(RESERVED_DATA_KEYS): vol.Any(str, int, bool, float, dict, list)})
 MOBILE_DEVICE_SCHEMA = vol.Schema({
     vol.Optional(CONF_MANUFACTURER): cv.string,
@@ -223,10 +289,17 @@ LINK_SCHEMA = vol.Schema({
     vol.Required(CONF_DESCRIPTION): cv.string,
     vol.Optional(CONF_NAME): cv.string,
 })
+MEDIA_PROFILE_SCHEMA = vol.Schema({
+    vol.Optional(CONF_MAX_WIDTH): cv.positive_int,
+    vol.Optional(CONF_MAX_HEIGHT): cv.positive_int,
+    vol.Optional(CONF_FORMAT): vol.All(vol.Upper, vol.In(MEDIA_PROFILE_FORMATS)),
+    vol.Optional(CONF_QUALITY): vol.All(vol.Coerce(int), vol.Range(min=1, max=100)),
+})
+DELIVERY_OPTIONS_SCHEMA = vol.Schema({vol.Optional(OPTION_MEDIA_PROFILE): MEDIA_PROFILE_SCHEMA}, extra=vol.ALLOW_EXTRA)
 DELIVERY_CONFIG_SCHEMA = vol.Schema({
     vol.Optional(CONF_TARGET): vol.All(cv.ensure_list, [cv.string]),
     vol.Optional(CONF_ACTION): cv.service,  # previously 'service:'
-    vol.Optional(CONF_OPTIONS, default=dict): dict,
+    vol.Optional(CONF_OPTIONS, default=dict): DELIVERY_OPTIONS_SCHEMA,
     vol.Optional(CONF_DATA): DATA_SCHEMA,
     vol.Optional(CONF_SELECTION, default=[SELECTION_DEFAULT]): vol.All(cv.ensure_list, [vol.In(SELECTION_VALUES)]),
     vol.Optional(CONF_PRIORITY, default=PRIORITY_VALUES): vol.All(cv.ensure_list, [vol.In(PRIORITY_VALUES)]),
@@ -235,6 +308,7 @@ METHOD_SCHEMA = vol.Schema({
     vol.Optional(CONF_TARGETS_REQUIRED): cv.boolean,
     vol.Optional(CONF_DEVICE_DOMAIN): vol.All(cv.ensure_list, [cv.string]),
     vol.Optional(CONF_DEVICE_DISCOVERY): cv.boolean,
+    vol.Optional(CONF_CONCURRENCY): vol.All(vol.Coerce(int), vol.Range(min=1)),
     vol.Optional(CONF_DEFAULT): DELIVERY_CONFIG_SCHEMA,
 })
 RECIPIENT_SCHEMA = vol.Schema({
@@ -255,7 +329,11 @@ CAMERA_SCHEMA = vol.Schema({
     vol.Optional(CONF_DEVICE_TRACKER): cv.entity_id,
     vol.Optional(CONF_PTZ_PRESET_DEFAULT, default=1): vol.Any(cv.positive_int, cv.string),
     vol.Optional(CONF_PTZ_DELAY, default=0): int,
+    vol.Optional(CONF_PTZ_RETURN_DELAY, default=10): vol.All(vol.Coerce(float), vol.Range(min=0)),
     vol.Optional(CONF_PTZ_METHOD, default=PTZ_METHOD_ONVIF): vol.In(PTZ_METHOD_VALUES),
+    vol.Optional(CONF_CONNECT_TIMEOUT): cv.positive_float,
+    vol.Optional(CONF_READ_TIMEOUT): cv.positive_float,
+    vol.Optional(CONF_TOTAL_TIMEOUT): cv.positive_float,
 })
 MEDIA_SCHEMA = vol.Schema({
     vol.Optional(ATTR_MEDIA_CAMERA_ENTITY_ID): cv.entity_id,
@@ -265,6 +343,7 @@ MEDIA_SCHEMA = vol.Schema({
     vol.Optional(ATTR_MEDIA_CLIP_URL): vol.Any(cv.url, cv.string),
     vol.Optional(ATTR_MEDIA_SNAPSHOT_URL): vol.Any(cv.url, cv.string),
     vol.Optional(ATTR_JPEG_OPTS): dict,
+    vol.Optional(ATTR_MEDIA_FRESH, default=False): cv.boolean,
 })
 
 DELIVERY_SCHEMA = DELIVERY_CONFIG_SCHEMA.extend({
@@ -308,6 +387,11 @@ ACTION_SCHEMA = vol.Schema(
 )
 
 
+SAMPLING_SCHEMA = vol.Schema({
+    vol.Optional(CONF_SAMPLE_EVERY, default=1): vol.All(vol.Coerce(int), vol.Range(min=1)),
+    vol.Optional(CONF_SAMPLE_PER_MINUTE): cv.positive_int,
+})
+ARCHIVE_SAMPLING_SCHEMA = vol.Schema({vol.Optional(priority): SAMPLING_SCHEMA for priority in PRIORITY_VALUES})
 ARCHIVE_SCHEMA = vol.Schema({
     vol.Optional(CONF_ARCHIVE_PATH): cv.path,
     vol.Optional(CONF_ENABLED, default=False): cv.boolean,
@@ -315,17 +399,66 @@ ARCHIVE_SCHEMA = vol.Schema({
     vol.Optional(CONF_ARCHIVE_MQTT_TOPIC): cv.string,
     vol.Optional(CONF_ARCHIVE_MQTT_QOS, default=0): cv.positive_int,
     vol.Optional(CONF_ARCHIVE_MQTT_RETAIN, default=True): cv.boolean,
+    vol.Optional(CONF_ARCHIVE_MQTT_BATCH, default=False): cv.boolean,
+    vol.Optional(CONF_ARCHIVE_MQTT_COMPRESS, default=False): cv.boolean,
+    vol.Optional(CONF_ARCHIVE_MQTT_WINDOW, default=1): cv.positive_float,
+    vol.Optional(CONF_ARCHIVE_MQTT_PAYLOAD, default=ARCHIVE_MQTT_PAYLOAD_MINIMAL): vol.In([
+        ARCHIVE_MQTT_PAYLOAD_MINIMAL,
+        ARCHIVE_MQTT_PAYLOAD_ARCHIVE,
+    ]),
+    vol.Optional(CONF_ARCHIVE_BACKGROUND, default=True): cv.boolean,
+    vol.Optional(CONF_ARCHIVE_FLUSH_INTERVAL, default=1): cv.positive_float,
+    vol.Optional(CONF_ARCHIVE_QUEUE_SIZE, default=500): cv.positive_int,
+    vol.Optional(CONF_ARCHIVE_FORMAT, default=ARCHIVE_FORMAT_FILES): vol.In([ARCHIVE_FORMAT_FILES, ARCHIVE_FORMAT_SEGMENTS]),
+    vol.Optional(CONF_ARCHIVE_SEGMENT, default=ARCHIVE_SEGMENT_DAILY): vol.In([ARCHIVE_SEGMENT_HOURLY, ARCHIVE_SEGMENT_DAILY]),
+    vol.Optional(CONF_ARCHIVE_COMPRESS, default=False): cv.boolean,
+    vol.Optional(CONF_ARCHIVE_INDEX, default=False): cv.boolean,
+    vol.Optional(CONF_ARCHIVE_EVENT, default=False): cv.boolean,
+    vol.Optional(CONF_ARCHIVE_PROFILE, default=ARCHIVE_PROFILE_STANDARD): vol.In(ARCHIVE_PROFILES),
+    vol.Optional(CONF_ARCHIVE_MAX_BYTES, default=65536): cv.positive_int,
+    vol.Optional(CONF_ARCHIVE_SAMPLING, default={}): ARCHIVE_SAMPLING_SCHEMA,
 })
 
 HOUSEKEEPING_SCHEMA = vol.Schema({
     vol.Optional(CONF_HOUSEKEEPING_TIME, default="00:00:01"): cv.time,
 })
 
+QUEUE_SCHEMA = vol.Schema({
+    vol.Optional(CONF_ENABLED, default=False): cv.boolean,
+    vol.Optional(CONF_SIZE, default=100): cv.positive_int,
+    vol.Optional(CONF_WORKERS, default=1): vol.All(vol.Coerce(int), vol.Range(min=1)),
+    vol.Optional(CONF_OVERFLOW, default=OVERFLOW_BLOCK): vol.In(OVERFLOW_VALUES),
+    vol.Optional(CONF_DRAIN_TIMEOUT, default=10): cv.positive_float,
+})
+
+MEDIA_OPTIONS_SCHEMA = vol.Schema({
+    vol.Optional(CONF_MEDIA_MAX_AGE_DAYS, default=30): cv.positive_int,
+    vol.Optional(CONF_MEDIA_MAX_SIZE_MB): cv.positive_int,
+    vol.Optional(CONF_MEDIA_HOUSEKEEPING_INTERVAL, default=300): cv.positive_int,
+    vol.Optional(CONF_MEDIA_HOUSEKEEPING_BUDGET, default=0.25): cv.positive_float,
+    vol.Optional(CONF_MEDIA_CACHE_TTL, default=10): vol.All(vol.Coerce(float), vol.Range(min=0)),
+    vol.Optional(CONF_MEDIA_MAX_CAMERA_CAPTURES, default=2): vol.All(vol.Coerce(int), vol.Range(min=1)),
+    vol.Optional(CONF_MEDIA_MAX_SNAPSHOT_MB, default=10): cv.positive_float,
+    vol.Optional(CONF_CONNECT_TIMEOUT, default=5): cv.positive_float,
+    vol.Optional(CONF_READ_TIMEOUT, default=10): cv.positive_float,
+    vol.Optional(CONF_TOTAL_TIMEOUT, default=30): cv.positive_float,
+})
+
+PERSISTENCE_SCHEMA = vol.Schema({
+    vol.Optional(CONF_ENABLED, default=True): cv.boolean,
+    vol.Optional(CONF_SAVE_DELAY, default=10): cv.positive_float,
+})
+
 PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend({
     vol.Optional(CONF_TEMPLATE_PATH, default=TEMPLATE_DIR): cv.path,
     vol.Optional(CONF_MEDIA_PATH, default=MEDIA_DIR): cv.path,
+    vol.Optional(CONF_MEDIA_OPTIONS, default={}): MEDIA_OPTIONS_SCHEMA,
     vol.Optional(CONF_ARCHIVE, default={CONF_ENABLED: False}): ARCHIVE_SCHEMA,
     vol.Optional(CONF_HOUSEKEEPING, default={}): HOUSEKEEPING_SCHEMA,
+    vol.Optional(CONF_CONCURRENT_DELIVERY, default=False): cv.boolean,
+    vol.Optional(CONF_RECENT_SIZE, default=50): vol.All(vol.Coerce(int), vol.Range(min=1)),
+    vol.Optional(CONF_QUEUE, default={CONF_ENABLED: False}): QUEUE_SCHEMA,
+    vol.Optional(CONF_PERSISTENCE, default={CONF_ENABLED: True}): PERSISTENCE_SCHEMA,
     vol.Optional(CONF_DUPE_CHECK, default=dict): NOTIFICATION_DUPE_SCHEMA,
     vol.Optional(CONF_DELIVERY, default=dict): {cv.string: DELIVERY_SCHEMA},
     vol.Optional(CONF_ACTION_GROUPS, default=dict): {cv.string: [ACTION_SCHEMA]},
@@ -443,6 +576,16 @@ class ConditionVariables:
         self.notification_priority = delivery_priority or PRIORITY_MEDIUM
         self.notification_message = message or ""
         self.notification_title = title or ""
+        self._variables: dict[str, Any] | None = None
+
+    def variables(self) -> dict[str, Any]:
+        """Build mapping for condition evaluation once, shared by all delivery conditions
+
+        Only for use once variables are complete, since later changes aren't reflected
+        """
+        if self._variables is None:
+            self._variables = asdict(self)
+        return self._variables
 
     def as_dict(self) -> dict[str, Any]:
         return {
@@ -1,24 +1,59 @@
 import datetime as dt
+import gzip
+import json
 import logging
+import os
+import shutil
+import threading
+import time
 from abc import abstractmethod
+from dataclasses import dataclass
+from functools import partial
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 import aiofiles.os
 import anyio
 import homeassistant.util.dt as dt_util
-from homeassistant.components import mqtt
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.json import save_json
+import orjson
+from homeassistant.helpers.json import json_encoder_default
+
+from . import (
+    ARCHIVE_FORMAT_FILES,
+    ARCHIVE_FORMAT_SEGMENTS,
+    ARCHIVE_PROFILE_FORENSIC,
+    ARCHIVE_PROFILE_STANDARD,
+    ARCHIVE_PROFILE_SUMMARY,
+    ARCHIVE_SEGMENT_DAILY,
+    ARCHIVE_SEGMENT_HOURLY,
+    CONF_SAMPLE_EVERY,
+    CONF_SAMPLE_PER_MINUTE,
+)
+from .archive_index import ARCHIVE_INDEX_FILE, ArchiveIndex
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
 
 _LOGGER = logging.getLogger(__name__)
 
 ARCHIVE_PURGE_MIN_INTERVAL = 3 * 60
 ARCHIVE_DEFAULT_DAYS = 1
 WRITE_TEST = ".startup"
+SEGMENT_PREFIX = "supernotify_"
+SEGMENT_SUFFIX = ".jsonl"
+SEGMENT_COMPRESSED_SUFFIX = ".jsonl.gz"
+# record counts of closed segments, which never change, so a restart only reads the open segment
+SEGMENT_COUNTS_FILE = ".segment_counts.json"
+SEGMENT_KEY_FORMATS = {ARCHIVE_SEGMENT_HOURLY: "%Y%m%d%H", ARCHIVE_SEGMENT_DAILY: "%Y%m%d"}
+# never truncated, so a record over budget can still be found and indexed
+ARCHIVE_PRESERVED_FIELDS = ("id", "created", "priority")
+ARCHIVE_TRUNCATED = "_truncated"
+SEGMENT_PERIODS = {ARCHIVE_SEGMENT_HOURLY: dt.timedelta(hours=1), ARCHIVE_SEGMENT_DAILY: dt.timedelta(days=1)}
 
 
 class ArchivableObject:
+    priority: str | None = None
+
     @abstractmethod
     def base_filename(self) -> str:
         pass
@@ -26,25 +61,330 @@ class ArchivableObject:
     def contents(self, minimal: bool = False) -> Any:
         pass
 
+    def projection(self, profile: str) -> Any:
+        """Contents selected for an archive profile"""
+        return self.contents(minimal=profile == ARCHIVE_PROFILE_SUMMARY)
+
+    @property
+    def forensic(self) -> bool:
+        """Archive everything regardless of profile or budget, e.g. after a failure"""
+        return False
+
+    def summary(self) -> dict[str, Any] | None:
+        """Fields for the archive index, if indexable"""
+        return None
+
+
+@dataclass(frozen=True)
+class ArchiveRecord:
+    """Notification serialised once, shared by every archive sink"""
+
+    name: str
+    payload: bytes
+    summary: dict[str, Any] | None
+    submitted: float
+    # minimal contents, only encoded when a sink publishes them
+    minimal: bytes | None = None
+
+
+def fit_budget(contents: Any, max_bytes: int | None) -> bytes:
+    """Encode compactly, replacing the largest fields with truncation markers until within budget"""
+    payload = encode_json(contents, compact=True)
+    if not max_bytes or len(payload) <= max_bytes or not isinstance(contents, dict):
+        return payload
+    # less the line terminator
+    sizes = {k: len(encode_json(v, compact=True)) - 1 for k, v in contents.items() if k not in ARCHIVE_PRESERVED_FIELDS}
+    truncated = dict(contents)
+    markers: dict[str, int] = {}
+    for key, size in sorted(sizes.items(), key=lambda kv: kv[1], reverse=True):
+        truncated[key] = f"<truncated {size} bytes>"
+        markers[key] = size
+        truncated[ARCHIVE_TRUNCATED] = markers
+        payload = encode_json(truncated, compact=True)
+        if len(payload) <= max_bytes:
+            break
+    _LOGGER.debug("SUPERNOTIFY Archive record truncated to %s bytes, dropping %s", len(payload), list(markers))
+    return payload
+
+
+def serialise(
+    archive_object: ArchivableObject,
+    profile: str = ARCHIVE_PROFILE_FORENSIC,
+    max_bytes: int | None = None,
+    minimal: bool = False,
+) -> ArchiveRecord | None:
+    """Encode contents for profile, falling back to minimal contents if they can't be encoded"""
+    if archive_object.forensic:
+        profile = ARCHIVE_PROFILE_FORENSIC
+        max_bytes = None
+    minimal_payload: bytes | None = None
+    try:
+        payload = fit_budget(archive_object.projection(profile), max_bytes)
+    except Exception as e:
+        _LOGGER.warning("SUPERNOTIFY Unable to archive notification: %s", e)
+        try:
+            payload = minimal_payload = encode_json(archive_object.contents(minimal=True), compact=True)
+        except Exception as e2:
+            _LOGGER.warning("SUPERNOTIFY Unable to archive minimal notification: %s", e2)
+            return None
+    if minimal and minimal_payload is None:
+        try:
+            minimal_payload = encode_json(archive_object.contents(minimal=True), compact=True)
+        except Exception as e:
+            _LOGGER.warning("SUPERNOTIFY Unable to encode minimal notification, using archived: %s", e)
+    return ArchiveRecord(
+        name=archive_object.base_filename(),
+        payload=payload,
+        summary=archive_object.summary(),
+        submitted=time.monotonic(),
+        minimal=minimal_payload if minimal else None,
+    )
+
+
+def sync_directory(directory: Path) -> None:
+    """Make new or removed directory entries durable"""
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    except OSError as e:
+        _LOGGER.debug("SUPERNOTIFY Unable to sync archive directory %s: %s", directory, e)
+
+
+class SegmentStore:
+    """Append-only JSON lines segments, each covering an hour or a day
+
+    Retention removes whole segments, and record counts are kept incrementally, so the
+    archive never lists or stats individual notifications. Blocking, so call from a thread
+    """
+
+    def __init__(self, path: Path, period: str = ARCHIVE_SEGMENT_DAILY, compress: bool = False) -> None:
+        self.path = path
+        self.period = period if period in SEGMENT_KEY_FORMATS else ARCHIVE_SEGMENT_DAILY
+        self.compress = compress
+        self.current: str | None = None
+        # records per segment, loaded on first count from the saved counts of closed segments
+        self.counts: dict[str, int] | None = None
+        self._lock = threading.RLock()
+
+    def key_for(self, when: float) -> str:
+        return time.strftime(SEGMENT_KEY_FORMATS[self.period], time.gmtime(when))
 
-class ArchiveTopic:
-    def __init__(self, hass: HomeAssistant, topic: str, qos: int = 0, retain: bool = True) -> None:
-        self._hass = hass
-        self.topic = topic
-        self.qos = qos
-        self.retain = retain
+    def segment_end(self, key: str) -> dt.datetime:
+        start = dt.datetime.strptime(key, SEGMENT_KEY_FORMATS[self.period]).replace(tzinfo=dt.UTC)
+        return start + SEGMENT_PERIODS[self.period]
 
-    async def publish(self, archive_object: ArchivableObject) -> None:
-        payload = archive_object.contents(minimal=True)
-        _LOGGER.debug("SUPERNOTIFY Publishing notification to %s", self.topic)
-        await mqtt.async_publish(self._hass, self.topic, payload, qos=self.qos, retain=self.retain)
+    def segment_files(self) -> dict[str, Path]:
+        """Segment files by key in time order, preferring compressed copy if both present"""
+        found: dict[str, Path] = {}
+        for entry in os.scandir(self.path):
+            if not entry.name.startswith(SEGMENT_PREFIX):
+                continue
+            key, _, suffix = entry.name[len(SEGMENT_PREFIX) :].partition(".")
+            if f".{suffix}" == SEGMENT_COMPRESSED_SUFFIX or (f".{suffix}" == SEGMENT_SUFFIX and key not in found):
+                found[key] = Path(entry.path)
+        return dict(sorted(found.items()))
+
+    def append(self, lines: list[bytes], when: float | None = None) -> None:
+        key = self.key_for(when or time.time())
+        with self._lock:
+            if key != self.current:
+                self._roll(key)
+            segment = self.path / f"{SEGMENT_PREFIX}{key}{SEGMENT_SUFFIX}"
+            created = not segment.exists()
+            with segment.open("ab") as f:
+                f.write(b"".join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+            if created:
+                sync_directory(self.path)
+            if self.counts is not None:
+                self.counts[key] = self.counts.get(key, 0) + len(lines)
+
+    def _roll(self, key: str) -> None:
+        self.current = key
+        if self.counts is not None:
+            self._save_counts()
+        if not self.compress:
+            return
+        for closed_key, segment in self.segment_files().items():
+            if closed_key != key and segment.name.endswith(SEGMENT_SUFFIX):
+                self._compress(segment)
+
+    def _compress(self, segment: Path) -> None:
+        compressed = segment.with_name(segment.name + ".gz")
+        part_path = compressed.with_name(compressed.name + ".part")
+        try:
+            with segment.open("rb") as src, gzip.open(part_path, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            part_path.replace(compressed)
+            segment.unlink()
+            sync_directory(self.path)
+            _LOGGER.debug("SUPERNOTIFY Compressed archive segment %s", compressed)
+        except Exception as e:
+            _LOGGER.warning("SUPERNOTIFY Unable to compress archive segment %s: %s", segment, e)
+
+    @staticmethod
+    def read_lines(segment: Path) -> "Iterator[bytes]":
+        opener = gzip.open if segment.name.endswith(SEGMENT_COMPRESSED_SUFFIX) else open
+        with opener(segment, "rb") as f:
+            for line in f:
+                if line.strip():
+                    yield line
+
+    def _load_counts(self) -> dict[str, int]:
+        try:
+            return {key: int(n) for key, n in orjson.loads((self.path / SEGMENT_COUNTS_FILE).read_bytes()).items()}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            _LOGGER.warning("SUPERNOTIFY Unable to load archive segment counts, recounting: %s", e)
+            return {}
+
+    def _save_counts(self) -> None:
+        if self.counts is None:
+            return
+        open_keys = {self.current, self.key_for(time.time())}
+        closed = {key: n for key, n in self.counts.items() if key not in open_keys}
+        counts_path = self.path / SEGMENT_COUNTS_FILE
+        part_path = counts_path.with_name(counts_path.name + ".part")
+        try:
+            part_path.write_bytes(orjson.dumps(closed))
+            part_path.replace(counts_path)
+        except Exception as e:
+            _LOGGER.warning("SUPERNOTIFY Unable to save archive segment counts: %s", e)
+
+    def _segment_counts(self) -> dict[str, int]:
+        with self._lock:
+            if self.counts is None:
+                saved = self._load_counts()
+                counts: dict[str, int] = {}
+                recounted = False
+                for key, segment in self.segment_files().items():
+                    if key in saved:
+                        counts[key] = saved[key]
+                    else:
+                        counts[key] = sum(1 for _ in self.read_lines(segment))
+                        recounted = True
+                self.counts = counts
+                if recounted:
+                    self._save_counts()
+            return self.counts
+
+    def count(self) -> int:
+        return sum(self._segment_counts().values())
+
+    def purge(self, cutoff: dt.datetime) -> int:
+        """Remove segments wholly older than cutoff, returning number of records removed"""
+        purged = 0
+        with self._lock:
+            counts = self._segment_counts()
+            removed = False
+            for key, segment in self.segment_files().items():
+                if key == self.current or self.segment_end(key) > cutoff:
+                    continue
+                purged += counts.pop(key, 0)
+                _LOGGER.debug("SUPERNOTIFY Purging archive segment %s", segment)
+                segment.unlink()
+                removed = True
+            if removed:
+                self._save_counts()
+                sync_directory(self.path)
+        return purged
+
+    def iter_records(self, since: dt.datetime | None = None) -> "Iterator[dict[str, Any]]":
+        """Yield records in segment order, reading each segment under the lock to avoid half-written appends"""
+        with self._lock:
+            segments = self.segment_files()
+        for key, segment in segments.items():
+            if since is not None and self.segment_end(key) <= since:
+                continue
+            with self._lock:
+                try:
+                    lines = list(self.read_lines(segment))
+                except FileNotFoundError:
+                    continue  # purged since listed
+            for line in lines:
+                try:
+                    yield orjson.loads(line)
+                except orjson.JSONDecodeError as e:
+                    _LOGGER.warning("SUPERNOTIFY Skipping undecodable archive record in %s: %s", segment, e)
+
+
+def encode_json(data: Any, compact: bool = False) -> bytes:
+    """Encode as save_json would, or compact as a single line"""
+    if compact:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS, default=json_encoder_default) + b"\n"
+    return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS, default=json_encoder_default)
+
+
+class ArchiveSampler:
+    """Keep 1 in N and/or at most M a minute of each sampled priority
+
+    Forensic objects, such as errored notifications, and unsampled priorities are always kept
+    """
+
+    def __init__(self, policies: dict[str, dict[str, Any]] | None = None) -> None:
+        self.policies: dict[str, dict[str, Any]] = policies or {}
+        self.seen: dict[str, int] = {}
+        self.sampled_out: dict[str, int] = {}
+        self._minute: dict[str, tuple[int, int]] = {}
+
+    def keep(self, archive_object: ArchivableObject) -> bool:
+        priority = archive_object.priority
+        if priority is None or priority not in self.policies or archive_object.forensic:
+            return True
+        policy = self.policies[priority]
+        seen = self.seen.get(priority, 0)
+        self.seen[priority] = seen + 1
+        keep = seen % policy.get(CONF_SAMPLE_EVERY, 1) == 0
+        per_minute: int | None = policy.get(CONF_SAMPLE_PER_MINUTE)
+        if keep and per_minute is not None:
+            minute = int(time.time() // 60)
+            window, kept = self._minute.get(priority, (minute, 0))
+            if window != minute:
+                kept = 0
+            keep = kept < per_minute
+            self._minute[priority] = (minute, kept + 1 if keep else kept)
+        if not keep:
+            self.sampled_out[priority] = self.sampled_out.get(priority, 0) + 1
+        return keep
+
+    @property
+    def total_sampled_out(self) -> int:
+        return sum(self.sampled_out.values())
+
+    def attributes(self) -> dict[str, Any]:
+        return {"policies": self.policies, "seen": self.seen, "sampled_out": self.sampled_out}
 
 
 class NotificationArchive:
     def __init__(
-        self, enabled: bool, archive_path: str | None, archive_days: str | None, purge_minute_interval: str | None = None
+        self,
+        enabled: bool,
+        archive_path: str | None,
+        archive_days: str | None,
+        purge_minute_interval: str | None = None,
+        archive_format: str = ARCHIVE_FORMAT_FILES,
+        segment_period: str = ARCHIVE_SEGMENT_DAILY,
+        compress: bool = False,
+        indexed: bool = False,
+        profile: str = ARCHIVE_PROFILE_STANDARD,
+        max_bytes: int | None = None,
+        sampling: dict[str, dict[str, Any]] | None = None,
     ) -> None:
         self.enabled = enabled
+        self.sampler = ArchiveSampler(sampling)
+        self.profile = profile
+        self.max_bytes = max_bytes
+        self.indexed = indexed
+        self.index: ArchiveIndex | None = None
+        self.archive_format = archive_format
+        self.segment_period = segment_period
+        self.compress = compress
+        self.segments: SegmentStore | None = None
         self.last_purge: dt.datetime | None = None
         self.configured_archive_path: str | None = archive_path
         self.archive_path: Path | None = None
@@ -75,11 +415,19 @@ class NotificationArchive:
         else:
             _LOGGER.warning("SUPERNOTIFY archive path %s is not a directory or does not exist", verify_archive_path)
             self.enabled = False
+        if self.enabled and self.archive_path and self.archive_format == ARCHIVE_FORMAT_SEGMENTS:
+            self.segments = SegmentStore(self.archive_path, self.segment_period, self.compress)
+        if self.enabled and self.archive_path and self.indexed:
+            index = ArchiveIndex(self.archive_path / ARCHIVE_INDEX_FILE)
+            if index.open():
+                self.index = index
 
     async def size(self) -> int:
+        if self.segments is not None:
+            return await anyio.to_thread.run_sync(self.segments.count)
         path = self.archive_path
         if path and await anyio.Path(path).exists():
-            return sum(1 for p in await aiofiles.os.listdir(path) if p != WRITE_TEST)
+            return sum(1 for p in await aiofiles.os.listdir(path) if p != WRITE_TEST and not p.startswith(ARCHIVE_INDEX_FILE))
         return 0
 
     async def cleanup(self, days: int | None = None, force: bool = False) -> int:
@@ -94,11 +442,18 @@ class NotificationArchive:
         cutoff = dt.datetime.now(dt.UTC) - dt.timedelta(days=self.archive_days)
         cutoff = cutoff.astimezone(dt.UTC)
         purged = 0
-        if self.archive_path and await anyio.Path(self.archive_path).exists():
+        if self.segments is not None:
+            try:
+                purged = await anyio.to_thread.run_sync(self.segments.purge, cutoff)
+            except Exception as e:
+                _LOGGER.warning("SUPERNOTIFY Unable to purge archive segments at %s: %s", self.archive_path, e)
+            _LOGGER.info("SUPERNOTIFY Purged %s archived notifications for cutoff %s", purged, cutoff)
+            self.last_purge = dt.datetime.now(dt.UTC)
+        elif self.archive_path and await anyio.Path(self.archive_path).exists():
             try:
                 archive = await aiofiles.os.scandir(self.archive_path)
                 for entry in archive:
-                    if entry.name == ".startup":
+                    if entry.name == WRITE_TEST or str(entry.name).startswith(ARCHIVE_INDEX_FILE):
                         continue
                     if dt_util.utc_from_timestamp(entry.stat().st_ctime) <= cutoff:
                         _LOGGER.debug("SUPERNOTIFY Purging %s", entry.path)
@@ -110,24 +465,77 @@ class NotificationArchive:
             self.last_purge = dt.datetime.now(dt.UTC)
         else:
             _LOGGER.debug("SUPERNOTIFY Skipping archive purge for unknown path %s", self.archive_path)
+        if self.index is not None:
+            try:
+                await anyio.to_thread.run_sync(self.index.purge, cutoff)
+            except Exception as e:
+                _LOGGER.warning("SUPERNOTIFY Unable to purge archive index: %s", e)
         return purged
 
+    @property
+    def writable(self) -> bool:
+        return self.enabled and self.archive_path is not None
+
+    async def stop(self) -> None:
+        if self.index is not None:
+            self.index.close()
+
+    async def query(self, **filters: Any) -> dict[str, Any]:
+        """Search the archive index, see ArchiveIndex.query for filters"""
+        if self.index is None:
+            return {"error": "No archive index configured"}
+        return await anyio.to_thread.run_sync(partial(self.index.query, **filters))
+
     def archive(self, archive_object: ArchivableObject) -> bool:
-        if not self.enabled or not self.archive_path:
+        """Write and index a single notification, blocking"""
+        if not self.writable or not self.sampler.keep(archive_object):
             return False
-        archive_path: str = ""
-        try:
-            filename = f"{archive_object.base_filename()}.json"
-            archive_path = str(self.archive_path.joinpath(filename))
-            save_json(archive_path, archive_object.contents())
-            _LOGGER.debug("SUPERNOTIFY Archived notification %s", archive_path)
-            return True
-        except Exception as e:
-            _LOGGER.warning("SUPERNOTIFY Unable to archive notification: %s", e)
+        record = self.serialise(archive_object)
+        if record is None or not self.write_batch([record]):
+            return False
+        if self.index is not None and record.summary is not None:
+            self.index.add([record.summary])
+        return True
+
+    def serialise(self, archive_object: ArchivableObject, minimal: bool = False) -> ArchiveRecord | None:
+        return serialise(archive_object, self.profile, self.max_bytes, minimal=minimal)
+
+    def write_batch(self, records: list[ArchiveRecord]) -> int:
+        """Write records as files or appended to a segment, syncing once per batch. Blocking"""
+        if self.archive_path is None:
+            return 0
+        if self.segments is not None:
             try:
-                save_json(archive_path, archive_object.contents(minimal=True))
-                _LOGGER.debug("SUPERNOTIFY Archived minimal notification %s", archive_path)
-                return True
-            except Exception as e2:
-                _LOGGER.warning("SUPERNOTIFY Unable to archive minimal notification: %s", e2)
-        return False
+                self.segments.append([r.payload for r in records])
+                return len(records)
+            except Exception as e:
+                _LOGGER.warning("SUPERNOTIFY Unable to append to archive segment: %s", e)
+                return 0
+        written = 0
+        for record in records:
+            path = self.archive_path / f"{record.name}.json"
+            try:
+                with path.open("wb") as f:
+                    f.write(record.payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+                written += 1
+                _LOGGER.debug("SUPERNOTIFY Archived notification %s", path)
+            except Exception as e:
+                _LOGGER.warning("SUPERNOTIFY Unable to write archive %s: %s", path, e)
+        # one directory sync makes all the new file entries durable
+        if written:
+            sync_directory(self.archive_path)
+        return written
+
+    def iter_records(self, since: dt.datetime | None = None) -> "Iterator[dict[str, Any]]":
+        """Iterate archived notifications, oldest first. Blocking, so call from an executor"""
+        if self.segments is not None:
+            yield from self.segments.iter_records(since)
+        elif self.archive_path is not None:
+            files = [p for p in self.archive_path.glob("*.json") if since is None or p.stat().st_mtime >= since.timestamp()]
+            for path in sorted(files, key=lambda p: p.stat().st_mtime):
+                try:
+                    yield json.loads(path.read_text())
+                except Exception as e:
+                    _LOGGER.debug("SUPERNOTIFY Skipping unreadable archive %s: %s", path, e)
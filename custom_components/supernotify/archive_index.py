@@ -0,0 +1,188 @@
+"""SQLite index of archived notifications, so history can be queried without reading the archive"""
+
+import datetime as dt
+import json
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any
+
+from homeassistant.util.ulid import ulid_at_time
+
+from . import OUTCOME_DELIVERED, OUTCOME_ERRORED, OUTCOME_SKIPPED, OUTCOME_UNDELIVERED
+
+_LOGGER = logging.getLogger(__name__)
+
+ARCHIVE_INDEX_FILE = ".index.sqlite"
+ARCHIVE_INDEX_DEFAULT_LIMIT = 50
+ARCHIVE_INDEX_MAX_LIMIT = 500
+# ULIDs start with 10 characters of millisecond timestamp, so id ranges are time ranges
+ULID_TIME_CHARS = 10
+ULID_MIN_RANDOM = "0" * 16
+ULID_MAX_RANDOM = "Z" * 16
+
+COLUMNS = "n.id, n.created, n.priority, n.delivered, n.errored, n.skipped, n.deliveries, n.scenarios, n.targets"
+OUTCOME_CLAUSES = {
+    OUTCOME_DELIVERED: "n.delivered > 0",
+    OUTCOME_ERRORED: "n.errored > 0",
+    OUTCOME_SKIPPED: "n.skipped > 0",
+    OUTCOME_UNDELIVERED: "n.delivered = 0",
+}
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS notifications (
+        id TEXT PRIMARY KEY,
+        created REAL NOT NULL,
+        priority TEXT,
+        delivered INTEGER NOT NULL DEFAULT 0,
+        errored INTEGER NOT NULL DEFAULT 0,
+        skipped INTEGER NOT NULL DEFAULT 0,
+        deliveries TEXT,
+        scenarios TEXT,
+        targets TEXT
+    ) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS notifications_priority ON notifications (priority, id)",
+    """CREATE TABLE IF NOT EXISTS notification_deliveries (
+        delivery TEXT NOT NULL,
+        id TEXT NOT NULL,
+        PRIMARY KEY (delivery, id)
+    ) WITHOUT ROWID""",
+]
+
+
+def ulid_bound(when: dt.datetime, upper: bool = False) -> str:
+    prefix = ulid_at_time(when.timestamp())[:ULID_TIME_CHARS]
+    return prefix + (ULID_MAX_RANDOM if upper else ULID_MIN_RANDOM)
+
+
+class ArchiveIndex:
+    """Summary row per archived notification, keyed by time sortable notification id
+
+    Blocking, so call from the archive writer thread or an executor
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+
+    def open(self) -> bool:
+        try:
+            db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            for statement in SCHEMA:
+                db.execute(statement)
+            self._db = db
+            return True
+        except sqlite3.Error as e:
+            _LOGGER.warning("SUPERNOTIFY Unable to open archive index at %s: %s", self.path, e)
+            return False
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def add(self, summaries: list[dict[str, Any]]) -> int:
+        """Index a batch of notification summaries in a single transaction"""
+        if self._db is None or not summaries:
+            return 0
+        rows: list[tuple[Any, ...]] = []
+        delivery_rows: list[tuple[str, str]] = []
+        for summary in summaries:
+            created: dt.datetime = summary["created"]
+            rows.append((
+                summary["id"],
+                created.timestamp(),
+                summary.get("priority"),
+                summary.get("delivered", 0),
+                summary.get("errored", 0),
+                summary.get("skipped", 0),
+                json.dumps(summary.get("deliveries", [])),
+                json.dumps(summary.get("scenarios", [])),
+                json.dumps(summary.get("targets", [])),
+            ))
+            delivery_rows.extend((d, summary["id"]) for d in summary.get("deliveries", []))
+        with self._lock:
+            try:
+                self._db.execute("BEGIN")
+                self._db.executemany("INSERT OR REPLACE INTO notifications VALUES (?,?,?,?,?,?,?,?,?)", rows)
+                self._db.executemany("INSERT OR IGNORE INTO notification_deliveries VALUES (?,?)", delivery_rows)
+                self._db.execute("COMMIT")
+            except sqlite3.Error as e:
+                self._db.execute("ROLLBACK")
+                _LOGGER.warning("SUPERNOTIFY Unable to index %s archived notifications: %s", len(rows), e)
+                return 0
+        return len(rows)
+
+    def purge(self, cutoff: dt.datetime) -> int:
+        if self._db is None:
+            return 0
+        bound = ulid_bound(cutoff)
+        with self._lock:
+            self._db.execute("BEGIN")
+            purged = self._db.execute("DELETE FROM notifications WHERE id < ?", (bound,)).rowcount
+            self._db.execute("DELETE FROM notification_deliveries WHERE id < ?", (bound,))
+            self._db.execute("COMMIT")
+        return purged
+
+    def query(
+        self,
+        start: dt.datetime | None = None,
+        end: dt.datetime | None = None,
+        priority: list[str] | None = None,
+        delivery: str | None = None,
+        outcome: str | None = None,
+        before: str | None = None,
+        limit: int = ARCHIVE_INDEX_DEFAULT_LIMIT,
+    ) -> dict[str, Any]:
+        """Find notifications newest first, with `next` as the `before` cursor for the following page"""
+        if self._db is None:
+            return {"results": [], "next": None}
+        limit = max(1, min(limit, ARCHIVE_INDEX_MAX_LIMIT))
+        tables = "notifications n"
+        clauses: list[str] = []
+        params: list[Any] = []
+        if delivery:
+            tables += " JOIN notification_deliveries d ON d.id = n.id AND d.delivery = ?"
+            params.append(delivery)
+        if start:
+            clauses.append("n.id >= ?")
+            params.append(ulid_bound(start))
+        if end:
+            clauses.append("n.id <= ?")
+            params.append(ulid_bound(end, upper=True))
+        if before:
+            clauses.append("n.id < ?")
+            params.append(before)
+        if priority:
+            clauses.append(f"n.priority IN ({','.join('?' * len(priority))})")
+            params.extend(priority)
+        if outcome:
+            if outcome not in OUTCOME_CLAUSES:
+                raise ValueError(f"Unknown outcome {outcome}")
+            clauses.append(OUTCOME_CLAUSES[outcome])
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        # only fixed clauses are interpolated, all values are bound
+        sql = f"SELECT {COLUMNS} FROM {tables}{where} ORDER BY n.id DESC LIMIT ?"  # noqa: S608
+        params.append(limit + 1)
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        results = [
+            {
+                "id": row[0],
+                "created": dt.datetime.fromtimestamp(row[1], tz=dt.UTC).isoformat(),
+                "priority": row[2],
+                "delivered": row[3],
+                "errored": row[4],
+                "skipped": row[5],
+                "deliveries": json.loads(row[6]),
+                "scenarios": json.loads(row[7]),
+                "targets": json.loads(row[8]),
+            }
+            for row in rows[:limit]
+        ]
+        return {"results": results, "next": results[-1]["id"] if len(rows) > limit else None}
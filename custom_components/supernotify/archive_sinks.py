@@ -0,0 +1,525 @@
+"""Fan out of serialised notifications to archive sinks, each batching and failing independently"""
+
+import asyncio
+import collections
+import contextlib
+import gzip
+import logging
+import queue
+import threading
+import time
+from abc import abstractmethod
+from typing import Any
+
+import orjson
+from homeassistant.components import mqtt
+from homeassistant.core import HomeAssistant
+
+from . import ARCHIVE_MQTT_PAYLOAD_MINIMAL, DOMAIN
+from .archive import ArchivableObject, ArchiveRecord, NotificationArchive, encode_json
+
+_LOGGER = logging.getLogger(__name__)
+
+ARCHIVE_DEFAULT_QUEUE_SIZE = 500
+ARCHIVE_DEFAULT_FLUSH_INTERVAL = 1.0
+ARCHIVE_DEFAULT_BATCH_SIZE = 50
+ARCHIVE_STOP_TIMEOUT = 10.0
+EVENT_NOTIFICATION_ARCHIVED = f"{DOMAIN}_notification_archived"
+
+
+class ArchiveSink:
+    """Destination for archived notifications, fed without blocking delivery
+
+    Records are gathered for up to the flush interval, then written as a batch. A full
+    queue drops records rather than holding up notifications
+    """
+
+    name: str = "sink"
+    # set where the sink publishes minimal contents rather than the archived record
+    minimal_payload: bool = False
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        queue_size: int = ARCHIVE_DEFAULT_QUEUE_SIZE,
+        flush_interval: float = ARCHIVE_DEFAULT_FLUSH_INTERVAL,
+        batch_size: int = ARCHIVE_DEFAULT_BATCH_SIZE,
+    ) -> None:
+        self.hass = hass
+        self.queue_size = queue_size
+        self.flush_interval = flush_interval
+        self.batch_size = max(batch_size, 1)
+        self.stop_timeout: float = ARCHIVE_STOP_TIMEOUT
+        self.written: int = 0
+        self.dropped: int = 0
+        self.failed: int = 0
+        self.batches: int = 0
+        self.last_latency: float = 0.0
+        self.max_latency: float = 0.0
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    @property
+    @abstractmethod
+    def depth(self) -> int:
+        pass
+
+    @property
+    @abstractmethod
+    def running(self) -> bool:
+        pass
+
+    @abstractmethod
+    def start(self) -> None:
+        pass
+
+    @abstractmethod
+    def submit(self, record: ArchiveRecord) -> bool:
+        """Queue a record without blocking, dropping it if the sink has fallen too far behind"""
+
+    @abstractmethod
+    async def stop(self) -> None:
+        """Flush pending records and stop"""
+
+    @abstractmethod
+    async def flush(self) -> None:
+        """Wait until all records queued so far are written"""
+
+    def _dropped(self, record: ArchiveRecord) -> bool:
+        self.dropped += 1
+        _LOGGER.warning("SUPERNOTIFY Archive %s queue full, dropping %s (%s dropped)", self.name, record.name, self.dropped)
+        self.expose_entities()
+        return False
+
+    def _account(self, batch: list[ArchiveRecord], written: int) -> None:
+        self.written += written
+        self.failed += len(batch) - written
+        self.last_latency = max(time.monotonic() - r.submitted for r in batch)
+        self.max_latency = max(self.max_latency, self.last_latency)
+        self.batches += 1
+
+    def attributes(self) -> dict[str, Any]:
+        return {
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+            "last_write_latency": round(self.last_latency, 3),
+            "max_write_latency": round(self.max_latency, 3),
+            "queue_size": self.queue_size,
+        }
+
+    def expose_entities(self) -> None:
+        self.hass.states.async_set(f"{DOMAIN}.archive_{self.name}", str(self.depth), self.attributes())
+
+
+class ThreadedArchiveSink(ArchiveSink):
+    """Sink with blocking writes, made from a dedicated thread so no I/O happens on the event loop"""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._queue: queue.Queue[ArchiveRecord | None] = queue.Queue(maxsize=self.queue_size)
+        self._thread: threading.Thread | None = None
+
+    @abstractmethod
+    def write_batch(self, records: list[ArchiveRecord]) -> int:
+        """Write records, returning how many succeeded. Blocking"""
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._thread = threading.Thread(target=self._run, name=f"{DOMAIN} archive {self.name}", daemon=True)
+        self._thread.start()
+        _LOGGER.info("SUPERNOTIFY Archive %s writer started, flushing every %ss", self.name, self.flush_interval)
+
+    def submit(self, record: ArchiveRecord) -> bool:
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            return self._dropped(record)
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            record = self._queue.get()
+            if record is None:
+                self._queue.task_done()
+                break
+            batch: list[ArchiveRecord] = [record]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    record = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if record is None:
+                    self._queue.task_done()
+                    stopping = True
+                    break
+                batch.append(record)
+            try:
+                self._account(batch, self.write_batch(batch))
+            except Exception as e:
+                _LOGGER.warning("SUPERNOTIFY Archive %s failed to write %s records: %s", self.name, len(batch), e)
+                self._account(batch, 0)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            self._notify_loop()
+
+    def _notify_loop(self) -> None:
+        with contextlib.suppress(RuntimeError):  # loop already closed at shutdown
+            self.hass.loop.call_soon_threadsafe(self.expose_entities)
+
+    def _stop_and_wait(self, timeout: float) -> bool:
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return False
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return not self.running
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        if not await self.hass.async_add_executor_job(self._stop_and_wait, self.stop_timeout):
+            _LOGGER.warning(
+                "SUPERNOTIFY Archive %s did not stop within %ss, %s records pending",
+                self.name,
+                self.stop_timeout,
+                self.depth,
+            )
+        self._thread = None
+        self.expose_entities()
+
+    async def flush(self) -> None:
+        if self.running:
+            await self.hass.async_add_executor_job(self._queue.join)
+
+
+class AsyncArchiveSink(ArchiveSink):
+    """Sink with non-blocking writes, made from a background task on the event loop"""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._queue: asyncio.Queue[ArchiveRecord | None] = asyncio.Queue(maxsize=self.queue_size)
+        self._task: asyncio.Task[None] | None = None
+
+    @abstractmethod
+    async def write_batch(self, records: list[ArchiveRecord]) -> int:
+        """Write records, returning how many succeeded"""
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._task = self.hass.async_create_background_task(self._run(), name=f"{DOMAIN} archive {self.name}")
+        _LOGGER.info("SUPERNOTIFY Archive %s sink started, flushing every %ss", self.name, self.flush_interval)
+
+    def submit(self, record: ArchiveRecord) -> bool:
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except asyncio.QueueFull:
+            return self._dropped(record)
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            record = await self._queue.get()
+            if record is None:
+                self._queue.task_done()
+                break
+            batch: list[ArchiveRecord] = [record]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    async with asyncio.timeout(max(deadline - time.monotonic(), 0)):
+                        record = await self._queue.get()
+                except TimeoutError:
+                    break
+                if record is None:
+                    self._queue.task_done()
+                    stopping = True
+                    break
+                batch.append(record)
+            try:
+                self._account(batch, await self.write_batch(batch))
+            except Exception as e:
+                _LOGGER.warning("SUPERNOTIFY Archive %s failed to write %s records: %s", self.name, len(batch), e)
+                self._account(batch, 0)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            self.expose_entities()
+
+    async def stop(self) -> None:
+        if not self.running or self._task is None:
+            return
+        try:
+            async with asyncio.timeout(self.stop_timeout):
+                await self._queue.put(None)
+                await asyncio.shield(self._task)
+        except TimeoutError:
+            _LOGGER.warning(
+                "SUPERNOTIFY Archive %s did not stop within %ss, %s records pending",
+                self.name,
+                self.stop_timeout,
+                self.depth,
+            )
+            self._task.cancel()
+        self._task = None
+        self.expose_entities()
+
+    async def flush(self) -> None:
+        if self.running:
+            await self._queue.join()
+
+
+class FileArchiveSink(ThreadedArchiveSink):
+    """Notification files or segment lines in the archive directory"""
+
+    name = "file"
+
+    def __init__(self, hass: HomeAssistant, archive: NotificationArchive, **kwargs: Any) -> None:
+        super().__init__(hass, **kwargs)
+        self.archive = archive
+
+    @property
+    def available(self) -> bool:
+        return self.archive.writable
+
+    def write_batch(self, records: list[ArchiveRecord]) -> int:
+        return self.archive.write_batch(records)
+
+
+class IndexArchiveSink(ThreadedArchiveSink):
+    """Summary rows in the archive's SQLite index, one transaction per batch"""
+
+    name = "index"
+
+    def __init__(self, hass: HomeAssistant, archive: NotificationArchive, **kwargs: Any) -> None:
+        super().__init__(hass, **kwargs)
+        self.archive = archive
+
+    @property
+    def available(self) -> bool:
+        return self.archive.writable and self.archive.index is not None
+
+    def write_batch(self, records: list[ArchiveRecord]) -> int:
+        if self.archive.index is None:
+            return 0
+        summaries = [r.summary for r in records if r.summary is not None]
+        return self.archive.index.add(summaries) + len(records) - len(summaries)
+
+
+class MqttArchiveSink(AsyncArchiveSink):
+    """Notifications published to an MQTT topic, one message per notification or one per window
+
+    Retained messages are coalesced, so the broker rewrites its retained copy at most once
+    per publish window however many notifications arrive. Payload is the minimal notification
+    contents by default, or the archived record, trimmed to the archive profile
+    """
+
+    name = "mqtt"
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        topic: str,
+        qos: int = 0,
+        retain: bool = True,
+        batch: bool = False,
+        compress: bool = False,
+        payload: str = ARCHIVE_MQTT_PAYLOAD_MINIMAL,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(hass, **kwargs)
+        self.minimal_payload = payload == ARCHIVE_MQTT_PAYLOAD_MINIMAL
+        self.topic = topic
+        self.qos = qos
+        self.retain = retain
+        self.batch = batch
+        self.compress = compress
+        self.publishes: int = 0
+        self.retained: int = 0
+        self.last_publish_latency: float = 0.0
+        self.max_publish_latency: float = 0.0
+
+    @property
+    def latest_topic(self) -> str:
+        return f"{self.topic}/latest"
+
+    def payload(self, record: ArchiveRecord) -> bytes:
+        if self.minimal_payload and record.minimal is not None:
+            return record.minimal
+        return record.payload
+
+    async def write_batch(self, records: list[ArchiveRecord]) -> int:
+        if self.batch:
+            # minimal summaries, or the full payload as is for records that have none
+            minimal = [r.summary if r.summary is not None else orjson.Fragment(r.payload) for r in records]
+            if not await self._publish(self.topic, encode_json(minimal, compact=True), retain=False):
+                return 0
+            if self.retain:
+                await self._publish(self.latest_topic, self.payload(records[-1]), retain=True)
+            return len(records)
+        published = 0
+        for i, record in enumerate(records):
+            # only the last of the window replaces the retained message
+            if await self._publish(self.topic, self.payload(record), retain=self.retain and i == len(records) - 1):
+                published += 1
+        return published
+
+    async def _publish(self, topic: str, payload: bytes, retain: bool) -> bool:
+        if self.compress:
+            payload = gzip.compress(payload)
+        started = time.monotonic()
+        try:
+            _LOGGER.debug("SUPERNOTIFY Publishing %s bytes to %s", len(payload), topic)
+            await mqtt.async_publish(self.hass, topic, payload, qos=self.qos, retain=retain)
+        except Exception as e:
+            _LOGGER.warning("SUPERNOTIFY Unable to publish to %s: %s", topic, e)
+            return False
+        self.last_publish_latency = time.monotonic() - started
+        self.max_publish_latency = max(self.max_publish_latency, self.last_publish_latency)
+        self.publishes += 1
+        if retain:
+            self.retained += 1
+        return True
+
+    def attributes(self) -> dict[str, Any]:
+        attrs = super().attributes()
+        attrs.update({
+            "publishes": self.publishes,
+            "retained": self.retained,
+            "last_publish_latency": round(self.last_publish_latency, 3),
+            "max_publish_latency": round(self.max_publish_latency, 3),
+        })
+        return attrs
+
+
+class EventArchiveSink(AsyncArchiveSink):
+    """Notification summary fired as a Home Assistant event, for automations and the logbook"""
+
+    name = "event"
+
+    async def write_batch(self, records: list[ArchiveRecord]) -> int:
+        fired = 0
+        for record in records:
+            if record.summary is None:
+                continue
+            data = dict(record.summary)
+            data["created"] = data["created"].isoformat()
+            self.hass.bus.async_fire(EVENT_NOTIFICATION_ARCHIVED, data)
+            fired += 1
+        return fired
+
+
+class ArchivePipeline:
+    """Serialise each notification once, then hand the same record to every sink
+
+    Without a background file sink, files and index are written by an executor job,
+    or inline when there is no hass to schedule one
+    """
+
+    def __init__(
+        self, archive: NotificationArchive, sinks: list[ArchiveSink] | None = None, hass: HomeAssistant | None = None
+    ) -> None:
+        self.hass = hass
+        self.notification_archive = archive
+        self._configured: list[ArchiveSink] = sinks or []
+        self.sinks: list[ArchiveSink] = []
+        self._inline_writes: set[asyncio.Future[None]] = set()
+        self._inline_queue: collections.deque[ArchiveRecord] = collections.deque()
+        self._inline_lock = threading.Lock()
+
+    def start(self) -> None:
+        self.sinks = [sink for sink in self._configured if sink.available]
+        for sink in self.sinks:
+            sink.start()
+            sink.expose_entities()
+
+    def sink(self, name: str) -> ArchiveSink | None:
+        return next((s for s in self.sinks if s.name == name), None)
+
+    def archive(self, archive_object: ArchivableObject) -> bool:
+        """Submit to all sinks without blocking, writing files in the executor if there is no background file sink"""
+        if not self.sinks and not self.notification_archive.writable:
+            return False
+        sampler = self.notification_archive.sampler
+        if not sampler.keep(archive_object):
+            if self.hass is not None:
+                self.hass.states.async_set(f"{DOMAIN}.archive_sampling", str(sampler.total_sampled_out), sampler.attributes())
+            return False
+        record = self.notification_archive.serialise(archive_object, minimal=any(s.minimal_payload for s in self.sinks))
+        if record is None:
+            return False
+        if self.notification_archive.writable and self.sink(FileArchiveSink.name) is None:
+            if self.hass is None:
+                self._write_inline(record)
+            else:
+                # file write, fsync and index insert all block, so keep them off the event loop
+                self._inline_queue.append(record)
+                pending = self.hass.async_add_executor_job(self._drain_inline)
+                self._inline_writes.add(pending)
+                pending.add_done_callback(self._inline_writes.discard)
+        for sink in self.sinks:
+            try:
+                sink.submit(record)
+            except Exception as e:
+                _LOGGER.warning("SUPERNOTIFY Archive %s failed to accept %s: %s", sink.name, record.name, e)
+        return True
+
+    def _drain_inline(self) -> None:
+        # executor jobs may run in any order, so each writes whatever is queued, oldest first
+        with self._inline_lock:
+            while self._inline_queue:
+                self._write_inline(self._inline_queue.popleft())
+
+    def _write_inline(self, record: ArchiveRecord) -> None:
+        try:
+            if (
+                self.notification_archive.write_batch([record])
+                and self.notification_archive.index is not None
+                and record.summary is not None
+            ):
+                self.notification_archive.index.add([record.summary])
+        except Exception as e:
+            _LOGGER.warning("SUPERNOTIFY Unable to archive %s: %s", record.name, e)
+
+    async def flush(self) -> None:
+        await self._await_inline_writes()
+        for sink in self.sinks:
+            await sink.flush()
+
+    async def _await_inline_writes(self) -> None:
+        if self._inline_writes:
+            await asyncio.gather(*self._inline_writes, return_exceptions=True)
+
+    async def stop(self) -> None:
+        await self._await_inline_writes()
+        for sink in self.sinks:
+            try:
+                await sink.stop()
+            except Exception as e:
+                _LOGGER.warning("SUPERNOTIFY Archive %s failed to stop: %s", sink.name, e)
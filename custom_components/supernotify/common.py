@@ -3,6 +3,7 @@
 No dependencies permitted
 """
 
+import json
 import time
 from dataclasses import dataclass, field
 from typing import Any
@@ -25,6 +26,17 @@ def safe_extend(target: list[Any], extension: list[Any] | tuple[Any] | Any) -> l
     return target
 
 
+def condition_key(condition_config: Any) -> str:
+    """Canonical form of a condition definition, so identical conditions can be shared"""
+
+    def template_source(v: Any) -> str:
+        # templates keyed by source, rather than repr which includes render count
+        source = getattr(v, "template", None)
+        return source if isinstance(source, str) else str(v)
+
+    return json.dumps(condition_config, sort_keys=True, default=template_source)
+
+
 def ensure_list(v: Any) -> list[Any]:
     if v is None:
         return []
@@ -45,14 +57,6 @@ def ensure_dict(v: Any, default: Any = None) -> dict[Any, Any]:
     return {v: default}
 
 
-def update_dict_list(
-    target: list[dict[Any, Any]], to_add: list[dict[Any, Any]], to_remove: list[dict[Any, Any]]
-) -> list[dict[Any, Any]]:
-    updated = [d for d in target if d not in to_remove]
-    updated.extend(to_add)
-    return updated
-
-
 @dataclass
 class CallRecord:
     elapsed: float = field()
@@ -84,10 +88,17 @@ class DebugTrace:
     target: list[str] | str | None = field(default=None)
     resolved: dict[str, dict[str, Any]] = field(init=False, default_factory=lambda: {})
     delivery_selection: dict[str, list[str]] = field(default_factory=lambda: {})
+    media: dict[str, Any] = field(init=False, default_factory=lambda: {})
 
     def contents(
         self,
     ) -> tuple[
-        str | None, str | None, dict[str, Any] | None, list[str] | str | None, dict[str, dict[str, Any]], dict[str, list[str]]
+        str | None,
+        str | None,
+        dict[str, Any] | None,
+        list[str] | str | None,
+        dict[str, dict[str, Any]],
+        dict[str, list[str]],
+        dict[str, Any],
     ]:
-        return (self.message, self.title, self.data, self.target, self.resolved, self.delivery_selection)
+        return (self.message, self.title, self.data, self.target, self.resolved, self.delivery_selection, self.media)
@@ -6,7 +6,6 @@ from pathlib import Path
 from typing import TYPE_CHECKING, Any
 
 from homeassistant.const import (
-    ATTR_STATE,
     CONF_DEFAULT,
     CONF_DEVICE_ID,
     CONF_ENABLED,
@@ -21,24 +20,69 @@ from homeassistant.helpers.config_validation import boolean
 from homeassistant.helpers.network import get_url
 from homeassistant.util import slugify
 
-from custom_components.supernotify.archive import ArchiveTopic, NotificationArchive
+from custom_components.supernotify.archive import NotificationArchive
+from custom_components.supernotify.archive_sinks import (
+    ARCHIVE_DEFAULT_FLUSH_INTERVAL,
+    ARCHIVE_DEFAULT_QUEUE_SIZE,
+    ArchivePipeline,
+    ArchiveSink,
+    EventArchiveSink,
+    FileArchiveSink,
+    IndexArchiveSink,
+    MqttArchiveSink,
+)
 from custom_components.supernotify.common import ensure_list, safe_get
+from custom_components.supernotify.media_cache import (
+    MEDIA_DEFAULT_CACHE_TTL,
+    MEDIA_DEFAULT_MAX_CAMERA_CAPTURES,
+    MediaCache,
+)
+from custom_components.supernotify.media_housekeeping import (
+    MEDIA_DEFAULT_MAX_AGE_DAYS,
+    MEDIA_DEFAULT_TIME_BUDGET,
+    MediaHousekeeper,
+)
 from custom_components.supernotify.snoozer import Snoozer
 
 from . import (
+    ARCHIVE_FORMAT_FILES,
+    ARCHIVE_MQTT_PAYLOAD_MINIMAL,
+    ARCHIVE_PROFILE_STANDARD,
+    ARCHIVE_SEGMENT_DAILY,
     ATTR_USER_ID,
+    CONF_ARCHIVE_BACKGROUND,
+    CONF_ARCHIVE_COMPRESS,
     CONF_ARCHIVE_DAYS,
+    CONF_ARCHIVE_EVENT,
+    CONF_ARCHIVE_FLUSH_INTERVAL,
+    CONF_ARCHIVE_FORMAT,
+    CONF_ARCHIVE_INDEX,
+    CONF_ARCHIVE_MAX_BYTES,
+    CONF_ARCHIVE_MQTT_BATCH,
+    CONF_ARCHIVE_MQTT_COMPRESS,
+    CONF_ARCHIVE_MQTT_PAYLOAD,
     CONF_ARCHIVE_MQTT_QOS,
     CONF_ARCHIVE_MQTT_RETAIN,
     CONF_ARCHIVE_MQTT_TOPIC,
+    CONF_ARCHIVE_MQTT_WINDOW,
     CONF_ARCHIVE_PATH,
+    CONF_ARCHIVE_PROFILE,
+    CONF_ARCHIVE_QUEUE_SIZE,
+    CONF_ARCHIVE_SAMPLING,
+    CONF_ARCHIVE_SEGMENT,
     CONF_CAMERA,
+    CONF_CONCURRENCY,
     CONF_DATA,
     CONF_DEVICE_DISCOVERY,
     CONF_DEVICE_DOMAIN,
     CONF_DEVICE_NAME,
     CONF_DEVICE_TRACKER,
     CONF_MANUFACTURER,
+    CONF_MEDIA_CACHE_TTL,
+    CONF_MEDIA_HOUSEKEEPING_BUDGET,
+    CONF_MEDIA_MAX_AGE_DAYS,
+    CONF_MEDIA_MAX_CAMERA_CAPTURES,
+    CONF_MEDIA_MAX_SIZE_MB,
     CONF_MOBILE_DEVICES,
     CONF_MOBILE_DISCOVERY,
     CONF_MODEL,
@@ -54,10 +98,13 @@ from . import (
     SELECTION_FALLBACK,
     SELECTION_FALLBACK_ON_ERROR,
 )
+from .occupancy import OccupancyIndex
+from .routing import DeliveryRouter
 from .scenario import Scenario
 
 if TYPE_CHECKING:
     from homeassistant.core import HomeAssistant, State
+    from homeassistant.helpers.condition import ConditionCheckerType
     from homeassistant.helpers.device_registry import DeviceEntry, DeviceRegistry
 
     from custom_components.supernotify.delivery_method import DeliveryMethod
@@ -75,11 +122,13 @@ class Context:
         mobile_actions: dict[str, Any] | None = None,
         template_path: str | None = None,
         media_path: str | None = None,
-        archive_config: dict[str, str] | None = None,
+        archive_config: dict[str, Any] | None = None,
         scenarios: dict[str, dict[str, Any]] | None = None,
         method_configs: dict[str, Any] | None = None,
         cameras: list[dict[str, Any]] | None = None,
         method_types: list[type[DeliveryMethod]] | None = None,
+        concurrent_delivery: bool = False,
+        media_options: dict[str, Any] | None = None,
     ) -> None:
         self.hass: HomeAssistant | None = None
         self.hass_internal_url: str
@@ -122,23 +171,26 @@ class Context:
         self.mobile_actions: dict[str, Any] = mobile_actions or {}
         self.template_path: Path | None = Path(template_path) if template_path else None
         self.media_path: Path | None = Path(media_path) if media_path else None
+        self.media_options: dict[str, Any] = media_options or {}
+        self.media_housekeeper: MediaHousekeeper | None = None
+        self.media_cache = MediaCache(
+            ttl=self.media_options.get(CONF_MEDIA_CACHE_TTL, MEDIA_DEFAULT_CACHE_TTL),
+            max_camera_captures=self.media_options.get(CONF_MEDIA_MAX_CAMERA_CAPTURES, MEDIA_DEFAULT_MAX_CAMERA_CAPTURES),
+        )
         archive_config = archive_config or {}
         self.archive: NotificationArchive = NotificationArchive(
             bool(archive_config.get(CONF_ENABLED, False)),
             archive_config.get(CONF_ARCHIVE_PATH),
             archive_config.get(CONF_ARCHIVE_DAYS),
+            archive_format=archive_config.get(CONF_ARCHIVE_FORMAT, ARCHIVE_FORMAT_FILES),
+            segment_period=archive_config.get(CONF_ARCHIVE_SEGMENT, ARCHIVE_SEGMENT_DAILY),
+            compress=bool(archive_config.get(CONF_ARCHIVE_COMPRESS, False)),
+            indexed=bool(archive_config.get(CONF_ARCHIVE_INDEX, False)),
+            profile=archive_config.get(CONF_ARCHIVE_PROFILE, ARCHIVE_PROFILE_STANDARD),
+            max_bytes=archive_config.get(CONF_ARCHIVE_MAX_BYTES),
+            sampling=archive_config.get(CONF_ARCHIVE_SAMPLING),
         )
-        archive_topic = archive_config.get(CONF_ARCHIVE_MQTT_TOPIC)
-        self.archive_topic: ArchiveTopic | None = None
-        if archive_topic is not None and self.hass:
-            self.archive_topic = ArchiveTopic(
-                self.hass,
-                archive_topic,
-                int(archive_config.get(CONF_ARCHIVE_MQTT_QOS, 0)),
-                boolean(archive_config.get(CONF_ARCHIVE_MQTT_RETAIN, True)),
-            )
-        else:
-            self.archive_topic = None
+        self.archive_pipeline = ArchivePipeline(self.archive, self.archive_sinks(archive_config), self.hass)
         self.cameras: dict[str, Any] = {c[CONF_CAMERA]: c for c in cameras} if cameras else {}
         self.methods: dict[str, DeliveryMethod] = {}
         self._method_configs: dict[str, Any] = method_configs or {}
@@ -147,12 +199,17 @@ class Context:
         self._config_scenarios: dict[str, Any] = scenarios or {}
         self.content_scenario_templates: dict[str, Any] = {}
         self.delivery_by_scenario: dict[str, list[str]] = {SCENARIO_DEFAULT: []}
+        self.delivery_router = DeliveryRouter(self)
         self.fallback_on_error: dict[str, dict[str, Any]] = {}
         self.fallback_by_default: dict[str, dict[str, Any]] = {}
+        self.concurrent_delivery: bool = concurrent_delivery
+        # compiled delivery conditions, shared across deliveries with identical condition definitions
+        self.compiled_conditions: dict[str, ConditionCheckerType] = {}
         self._entity_registry: entity_registry.EntityRegistry | None = None
         self._device_registry: device_registry.DeviceRegistry | None = None
         self._method_types: list[type[DeliveryMethod]] = method_types or []
         self.snoozer = Snoozer()
+        self.occupancy_index = OccupancyIndex(hass)
         # test harness support
         self._create_default_scenario: bool = False
         self._method_instances: list[DeliveryMethod] | None = None
@@ -163,6 +220,7 @@ class Context:
         )
 
         self.people = self.setup_people(self._recipients)
+        self.occupancy_index.start(self.people)
 
         if self._config_scenarios and self.hass:
             for scenario_name, scenario_definition in self._config_scenarios.items():
@@ -186,11 +244,49 @@ class Context:
                 self.media_path = None
         if self.media_path is not None:
             _LOGGER.info("SUPERNOTIFY abs media path: %s", self.media_path.absolute())
+            self.media_housekeeper = MediaHousekeeper(
+                self.media_path,
+                max_age_days=self.media_options.get(CONF_MEDIA_MAX_AGE_DAYS, MEDIA_DEFAULT_MAX_AGE_DAYS),
+                max_size_mb=self.media_options.get(CONF_MEDIA_MAX_SIZE_MB),
+                time_budget=self.media_options.get(CONF_MEDIA_HOUSEKEEPING_BUDGET, MEDIA_DEFAULT_TIME_BUDGET),
+                # media is kept as long as the archived notification that refers to it
+                protect_days=self.archive.archive_days if self.archive.enabled else 0,
+            )
         if self.archive:
             self.archive.initialize()
+        self.archive_pipeline.start()
         default_deliveries: dict[str, Any] = self.initialize_deliveries()
         self.initialize_scenarios(default_deliveries, default_scenario=self._create_default_scenario)
 
+    def archive_sinks(self, archive_config: dict[str, Any]) -> list[ArchiveSink]:
+        if not self.hass:
+            return []
+        sinks: list[ArchiveSink] = []
+        sink_options: dict[str, Any] = {
+            "queue_size": int(archive_config.get(CONF_ARCHIVE_QUEUE_SIZE, ARCHIVE_DEFAULT_QUEUE_SIZE)),
+            "flush_interval": float(archive_config.get(CONF_ARCHIVE_FLUSH_INTERVAL, ARCHIVE_DEFAULT_FLUSH_INTERVAL)),
+        }
+        if archive_config.get(CONF_ARCHIVE_BACKGROUND, False):
+            sinks.append(FileArchiveSink(self.hass, self.archive, **sink_options))
+            sinks.append(IndexArchiveSink(self.hass, self.archive, **sink_options))
+        if archive_config.get(CONF_ARCHIVE_MQTT_TOPIC) is not None:
+            sinks.append(
+                MqttArchiveSink(
+                    self.hass,
+                    archive_config[CONF_ARCHIVE_MQTT_TOPIC],
+                    int(archive_config.get(CONF_ARCHIVE_MQTT_QOS, 0)),
+                    boolean(archive_config.get(CONF_ARCHIVE_MQTT_RETAIN, True)),
+                    batch=bool(archive_config.get(CONF_ARCHIVE_MQTT_BATCH, False)),
+                    compress=bool(archive_config.get(CONF_ARCHIVE_MQTT_COMPRESS, False)),
+                    payload=archive_config.get(CONF_ARCHIVE_MQTT_PAYLOAD, ARCHIVE_MQTT_PAYLOAD_MINIMAL),
+                    queue_size=sink_options["queue_size"],
+                    flush_interval=float(archive_config.get(CONF_ARCHIVE_MQTT_WINDOW, ARCHIVE_DEFAULT_FLUSH_INTERVAL)),
+                )
+            )
+        if archive_config.get(CONF_ARCHIVE_EVENT, False):
+            sinks.append(EventArchiveSink(self.hass, **sink_options))
+        return sinks
+
     def configure_for_tests(
         self, method_instances: list[DeliveryMethod] | None = None, create_default_scenario: bool = False
     ) -> None:
@@ -276,6 +372,7 @@ class Context:
             for d, dc in self.deliveries.items():
                 if dc.get(CONF_ENABLED, True) and d not in self.delivery_by_scenario[SCENARIO_DEFAULT]:
                     self.delivery_by_scenario[SCENARIO_DEFAULT].append(d)
+        self.delivery_router.compile()
 
     async def _register_delivery_methods(
         self,
@@ -299,11 +396,13 @@ class Context:
                     device_domain=method_config.get(CONF_DEVICE_DOMAIN, []),
                     device_discovery=method_config.get(CONF_DEVICE_DISCOVERY, False),
                     targets_required=method_config.get(CONF_TARGETS_REQUIRED, False),
+                    concurrency=method_config.get(CONF_CONCURRENCY, 1),
                 )
                 await self.methods[delivery_method_class.method].initialize()
                 self.deliveries.update(self.methods[delivery_method_class.method].valid_deliveries)
 
         _LOGGER.info("SUPERNOTIFY configured deliveries %s", "; ".join(self.deliveries.keys()))
+        self.delivery_router.invalidate()
 
     def delivery_method(self, delivery: str) -> DeliveryMethod:
         method_name = self.deliveries.get(delivery, {}).get(CONF_METHOD)
@@ -354,30 +453,17 @@ class Context:
         return people
 
     def people_state(self) -> list[dict[str, Any]]:
-        results = []
-        if self.hass:
-            for person, person_config in self.people.items():
-                # TODO: possibly rate limit this
-                try:
-                    tracker = self.hass.states.get(person)
-                    if tracker is None:
-                        person_config[ATTR_STATE] = None
-                    else:
-                        person_config[ATTR_STATE] = tracker.state
-                except Exception as e:
-                    _LOGGER.warning("SUPERNOTIFY Unable to determine occupied status for %s: %s", person, e)
-                results.append(person_config)
-        return results
+        """Return copies of person configs with current state, from occupancy index"""
+        snapshot = self.occupancy_index.snapshot()
+        return [*snapshot[STATE_HOME], *snapshot[STATE_NOT_HOME]]
 
     def determine_occupancy(self) -> dict[str, list[dict[str, Any]]]:
-        results: dict[str, list[dict[str, Any]]] = {STATE_HOME: [], STATE_NOT_HOME: []}
-        for person_config in self.people_state():
-            if person_config.get(ATTR_STATE) in (None, STATE_HOME):
-                # default to at home if unknown tracker
-                results[STATE_HOME].append(person_config)
-            else:
-                results[STATE_NOT_HOME].append(person_config)
-        return results
+        snapshot = self.occupancy_index.snapshot()
+        return {STATE_HOME: list(snapshot[STATE_HOME]), STATE_NOT_HOME: list(snapshot[STATE_NOT_HOME])}
+
+    def shutdown(self) -> None:
+        self.occupancy_index.stop()
+        self.media_cache.stop()
 
     def entity_registry(self) -> entity_registry.EntityRegistry | None:
         """Hass entity registry is weird, every component ends up creating its own, with a store, subscribing
@@ -3,17 +3,18 @@
 import logging
 import time
 from abc import abstractmethod
-from dataclasses import asdict
 from traceback import format_exception
-from typing import Any
+from typing import TYPE_CHECKING, Any
 from urllib.parse import urlparse
 
+import voluptuous as vol
 from homeassistant.components.notify.const import ATTR_TARGET
 from homeassistant.const import CONF_ACTION, CONF_CONDITION, CONF_DEFAULT, CONF_METHOD, CONF_NAME, CONF_OPTIONS, CONF_TARGET
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers import condition
+from homeassistant.helpers.typing import ConfigType
 
-from custom_components.supernotify.common import CallRecord
+from custom_components.supernotify.common import CallRecord, condition_key
 from custom_components.supernotify.configuration import Context
 
 from . import (
@@ -21,11 +22,16 @@ from . import (
     CONF_DEVICE_DISCOVERY,
     CONF_DEVICE_DOMAIN,
     CONF_TARGETS_REQUIRED,
+    MEDIA_PROFILE_SCHEMA,
+    OPTION_MEDIA_PROFILE,
     RESERVED_DELIVERY_NAMES,
     ConditionVariables,
     MessageOnlyPolicy,
 )
 
+if TYPE_CHECKING:
+    from homeassistant.helpers.condition import ConditionCheckerType
+
 _LOGGER = logging.getLogger(__name__)
 
 OPTION_SIMPLIFY_TEXT = "simplify_text"
@@ -46,6 +52,8 @@ class DeliveryMethod:
     """
 
     method: str
+    # set False in sub classes driving a shared physical device, where envelopes must never be delivered at the same time
+    parallel_safe: bool = True
 
     @abstractmethod
     def __init__(
@@ -57,6 +65,7 @@ class DeliveryMethod:
         targets_required: bool = True,
         device_domain: list[str] | None = None,
         device_discovery: bool = False,
+        concurrency: int = 1,
     ) -> None:
         self.hass: HomeAssistant = hass
         self.context: Context = context
@@ -66,9 +75,17 @@ class DeliveryMethod:
         self.targets_required: bool = targets_required
         self.device_domain: list[str] = device_domain or []
         self.device_discovery: bool = device_discovery
+        if concurrency > 1 and not self.parallel_safe:
+            _LOGGER.warning("SUPERNOTIFY %s delivers one envelope at a time, ignoring concurrency %s", self.method, concurrency)
+        self.concurrency: int = max(concurrency, 1) if self.parallel_safe else 1
 
         self.default_delivery: dict[str, Any] | None = None
         self.valid_deliveries: dict[str, dict[str, Any]] = {}
+        # validated media profiles by delivery name, and the method default
+        self.media_profiles: dict[str, dict[str, Any]] = {}
+        self.default_media_profile: dict[str, Any] | None = None
+        # delivery name -> condition key, for compiled conditions in context
+        self.delivery_conditions: dict[str, str] = {}
         self.method_deliveries: dict[str, dict[str, Any]] = (
             {d: dc for d, dc in deliveries.items() if dc.get(CONF_METHOD) == self.method} if deliveries else {}
         )
@@ -103,6 +120,12 @@ class DeliveryMethod:
     async def validate_deliveries(self) -> dict[str, dict[str, Any]]:
         """Validate list of deliveries at startup for this method"""
         valid_deliveries: dict[str, dict[str, Any]] = {}
+        default_media_profile = self.default_options.get(OPTION_MEDIA_PROFILE)
+        if default_media_profile:
+            try:
+                self.default_media_profile = MEDIA_PROFILE_SCHEMA(default_media_profile)
+            except vol.Invalid as e:
+                _LOGGER.warning("SUPERNOTIFY Ignoring invalid media profile for method %s: %s", self.method, e)
         for d, dc in self.method_deliveries.items():
             # don't care about ENABLED here since disabled deliveries can be overridden
             if d in RESERVED_DELIVERY_NAMES:
@@ -113,9 +136,23 @@ class DeliveryMethod:
                 continue
             delivery_condition = dc.get(CONF_CONDITION)
             if delivery_condition:
-                if not await condition.async_validate_condition_config(self.hass, delivery_condition):
+                validated_condition = await condition.async_validate_condition_config(self.hass, delivery_condition)
+                if not validated_condition:
                     _LOGGER.warning("SUPERNOTIFY Invalid delivery condition for %s: %s", d, delivery_condition)
                     continue
+                try:
+                    self.delivery_conditions[d] = await self.compile_condition(validated_condition)
+                except Exception as e:
+                    _LOGGER.warning("SUPERNOTIFY Unable to build delivery condition for %s: %s", d, e)
+                    continue
+
+            media_profile = (dc.get(CONF_OPTIONS) or {}).get(OPTION_MEDIA_PROFILE)
+            if media_profile:
+                try:
+                    self.media_profiles[d] = MEDIA_PROFILE_SCHEMA(media_profile)
+                except vol.Invalid as e:
+                    _LOGGER.warning("SUPERNOTIFY Invalid media profile for delivery %s: %s", d, e)
+                    continue
 
             valid_deliveries[d] = dc
             dc[CONF_NAME] = d
@@ -209,15 +246,30 @@ class DeliveryMethod:
             opt = ""
         return opt
 
+    def media_profile(self, delivery_name: str) -> dict[str, Any] | None:
+        """Get the validated media profile for attached images, from the delivery or method default options"""
+        return self.media_profiles.get(delivery_name, self.default_media_profile)
+
     def option_bool(self, option_name: str, delivery_config: dict[str, Any]) -> bool:
         return bool(self.option(option_name, delivery_config))
 
     def option_str(self, option_name: str, delivery_config: dict[str, Any]) -> str:
         return str(self.option(option_name, delivery_config))
 
+    async def compile_condition(self, cond_conf: ConfigType) -> str:
+        """Compile condition, or reuse an identical one already compiled, returning its key"""
+        key = condition_key(cond_conf)
+        if key not in self.context.compiled_conditions:
+            self.context.compiled_conditions[key] = await condition.async_from_config(self.hass, cond_conf)
+        return key
+
     async def evaluate_delivery_conditions(
-        self, delivery_config: dict[str, Any], condition_variables: ConditionVariables | None
+        self,
+        delivery_config: dict[str, Any],
+        condition_variables: ConditionVariables | None,
+        results: dict[str, bool] | None = None,
     ) -> bool | None:
+        """Evaluate delivery condition, using results to share outcome of identical conditions in same notification"""
         if CONF_CONDITION not in delivery_config:
             return True
         cond_conf = delivery_config.get(CONF_CONDITION)
@@ -225,8 +277,17 @@ class DeliveryMethod:
             return True
 
         try:
-            test = await condition.async_from_config(self.hass, cond_conf)
-            return test(self.hass, asdict(condition_variables) if condition_variables else None)
+            key = self.delivery_conditions.get(delivery_config.get(CONF_NAME, ""))
+            if key is None:
+                # delivery not validated at startup, e.g. method default
+                key = await self.compile_condition(cond_conf)
+            if results is not None and key in results:
+                return results[key]
+            test: ConditionCheckerType = self.context.compiled_conditions[key]
+            result = bool(test(self.hass, condition_variables.variables() if condition_variables else None))
+            if results is not None:
+                results[key] = result
+            return result
         except Exception as e:
             _LOGGER.error("SUPERNOTIFY Condition eval failed: %s", e)
             raise
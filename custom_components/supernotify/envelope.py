@@ -62,11 +62,11 @@ class Envelope:
         self.failed_calls: list[CallRecord] = []
         self.delivery_error: list[str] | None = None
 
-    async def grab_image(self) -> Path | None:
-        """Grab an image from a camera, snapshot URL, MQTT Image etc"""
+    async def grab_image(self, media_profile: dict[str, Any] | None = None) -> Path | None:
+        """Grab an image from a camera, snapshot URL, MQTT Image etc, reduced to the media profile if any"""
         image_path: Path | None = None
         if self._notification:
-            image_path = await self._notification.grab_image(self.delivery_name)
+            image_path = await self._notification.grab_image(self.delivery_name, media_profile)
         return image_path
 
     def core_action_data(self) -> dict[str, Any]:
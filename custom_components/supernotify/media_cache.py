@@ -0,0 +1,163 @@
+"""Short lived sharing of grabbed media, and of cameras, between notifications about the same thing"""
+
+import asyncio
+import contextlib
+import json
+import logging
+from collections.abc import AsyncIterator, Awaitable, Callable
+from pathlib import Path
+from typing import Any
+
+from cachetools import TTLCache
+
+_LOGGER = logging.getLogger(__name__)
+
+MEDIA_DEFAULT_CACHE_TTL = 10
+MEDIA_CACHE_SIZE = 64
+MEDIA_DEFAULT_MAX_CAMERA_CAPTURES = 2
+PTZ_DEFAULT_RETURN_DELAY = 10
+
+
+class MediaCache:
+    """Recently captured media by source, so a burst of notifications needs only one capture
+
+    Keyed by camera entity, image entity or snapshot URL, along with anything that changes
+    the image such as PTZ preset and JPEG options. Requests arriving while the same capture
+    is in flight wait for it rather than starting another, and cameras capture one at a time,
+    with a cap on how many capture at once
+    """
+
+    def __init__(
+        self,
+        ttl: float = MEDIA_DEFAULT_CACHE_TTL,
+        size: int = MEDIA_CACHE_SIZE,
+        max_camera_captures: int = MEDIA_DEFAULT_MAX_CAMERA_CAPTURES,
+    ) -> None:
+        self.ttl = ttl
+        self.max_camera_captures = max_camera_captures
+        self._entries: TTLCache[str, Path] | None = TTLCache(maxsize=size, ttl=ttl) if ttl > 0 else None
+        self._inflight: dict[str, asyncio.Future[Path | None]] = {}
+        self._camera_locks: dict[str, asyncio.Lock] = {}
+        self._capture_slots = asyncio.Semaphore(max(max_camera_captures, 1))
+        self.hits: int = 0
+        self.misses: int = 0
+        self.refreshes: int = 0
+        self.joined: int = 0
+        self.capture_waits: int = 0
+        # last commanded preset per camera, assumed to be where it still is
+        self.ptz_positions: dict[str, str | int] = {}
+        self._ptz_returns: dict[str, asyncio.TimerHandle] = {}
+        self._ptz_return_tasks: set[asyncio.Task[None]] = set()
+        self.ptz_moves: int = 0
+        self.ptz_skipped: int = 0
+        self.ptz_returns: int = 0
+
+    @staticmethod
+    def key(source: str, **variations: Any) -> str:
+        return json.dumps([source, variations], sort_keys=True, default=str)
+
+    async def fetch(self, key: str, capture: Callable[[], Awaitable[Path | None]], fresh: bool = False) -> Path | None:
+        """Reuse media captured within the TTL, unless a fresh capture is demanded"""
+        if self._entries is not None and not fresh:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self.hits += 1
+                _LOGGER.debug("SUPERNOTIFY Reusing cached media %s for %s", cached, key)
+                return cached
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.joined += 1
+            _LOGGER.debug("SUPERNOTIFY Joining in flight media capture for %s", key)
+            return await asyncio.shield(inflight)
+        if fresh:
+            self.refreshes += 1
+        else:
+            self.misses += 1
+        future: asyncio.Future[Path | None] = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        path: Path | None = None
+        try:
+            path = await capture()
+            if path is not None and self._entries is not None:
+                self._entries[key] = path
+        finally:
+            del self._inflight[key]
+            # waiters get nothing rather than the failure if the capture raised or was cancelled
+            future.set_result(path)
+        return path
+
+    @contextlib.asynccontextmanager
+    async def camera_capture(self, camera_entity_id: str) -> AsyncIterator[None]:
+        """Hold the camera, including its PTZ position, and one of the global capture slots"""
+        lock = self._camera_locks.setdefault(camera_entity_id, asyncio.Lock())
+        if lock.locked() or self._capture_slots.locked():
+            self.capture_waits += 1
+        async with lock, self._capture_slots:
+            yield
+
+    async def move_ptz(self, camera_entity_id: str, preset: str | int, move: Callable[[], Awaitable[bool]]) -> bool:
+        """Move the camera unless already at the preset, returning True if it moved. Call with the camera held"""
+        self.cancel_ptz_return(camera_entity_id)
+        if self.ptz_positions.get(camera_entity_id) == preset:
+            self.ptz_skipped += 1
+            _LOGGER.debug("SUPERNOTIFY Camera %s already at PTZ preset %s", camera_entity_id, preset)
+            return False
+        if await move():
+            self.ptz_positions[camera_entity_id] = preset
+            self.ptz_moves += 1
+            return True
+        # position unknown after a failed move
+        self.ptz_positions.pop(camera_entity_id, None)
+        return False
+
+    def schedule_ptz_return(
+        self, camera_entity_id: str, preset: str | int, delay: float, move: Callable[[], Awaitable[bool]]
+    ) -> None:
+        """Move back to the default preset once the camera has been left alone for the delay"""
+        self.cancel_ptz_return(camera_entity_id)
+        if self.ptz_positions.get(camera_entity_id) == preset:
+            return
+        self._ptz_returns[camera_entity_id] = asyncio.get_running_loop().call_later(
+            max(delay, 0), self._start_ptz_return, camera_entity_id, preset, move
+        )
+
+    def cancel_ptz_return(self, camera_entity_id: str) -> None:
+        handle = self._ptz_returns.pop(camera_entity_id, None)
+        if handle is not None:
+            handle.cancel()
+
+    def _start_ptz_return(self, camera_entity_id: str, preset: str | int, move: Callable[[], Awaitable[bool]]) -> None:
+        self._ptz_returns.pop(camera_entity_id, None)
+        task = asyncio.get_running_loop().create_task(self._ptz_return(camera_entity_id, preset, move))
+        self._ptz_return_tasks.add(task)
+        task.add_done_callback(self._ptz_return_tasks.discard)
+
+    async def _ptz_return(self, camera_entity_id: str, preset: str | int, move: Callable[[], Awaitable[bool]]) -> None:
+        async with self.camera_capture(camera_entity_id):
+            if camera_entity_id in self._ptz_returns or self.ptz_positions.get(camera_entity_id) == preset:
+                # another capture came along while waiting for the camera, and will return it later
+                return
+            if await self.move_ptz(camera_entity_id, preset, move):
+                self.ptz_returns += 1
+
+    def stop(self) -> None:
+        for handle in self._ptz_returns.values():
+            handle.cancel()
+        self._ptz_returns.clear()
+        for task in self._ptz_return_tasks:
+            task.cancel()
+
+    def attributes(self) -> dict[str, Any]:
+        return {
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "joined": self.joined,
+            "capture_waits": self.capture_waits,
+            "max_camera_captures": self.max_camera_captures,
+            "ptz_positions": dict(self.ptz_positions),
+            "ptz_moves": self.ptz_moves,
+            "ptz_skipped": self.ptz_skipped,
+            "ptz_returns": self.ptz_returns,
+        }
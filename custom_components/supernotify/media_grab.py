@@ -1,6 +1,8 @@
 import asyncio
 import io
 import logging
+import os
+import tempfile
 import time
 from http import HTTPStatus
 from io import BytesIO
@@ -19,6 +21,10 @@ from custom_components.supernotify import (
     CONF_ALT_CAMERA,
     CONF_CAMERA,
     CONF_DEVICE_TRACKER,
+    CONF_FORMAT,
+    CONF_MAX_HEIGHT,
+    CONF_MAX_WIDTH,
+    CONF_QUALITY,
     PTZ_METHOD_FRIGATE,
     PTZ_METHOD_ONVIF,
 )
@@ -29,6 +35,86 @@ if TYPE_CHECKING:
 
 _LOGGER = logging.getLogger(__name__)
 
+# metadata that upsets MIMEImage or leaks camera details, e.g. custom CCTV comments
+IMAGE_METADATA_KEYS = ("comment", "exif", "xmp", "XML:com.adobe.xmp", "photoshop")
+
+SNAPSHOT_DEFAULT_CONNECT_TIMEOUT = 5
+SNAPSHOT_DEFAULT_READ_TIMEOUT = 10
+SNAPSHOT_DEFAULT_TOTAL_TIMEOUT = 30
+SNAPSHOT_DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+SNAPSHOT_CHUNK_SIZE = 64 * 1024
+CAMERA_POLL_INITIAL = 0.05
+CAMERA_POLL_MAX = 1.0
+MEDIA_PROFILE_UNBOUNDED = 100000
+MEDIA_PROFILE_EXTENSIONS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp"}
+
+
+def reencode_image(
+    content: bytes, image_format: str | None = None, jpeg_opts: dict[str, Any] | None = None
+) -> tuple[bytes, str | None]:
+    """Strip metadata and apply any JPEG options, keeping the original bytes if neither needed. Blocking"""
+    with Image.open(io.BytesIO(content)) as image:
+        image_format = image_format or image.format
+        apply_opts = bool(jpeg_opts) and image_format == "JPEG"
+        if not apply_opts and not any(key in image.info for key in IMAGE_METADATA_KEYS):
+            return content, image_format
+        # encoders only carry over metadata found in info, so no need to copy pixels to a clean image
+        image.info = {}
+        buffer = BytesIO()
+        image.save(buffer, image_format, **(jpeg_opts if apply_opts and jpeg_opts else {}))
+        return buffer.getvalue(), image_format
+
+
+def finish_snapshot(
+    part_path: Path, image_path: Path, image_format: str | None, jpeg_opts: dict[str, Any] | None = None
+) -> None:
+    """Re-encode a downloaded snapshot if needed and move it into place. Blocking"""
+    try:
+        original = part_path.read_bytes()
+        content, _ = reencode_image(original, image_format, jpeg_opts)
+        if content is original:
+            part_path.replace(image_path)
+        else:
+            image_path.write_bytes(content)
+    finally:
+        part_path.unlink(missing_ok=True)
+
+
+def derive_image(source: Path, profile: dict[str, Any], suffix: str) -> Path:
+    """Smaller copy of an image for a delivery's media profile, saved alongside it. Blocking
+
+    The original is kept if the copy would be no smaller and in the same format. Snapshots are
+    shared between notifications, so the copy is written under a temporary name and moved into
+    place, and one already in place is reused
+    """
+    max_size = (profile.get(CONF_MAX_WIDTH) or MEDIA_PROFILE_UNBOUNDED, profile.get(CONF_MAX_HEIGHT) or MEDIA_PROFILE_UNBOUNDED)
+    with Image.open(source) as image:
+        original_format = image.format
+        image_format = profile.get(CONF_FORMAT) or original_format or "JPEG"
+        target = source.with_name(f"{source.stem}_{suffix}.{MEDIA_PROFILE_EXTENSIONS.get(image_format, 'img')}")
+        if target.exists():
+            return target
+        # for JPEG, thumbnail decodes in draft mode at a reduced scale rather than decoding every pixel
+        image.thumbnail(max_size)
+        derived = image
+        if image_format == "JPEG" and derived.mode not in ("RGB", "L"):
+            derived = derived.convert("RGB")
+        derived.info = {}
+        opts: dict[str, Any] = {}
+        if profile.get(CONF_QUALITY) and image_format in ("JPEG", "WEBP"):
+            opts["quality"] = profile[CONF_QUALITY]
+        fd, part_name = tempfile.mkstemp(dir=source.parent, prefix=f"{target.name}.", suffix=".part")
+        os.close(fd)
+        part = Path(part_name)
+        try:
+            derived.save(part, image_format, **opts)
+            if image_format == original_format and part.stat().st_size >= source.stat().st_size:
+                return source
+            part.replace(target)
+        finally:
+            part.unlink(missing_ok=True)
+    return target
+
 
 async def snapshot_from_url(
     hass: HomeAssistant,
@@ -36,10 +122,15 @@ async def snapshot_from_url(
     notification_id: str,
     media_path: Path,
     hass_base_url: str | None,
-    remote_timeout: int = 15,
+    connect_timeout: float = SNAPSHOT_DEFAULT_CONNECT_TIMEOUT,
+    read_timeout: float = SNAPSHOT_DEFAULT_READ_TIMEOUT,
+    total_timeout: float = SNAPSHOT_DEFAULT_TOTAL_TIMEOUT,
+    max_bytes: int = SNAPSHOT_DEFAULT_MAX_BYTES,
     jpeg_opts: dict[str, Any] | None = None,
 ) -> Path | None:
+    """Stream a snapshot to disk, refusing anything that isn't a still image or is too large"""
     hass_base_url = hass_base_url or ""
+    part_path: Path | None = None
     try:
         media_dir: anyio.Path = anyio.Path(media_path) / "snapshot"
         await media_dir.mkdir(parents=True, exist_ok=True)
@@ -49,10 +140,14 @@ async def snapshot_from_url(
         else:
             image_url = f"{hass_base_url}{snapshot_url}"
         websession = async_get_clientsession(hass)
-        r = await websession.get(image_url, timeout=ClientTimeout(total=remote_timeout))
-        if r.status != HTTPStatus.OK:
-            _LOGGER.warning("SUPERNOTIFY Unable to retrieve %s: %s", image_url, r.status)
-        else:
+        # overall cap too, so a server trickling data just inside the read timeout can't hold on
+        timeout = ClientTimeout(
+            total=total_timeout, connect=connect_timeout, sock_connect=connect_timeout, sock_read=read_timeout
+        )
+        async with websession.get(image_url, timeout=timeout) as r:
+            if r.status != HTTPStatus.OK:
+                _LOGGER.warning("SUPERNOTIFY Unable to retrieve %s: %s", image_url, r.status)
+                return None
             if r.content_type in ("image/jpeg", "image/jpg"):
                 media_ext = "jpg"
                 image_format = "JPEG"
@@ -62,34 +157,46 @@ async def snapshot_from_url(
             elif r.content_type == "image/gif":
                 media_ext = "gif"
                 image_format = "GIF"
-            else:
+            elif r.content_type.startswith("image/"):
                 _LOGGER.info("SUPERNOTIFY Unexpected MIME type %s from snap of %s", r.content_type, image_url)
                 media_ext = "img"
                 image_format = None
+            else:
+                # e.g. an MJPEG stream or web page, which would never end or never be an image
+                _LOGGER.warning("SUPERNOTIFY Refusing snapshot of %s with MIME type %s", image_url, r.content_type)
+                return None
+            if r.content_length is not None and r.content_length > max_bytes:
+                _LOGGER.warning(
+                    "SUPERNOTIFY Refusing snapshot of %s, %s bytes exceeds %s", image_url, r.content_length, max_bytes
+                )
+                return None
 
-            # TODO: configure image rewrite
             image_path: Path = Path(media_dir) / f"{notification_id}.{media_ext}"
-            image: Image.Image = Image.open(io.BytesIO(await r.content.read()))
-            # rewrite to remove metadata, incl custom CCTV comments that confusie python MIMEImage
-            clean_image: Image.Image = Image.new(image.mode, image.size)
-            clean_image.putdata(image.getdata())
-            buffer = BytesIO()
-            img_args = {}
-            if image_format == "JPEG" and jpeg_opts:
-                img_args.update(jpeg_opts)
-            clean_image.save(buffer, image_format, **img_args)
-            async with aiofiles.open(image_path, "wb") as file:
-                await file.write(buffer.getbuffer())
-            _LOGGER.debug("SUPERNOTIFY Fetched image from %s to %s", image_url, image_path)
-            return image_path
+            part_path = image_path.with_name(f"{image_path.name}.part")
+            received = 0
+            async with aiofiles.open(part_path, "wb") as file:
+                async for chunk in r.content.iter_chunked(SNAPSHOT_CHUNK_SIZE):
+                    received += len(chunk)
+                    if received > max_bytes:
+                        _LOGGER.warning("SUPERNOTIFY Abandoning snapshot of %s after %s bytes", image_url, received)
+                        return None
+                    await file.write(chunk)
+
+        await hass.async_add_executor_job(finish_snapshot, part_path, image_path, image_format, jpeg_opts)
+        part_path = None
+        _LOGGER.debug("SUPERNOTIFY Fetched %s bytes from %s to %s", received, image_url, image_path)
+        return image_path
     except Exception as e:
         _LOGGER.error("SUPERNOTIFY Image snap fail: %s", e)
+    finally:
+        if part_path is not None:
+            await anyio.Path(part_path).unlink(missing_ok=True)
     return None
 
 
 async def move_camera_to_ptz_preset(
     hass: HomeAssistant, camera_entity_id: str, preset: str | int, method: str = PTZ_METHOD_ONVIF
-) -> None:
+) -> bool:
     try:
         _LOGGER.info("SUPERNOTIFY Executing PTZ by %s to %s for %s", method, preset, camera_entity_id)
         if method == PTZ_METHOD_FRIGATE:
@@ -112,8 +219,11 @@ async def move_camera_to_ptz_preset(
             )
         else:
             _LOGGER.warning("SUPERNOTIFY Unknown PTZ method %s", method)
+            return False
+        return True
     except Exception as e:
         _LOGGER.warning("SUPERNOTIFY Unable to move %s to ptz preset %s: %s", camera_entity_id, preset, e)
+        return False
 
 
 async def snap_image(
@@ -129,25 +239,20 @@ async def snap_image(
         image_entity: ImageEntity | None = None
         if context.hass:
             image_entity = context.hass.data["image"].get_entity(entity_id)
-        if image_entity:
+        if image_entity and context.hass:
             bitmap: bytes | None = await image_entity.async_image()
             if bitmap is None:
                 _LOGGER.warning("SUPERNOTIFY Empty bitmap from image entity %s", entity_id)
             else:
-                image: Image.Image = Image.open(io.BytesIO(bitmap))
                 media_dir: anyio.Path = anyio.Path(media_path) / "image"
                 await media_dir.mkdir(parents=True, exist_ok=True)
 
-                media_ext: str = image.format.lower() if image.format else "img"
+                content, image_format = await context.hass.async_add_executor_job(reencode_image, bitmap, None, jpeg_opts)
+                media_ext: str = image_format.lower() if image_format else "img"
                 timed: str = str(time.time()).replace(".", "_")
                 image_path = anyio.Path(media_dir) / f"{notification_id}_{timed}.{media_ext}"
-                buffer = BytesIO()
-                img_args = {}
-                if media_ext in ("jpg", "jpeg") and jpeg_opts:
-                    img_args.update(jpeg_opts)
-                image.save(buffer, image.format, **img_args)
                 async with aiofiles.open(await image_path.resolve(), "wb") as file:
-                    await file.write(buffer.getbuffer())
+                    await file.write(content)
         else:
             _LOGGER.warning("SUPERNOTIFY Unable to find image entity %s", entity_id)
     except Exception as e:
@@ -160,7 +265,7 @@ async def snap_camera(
     hass: HomeAssistant,
     camera_entity_id: str,
     media_path: Path,
-    max_camera_wait: int = 20,
+    max_camera_wait: float = 20,
     jpeg_opts: dict[str, Any] | None = None,
 ) -> Path | None:
     image_path: Path | None = None
@@ -175,16 +280,21 @@ async def snap_camera(
         await media_dir.mkdir(parents=True, exist_ok=True)
         timed = str(time.time()).replace(".", "_")
         image_path = Path(media_dir) / f"{camera_entity_id}_{timed}.jpg"
-        await hass.services.async_call(
-            "camera", "snapshot", service_data={"entity_id": camera_entity_id, "filename": image_path}
-        )
-
-        # give async service time
-        cutoff_time = time.time() + max_camera_wait
-        while time.time() < cutoff_time and not image_path.exists():
-            _LOGGER.info("Image file not available yet at %s, pausing", image_path)
-            await asyncio.sleep(1)
+        started = time.monotonic()
+        # camera.snapshot writes the file before returning when called blocking, bounded so a hung
+        # camera can't hold on to its capture lock
+        async with asyncio.timeout(max_camera_wait):
+            await hass.services.async_call(
+                "camera", "snapshot", service_data={"entity_id": camera_entity_id, "filename": image_path}, blocking=True
+            )
+        if not await wait_for_file(image_path, started + max_camera_wait):
+            _LOGGER.warning("SUPERNOTIFY Image file not available after %s secs at %s", max_camera_wait, image_path)
+            return None
+        _LOGGER.debug("SUPERNOTIFY Snapped %s in %.3f secs", camera_entity_id, time.monotonic() - started)
 
+    except TimeoutError:
+        _LOGGER.warning("SUPERNOTIFY Camera %s snapshot timed out after %s secs", camera_entity_id, max_camera_wait)
+        image_path = None
     except Exception as e:
         _LOGGER.warning("Failed to snap avail camera %s to %s: %s", camera_entity_id, image_path, e)
         image_path = None
@@ -192,6 +302,20 @@ async def snap_camera(
     return image_path
 
 
+async def wait_for_file(path: Path, deadline: float) -> bool:
+    """Poll for a file with backoff, for camera integrations that finish writing after the service returns"""
+    file = anyio.Path(path)
+    delay = CAMERA_POLL_INITIAL
+    while not await file.exists():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        _LOGGER.debug("SUPERNOTIFY Image file not available yet at %s, pausing %s secs", path, delay)
+        await asyncio.sleep(min(delay, remaining))
+        delay = min(delay * 2, CAMERA_POLL_MAX)
+    return True
+
+
 def select_avail_camera(hass: HomeAssistant, cameras: dict[str, Any], camera_entity_id: str) -> str | None:
     avail_camera_entity_id: str | None = None
 
@@ -0,0 +1,161 @@
+"""Bounded retention of snapshot, image and camera media, purged a little at a time"""
+
+import logging
+import os
+import threading
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+_LOGGER = logging.getLogger(__name__)
+
+MEDIA_SUBDIRS = ("snapshot", "image", "camera")
+MEDIA_DEFAULT_MAX_AGE_DAYS = 30
+MEDIA_DEFAULT_INTERVAL = 300
+MEDIA_DEFAULT_TIME_BUDGET = 0.25
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+class MediaHousekeeper:
+    """Remove media past a maximum age, then oldest first until under a total size cap
+
+    Each step does at most a time budget's worth of scanning or deleting, resuming where the last
+    left off, so a large media directory is never walked in one go. Media referenced by a
+    notification still in the archive is kept. Blocking, so call steps from an executor
+    """
+
+    def __init__(
+        self,
+        media_path: Path,
+        max_age_days: int | None = MEDIA_DEFAULT_MAX_AGE_DAYS,
+        max_size_mb: int | None = None,
+        time_budget: float = MEDIA_DEFAULT_TIME_BUDGET,
+        protect_days: int = 0,
+    ) -> None:
+        self.media_path = media_path
+        self.max_age_days = max_age_days
+        self.max_bytes: int | None = max_size_mb * 1024 * 1024 if max_size_mb else None
+        self.time_budget = time_budget
+        self.protect_days = protect_days
+        # media reference to wall clock time until which it must be kept
+        self.references: dict[str, float] = {}
+        self.cycles: int = 0
+        self.purged: int = 0
+        self.purged_bytes: int = 0
+        self.protected: int = 0
+        self.total_bytes: int = 0
+        self.files: int = 0
+        self._lock = threading.Lock()
+        self._scan: Iterator[os.DirEntry[str]] | None = None
+        self._inventory: list[tuple[float, int, str]] = []
+        self._doomed: list[tuple[int, str]] | None = None
+
+    @staticmethod
+    def reference(path: Path | str) -> str:
+        """Media subdirectory and file name, the same however the media path was reached"""
+        path = Path(path)
+        return f"{path.parent.name}/{path.name}"
+
+    def protect(self, path: Path | str) -> None:
+        if self.protect_days > 0:
+            with self._lock:
+                self.references[self.reference(path)] = time.time() + self.protect_days * SECONDS_PER_DAY
+
+    def dump(self) -> dict[str, float]:
+        now = time.time()
+        with self._lock:
+            return {p: until for p, until in self.references.items() if until > now}
+
+    def restore(self, references: dict[str, float]) -> int:
+        now = time.time()
+        with self._lock:
+            self.references.update({p: until for p, until in references.items() if until > now})
+            return len(self.references)
+
+    def _entries(self) -> Iterator[os.DirEntry[str]]:
+        for subdir in MEDIA_SUBDIRS:
+            directory = self.media_path / subdir
+            if not directory.is_dir():
+                continue
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_file(follow_symlinks=False):
+                        yield entry
+
+    def step(self) -> bool:
+        """Scan or purge until the time budget is spent, returning True when a full cycle completes"""
+        deadline = time.monotonic() + self.time_budget
+        if self._doomed is None:
+            if self._scan is None:
+                self._scan = self._entries()
+                self._inventory = []
+            for entry in self._scan:
+                try:
+                    stat = entry.stat(follow_symlinks=False)
+                    self._inventory.append((stat.st_mtime, stat.st_size, entry.path))
+                except OSError:
+                    pass  # removed since listed
+                if time.monotonic() > deadline:
+                    return False
+            self._scan = None
+            self._doomed = self._plan()
+        while self._doomed:
+            size, path = self._doomed.pop()
+            try:
+                Path(path).unlink()
+                self.purged += 1
+                self.purged_bytes += size
+                self.total_bytes -= size
+                self.files -= 1
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                _LOGGER.warning("SUPERNOTIFY Unable to purge media %s: %s", path, e)
+            if self._doomed and time.monotonic() > deadline:
+                return False
+        self._doomed = None
+        self.cycles += 1
+        return True
+
+    def _plan(self) -> list[tuple[int, str]]:
+        """Choose media to delete, oldest last so they're popped first"""
+        now = time.time()
+        with self._lock:
+            self.references = {p: until for p, until in self.references.items() if until > now}
+            referenced = set(self.references)
+        inventory = sorted(self._inventory)
+        self._inventory = []
+        self.files = len(inventory)
+        self.total_bytes = sum(size for _, size, _ in inventory)
+        age_cutoff = now - self.max_age_days * SECONDS_PER_DAY if self.max_age_days else None
+        remaining = self.total_bytes
+        doomed: list[tuple[int, str]] = []
+        protected = 0
+        for mtime, size, path in inventory:
+            expired = age_cutoff is not None and mtime < age_cutoff
+            oversize = self.max_bytes is not None and remaining > self.max_bytes
+            if not expired and not oversize:
+                break
+            if self.reference(path) in referenced:
+                protected += 1
+                continue
+            doomed.append((size, path))
+            remaining -= size
+        self.protected = protected
+        if doomed:
+            _LOGGER.info("SUPERNOTIFY Purging %s of %s media files, %s protected", len(doomed), len(inventory), protected)
+        doomed.reverse()
+        return doomed
+
+    def attributes(self) -> dict[str, Any]:
+        return {
+            "files": self.files,
+            "total_bytes": self.total_bytes,
+            "purged": self.purged,
+            "purged_bytes": self.purged_bytes,
+            "protected": self.protected,
+            "cycles": self.cycles,
+            "max_age_days": self.max_age_days,
+            "max_bytes": self.max_bytes,
+        }
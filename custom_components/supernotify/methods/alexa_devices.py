@@ -31,6 +31,8 @@ class AlexaDevicesDeliveryMethod(DeliveryMethod):
     """
 
     method = METHOD_ALEXA
+    # an Echo speaks one announcement at a time
+    parallel_safe = False
 
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         kwargs.setdefault(CONF_DEFAULT, {})
@@ -29,6 +29,8 @@ class AlexaMediaPlayerDeliveryMethod(DeliveryMethod):
     """
 
     method = METHOD_ALEXA_MEDIA_PLAYER
+    # an Echo speaks one announcement at a time
+    parallel_safe = False
 
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         kwargs.setdefault(CONF_DEFAULT, {})
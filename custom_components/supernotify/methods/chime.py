@@ -82,6 +82,8 @@ class ChimeTargetConfig:
 
 class ChimeDeliveryMethod(DeliveryMethod):
     method = METHOD_CHIME
+    # chimes, sirens and speakers ring one envelope at a time
+    parallel_safe = False
 
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         kwargs.setdefault(CONF_TARGETS_REQUIRED, False)
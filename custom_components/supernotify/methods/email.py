@@ -71,7 +71,7 @@ class EmailDeliveryMethod(DeliveryMethod):
             if footer and action_data.get(ATTR_MESSAGE):
                 action_data[ATTR_MESSAGE] = f"{action_data[ATTR_MESSAGE]}\n\n{footer}"
 
-            image_path: Path | None = await envelope.grab_image()
+            image_path: Path | None = await envelope.grab_image(self.media_profile(envelope.delivery_name))
             if image_path:
                 action_data.setdefault("data", {})
                 action_data["data"]["images"] = [str(image_path)]
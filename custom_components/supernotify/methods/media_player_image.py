@@ -19,6 +19,8 @@ class MediaPlayerImageDeliveryMethod(DeliveryMethod):
     """Requires Alex Media Player integration"""
 
     method = METHOD_MEDIA
+    # a media player shows one image at a time
+    parallel_safe = False
 
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         kwargs.setdefault(CONF_DEFAULT, {})
@@ -1,20 +1,26 @@
 import asyncio
 import datetime as dt
+import hashlib
+import json
 import logging
-import uuid
+import time
+from functools import partial
 from pathlib import Path
 from traceback import format_exception
 from typing import Any
 
 import voluptuous as vol
 from homeassistant.components.notify.const import ATTR_DATA, ATTR_TARGET
-from homeassistant.const import CONF_ENABLED, CONF_NAME, CONF_TARGET, STATE_HOME, STATE_NOT_HOME
+from homeassistant.const import CONF_ENABLED, CONF_NAME, CONF_TARGET, CONF_URL, STATE_HOME, STATE_NOT_HOME
 from homeassistant.helpers.template import Template
+from homeassistant.util.ulid import ulid_at_time
 from jinja2 import TemplateError
 from voluptuous import humanize
 
 from custom_components.supernotify import (
     ACTION_DATA_SCHEMA,
+    ARCHIVE_PROFILE_FORENSIC,
+    ARCHIVE_PROFILE_SUMMARY,
     ATTR_ACTION_GROUPS,
     ATTR_ACTIONS,
     ATTR_DEBUG,
@@ -26,6 +32,7 @@ from custom_components.supernotify import (
     ATTR_MEDIA_CAMERA_ENTITY_ID,
     ATTR_MEDIA_CAMERA_PTZ_PRESET,
     ATTR_MEDIA_CLIP_URL,
+    ATTR_MEDIA_FRESH,
     ATTR_MEDIA_SNAPSHOT_URL,
     ATTR_MESSAGE_HTML,
     ATTR_PRIORITY,
@@ -33,8 +40,10 @@ from custom_components.supernotify import (
     ATTR_SCENARIOS_APPLY,
     ATTR_SCENARIOS_CONSTRAIN,
     ATTR_SCENARIOS_REQUIRE,
+    CONF_CONNECT_TIMEOUT,
     CONF_DATA,
     CONF_DELIVERY,
+    CONF_MEDIA_MAX_SNAPSHOT_MB,
     CONF_MESSAGE,
     CONF_OCCUPANCY,
     CONF_OPTIONS,
@@ -43,11 +52,12 @@ from custom_components.supernotify import (
     CONF_PTZ_DELAY,
     CONF_PTZ_METHOD,
     CONF_PTZ_PRESET_DEFAULT,
+    CONF_PTZ_RETURN_DELAY,
+    CONF_READ_TIMEOUT,
     CONF_RECIPIENTS,
-    CONF_SELECTION,
     CONF_TITLE,
+    CONF_TOTAL_TIMEOUT,
     DELIVERY_SELECTION_EXPLICIT,
-    DELIVERY_SELECTION_FIXED,
     DELIVERY_SELECTION_IMPLICIT,
     OCCUPANCY_ALL,
     OCCUPANCY_ALL_IN,
@@ -59,9 +69,7 @@ from custom_components.supernotify import (
     OCCUPANCY_ONLY_OUT,
     PRIORITY_MEDIUM,
     PRIORITY_VALUES,
-    SCENARIO_DEFAULT,
     SCENARIO_NULL,
-    SELECTION_BY_SCENARIO,
     STRICT_ACTION_DATA_SCHEMA,
     ConditionVariables,
     MessageOnlyPolicy,
@@ -79,10 +87,57 @@ from custom_components.supernotify.scenario import Scenario
 
 from .common import ensure_dict, ensure_list
 from .configuration import Context
-from .media_grab import move_camera_to_ptz_preset, select_avail_camera, snap_camera, snap_image, snapshot_from_url
+from .media_cache import PTZ_DEFAULT_RETURN_DELAY
+from .media_grab import (
+    SNAPSHOT_DEFAULT_CONNECT_TIMEOUT,
+    SNAPSHOT_DEFAULT_MAX_BYTES,
+    SNAPSHOT_DEFAULT_READ_TIMEOUT,
+    SNAPSHOT_DEFAULT_TOTAL_TIMEOUT,
+    derive_image,
+    move_camera_to_ptz_preset,
+    select_avail_camera,
+    snap_camera,
+    snap_image,
+    snapshot_from_url,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
+# fields kept by the standard archive profile, leaving out debug trace, resolved targets and occupancy
+ARCHIVE_STANDARD_FIELDS = (
+    "id",
+    "created",
+    "priority",
+    "_message",
+    "_title",
+    "target",
+    "data",
+    "media",
+    "actions",
+    "action_groups",
+    "delivery_overrides",
+    "applied_scenario_names",
+    "required_scenario_names",
+    "constrain_scenario_names",
+    "selected_delivery_names",
+    "selected_scenario_names",
+    "snapshot_image_path",
+    "globally_disabled",
+    "delivered",
+    "errored",
+    "skipped",
+    "delivery_error",
+    "delivery_errors",
+)
+ARCHIVE_STANDARD_ENVELOPE_FIELDS = ("delivery_name", "targets", "delivered", "errored", "skipped", "delivery_error")
+
+
+def envelope_projection(envelope: Envelope) -> dict[str, Any]:
+    projected = {k: v for k, v in envelope.__dict__.items() if k in ARCHIVE_STANDARD_ENVELOPE_FIELDS}
+    projected["calls"] = len(envelope.calls)
+    projected["failedcalls"] = [call.contents() for call in envelope.failed_calls]
+    return projected
+
 
 class Notification(ArchivableObject):
     def __init__(
@@ -100,8 +155,11 @@ class Notification(ArchivableObject):
         action_data = action_data or {}
         self.target: list[str] = ensure_list(target)
         self._title: str | None = title
-        self.id = str(uuid.uuid1())
+        # time sortable, so archive index range queries are id range scans
+        self.id = ulid_at_time(self.created.timestamp())
         self.snapshot_image_path: Path | None = None
+        # smaller copies of the snapshot for media profiles, by profile digest
+        self.media_derivatives: dict[str, Path] = {}
         self.delivered: int = 0
         self.errored: int = 0
         self.skipped: int = 0
@@ -138,6 +196,9 @@ class Notification(ArchivableObject):
         self.globally_disabled: bool = False
         self.occupancy: dict[str, list[dict[str, Any]]] = {}
         self.condition_variables: ConditionVariables | None = None
+        # outcome of delivery conditions by condition key, so identical conditions evaluated once
+        self.condition_results: dict[str, bool] = {}
+        self._media_lock: asyncio.Lock = asyncio.Lock()
 
     async def initialize(self) -> None:
         """Async post-construction initialization"""
@@ -208,41 +269,15 @@ class Notification(ArchivableObject):
             self.action_groups = action_groups
 
     def select_deliveries(self) -> list[str]:
-        scenario_enable_deliveries: list[str] = []
-        default_enable_deliveries: list[str] = []
-        scenario_disable_deliveries: list[str] = []
-
-        if self.delivery_selection != DELIVERY_SELECTION_FIXED:
-            for scenario_name in self.enabled_scenarios:
-                scenario_enable_deliveries.extend(self.context.delivery_by_scenario.get(scenario_name, ()))
-            if self.delivery_selection == DELIVERY_SELECTION_IMPLICIT:
-                default_enable_deliveries = self.context.delivery_by_scenario.get(SCENARIO_DEFAULT, [])
-
-        override_enable_deliveries = []
-        override_disable_deliveries = []
-
-        for delivery, delivery_override in self.delivery_overrides.items():
-            if (delivery_override is None or delivery_override.get(CONF_ENABLED, True)) and delivery in self.context.deliveries:
-                override_enable_deliveries.append(delivery)
-            elif delivery_override is not None and not delivery_override.get(CONF_ENABLED, True):
-                override_disable_deliveries.append(delivery)
-
-        if self.delivery_selection != DELIVERY_SELECTION_FIXED:
-            scenario_disable_deliveries = [
-                d
-                for d, dc in self.context.deliveries.items()
-                if dc.get(CONF_SELECTION) == SELECTION_BY_SCENARIO and d not in scenario_enable_deliveries
-            ]
-        all_enabled = list(set(scenario_enable_deliveries + default_enable_deliveries + override_enable_deliveries))
-        all_disabled = scenario_disable_deliveries + override_disable_deliveries
+        routing = self.context.delivery_router.select(self.enabled_scenarios, self.delivery_selection, self.delivery_overrides)
         if self.debug_trace:
-            self.debug_trace.delivery_selection["override_disable_deliveries"] = override_disable_deliveries
-            self.debug_trace.delivery_selection["override_enable_deliveries"] = override_enable_deliveries
-            self.debug_trace.delivery_selection["scenario_enable_deliveries"] = scenario_enable_deliveries
-            self.debug_trace.delivery_selection["default_enable_deliveries"] = default_enable_deliveries
-            self.debug_trace.delivery_selection["scenario_disable_deliveries"] = scenario_disable_deliveries
+            self.debug_trace.delivery_selection["override_disable_deliveries"] = list(routing.override_disable_deliveries)
+            self.debug_trace.delivery_selection["override_enable_deliveries"] = list(routing.override_enable_deliveries)
+            self.debug_trace.delivery_selection["scenario_enable_deliveries"] = list(routing.scenario_enable_deliveries)
+            self.debug_trace.delivery_selection["default_enable_deliveries"] = list(routing.default_enable_deliveries)
+            self.debug_trace.delivery_selection["scenario_disable_deliveries"] = list(routing.scenario_disable_deliveries)
 
-        return [d for d in all_enabled if d not in all_disabled]
+        return list(routing.selected)
 
     def default_media_from_actions(self) -> None:
         """If no media defined, look for iOS / Android actions that have media defined"""
@@ -345,21 +380,38 @@ class Notification(ArchivableObject):
             self.selected_delivery_names,
         )
 
-        for delivery in self.selected_delivery_names:
-            await self.call_delivery_method(delivery)
+        await self.call_delivery_methods(self.selected_delivery_names)
 
+        # fallbacks only evaluated once all the primary delivery results are in
         if self.delivered == 0 and self.errored == 0:
-            for delivery in self.context.fallback_by_default:
-                if delivery not in self.selected_delivery_names:
-                    await self.call_delivery_method(delivery)
+            await self.call_delivery_methods([
+                d for d in self.context.fallback_by_default if d not in self.selected_delivery_names
+            ])
 
         if self.delivered == 0 and self.errored > 0:
-            for delivery in self.context.fallback_on_error:
-                if delivery not in self.selected_delivery_names:
-                    await self.call_delivery_method(delivery)
+            await self.call_delivery_methods([
+                d for d in self.context.fallback_on_error if d not in self.selected_delivery_names
+            ])
 
         return self.delivered > 0
 
+    async def call_delivery_methods(self, deliveries: list[str]) -> None:
+        """Call each delivery in turn, or all at once if concurrent delivery configured
+
+        Each delivery has its own fault barrier in call_delivery_method, and the counters
+        are only updated between awaits, so concurrent deliveries can share them safely
+        """
+        if self.context.concurrent_delivery and len(deliveries) > 1:
+            results = await asyncio.gather(*(self.call_delivery_method(d) for d in deliveries), return_exceptions=True)
+            for delivery, result in zip(deliveries, results, strict=True):
+                if isinstance(result, BaseException):
+                    # last resort, call_delivery_method should already have caught this
+                    _LOGGER.warning("SUPERNOTIFY Concurrent delivery %s failed: %s", delivery, result)
+                    self.delivery_errors[delivery] = format_exception(result)
+        else:
+            for delivery in deliveries:
+                await self.call_delivery_method(delivery)
+
     async def call_delivery_method(self, delivery: str) -> None:
         try:
             delivery_method: DeliveryMethod = self.context.delivery_method(delivery)
@@ -370,40 +422,63 @@ class Notification(ArchivableObject):
                 _LOGGER.debug("SUPERNOTIFY Skipping delivery %s based on priority (%s)", delivery, self.priority)
                 self.skipped += 1
                 return
-            if not await delivery_method.evaluate_delivery_conditions(delivery_config, self.condition_variables):
+            if not await delivery_method.evaluate_delivery_conditions(
+                delivery_config, self.condition_variables, self.condition_results
+            ):
                 _LOGGER.debug("SUPERNOTIFY Skipping delivery %s based on conditions", delivery)
                 self.skipped += 1
                 return
 
             recipients = self.generate_recipients(delivery, delivery_method)
             envelopes = self.generate_envelopes(delivery, delivery_method, recipients)
-            for envelope in envelopes:
-                try:
-                    await delivery_method.deliver(envelope)
+            if delivery_method.concurrency > 1 and len(envelopes) > 1:
+                semaphore = asyncio.Semaphore(delivery_method.concurrency)
+
+                async def bounded_deliver(envelope: Envelope) -> Exception | None:
+                    async with semaphore:
+                        return await self.deliver_envelope(delivery_method, envelope)
+
+                failures = await asyncio.gather(*(bounded_deliver(e) for e in envelopes))
+            else:
+                failures = [await self.deliver_envelope(delivery_method, e) for e in envelopes]
+
+            # merge results in envelope order, whatever order they completed in
+            for envelope, failure in zip(envelopes, failures, strict=True):
+                if failure is not None:
+                    self.errored += 1
+                    envelope.delivery_error = format_exception(failure)
+                    self.undelivered_envelopes.append(envelope)
+                else:
                     self.delivered += envelope.delivered
                     self.errored += envelope.errored
                     if envelope.delivered:
                         self.delivered_envelopes.append(envelope)
                     else:
                         self.undelivered_envelopes.append(envelope)
-                except Exception as e2:
-                    _LOGGER.warning("SUPERNOTIFY Failed to deliver %s: %s", envelope.delivery_name, e2)
-                    _LOGGER.debug("SUPERNOTIFY %s", e2, exc_info=True)
-                    self.errored += 1
-                    envelope.delivery_error = format_exception(e2)
-                    self.undelivered_envelopes.append(envelope)
 
         except Exception as e:
             _LOGGER.warning("SUPERNOTIFY Failed to notify using %s: %s", delivery, e)
             _LOGGER.debug("SUPERNOTIFY %s delivery failure", delivery, exc_info=True)
             self.delivery_errors[delivery] = format_exception(e)
 
+    async def deliver_envelope(self, delivery_method: DeliveryMethod, envelope: Envelope) -> Exception | None:
+        """Deliver a single envelope, returning rather than raising any exception"""
+        try:
+            await delivery_method.deliver(envelope)
+        except Exception as e:
+            _LOGGER.warning("SUPERNOTIFY Failed to deliver %s: %s", envelope.delivery_name, e)
+            _LOGGER.debug("SUPERNOTIFY %s", e, exc_info=True)
+            return e
+        return None
+
     def hash(self) -> int:
-        return hash((self._message, self._title))
+        """Digest of message and title, stable across restarts unlike the builtin hash"""
+        digest = hashlib.blake2b(json.dumps([self._message, self._title], default=str).encode(), digest_size=8).digest()
+        return int.from_bytes(digest)
 
     def contents(self, minimal: bool = False) -> dict[str, Any]:
         """ArchiveableObject implementation"""
-        sanitized = {k: v for k, v in self.__dict__.items() if k not in ("context")}
+        sanitized = {k: v for k, v in self.__dict__.items() if k not in ("context", "_media_lock", "condition_results")}
         sanitized["delivered_envelopes"] = [e.contents(minimal=minimal) for e in self.delivered_envelopes]
         sanitized["undelivered_envelopes"] = [e.contents(minimal=minimal) for e in self.undelivered_envelopes]
         sanitized["enabled_scenarios"] = {k: v.contents(minimal=minimal) for k, v in self.enabled_scenarios.items()}
@@ -413,10 +488,44 @@ class Notification(ArchivableObject):
             del sanitized["debug_trace"]
         return sanitized
 
+    def projection(self, profile: str) -> dict[str, Any]:
+        """ArchiveableObject implementation"""
+        if profile == ARCHIVE_PROFILE_FORENSIC:
+            return self.contents()
+        if profile == ARCHIVE_PROFILE_SUMMARY:
+            return self.summary()
+        projected = {k: v for k, v in self.__dict__.items() if k in ARCHIVE_STANDARD_FIELDS}
+        projected["delivered_envelopes"] = [envelope_projection(e) for e in self.delivered_envelopes]
+        projected["undelivered_envelopes"] = [envelope_projection(e) for e in self.undelivered_envelopes]
+        projected["enabled_scenarios"] = list(self.enabled_scenarios)
+        return projected
+
+    @property
+    def forensic(self) -> bool:
+        """ArchiveableObject implementation"""
+        return bool(self.errored or self.delivery_errors or self.delivery_error)
+
     def base_filename(self) -> str:
         """ArchiveableObject implementation"""
         return f"{self.created.isoformat()[:16]}_{self.id}"
 
+    def summary(self) -> dict[str, Any]:
+        """ArchiveableObject implementation"""
+        return {
+            "id": self.id,
+            "created": self.created,
+            "priority": self.priority,
+            "delivered": self.delivered,
+            "errored": self.errored,
+            "skipped": self.skipped,
+            "deliveries": list(self.selected_delivery_names),
+            "scenarios": list(self.enabled_scenarios),
+            "targets": list(self.target),
+            "message": self._message,
+            "title": self._title,
+            "errors": list(self.delivery_errors),
+        }
+
     def delivery_data(self, delivery_name: str) -> dict[str, Any]:
         delivery_override = self.delivery_overrides.get(delivery_name)
         return delivery_override.get(CONF_DATA) if delivery_override else {}
@@ -582,21 +691,95 @@ class Notification(ArchivableObject):
             filtered_envelopes = [Envelope(delivery_name, self, data=envelope_data)]
         return filtered_envelopes
 
-    async def grab_image(self, delivery_name: str) -> Path | None:
-        snapshot_url = self.media.get(ATTR_MEDIA_SNAPSHOT_URL)
-        camera_entity_id = self.media.get(ATTR_MEDIA_CAMERA_ENTITY_ID)
+    async def grab_image(self, delivery_name: str, media_profile: dict[str, Any] | None = None) -> Path | None:
+        # concurrent deliveries share the one snapshot rather than each grabbing their own
+        async with self._media_lock:
+            image_path = await self._grab_image(delivery_name)
+            if image_path is None or not media_profile:
+                return image_path
+            return await self._derive_image(image_path, media_profile)
+
+    async def _derive_image(self, image_path: Path, media_profile: dict[str, Any]) -> Path:
+        """Generate the snapshot for a media profile once, for every delivery using that profile"""
+        digest = hashlib.blake2b(json.dumps(media_profile, sort_keys=True).encode(), digest_size=4).hexdigest()
+        derived = self.media_derivatives.get(digest)
+        if derived is not None:
+            return derived
+        if not self.context.hass:
+            return image_path
+        try:
+            derived = await self.context.hass.async_add_executor_job(derive_image, image_path, media_profile, digest)
+        except Exception as e:
+            _LOGGER.warning("SUPERNOTIFY Unable to apply media profile %s to %s: %s", media_profile, image_path, e)
+            derived = image_path
+        self.media_derivatives[digest] = derived
+        if self.context.media_housekeeper is not None:
+            self.context.media_housekeeper.protect(derived)
+        return derived
+
+    async def _grab_image(self, delivery_name: str) -> Path | None:
+        snapshot_url: str | None = self.media.get(ATTR_MEDIA_SNAPSHOT_URL)
+        camera_entity_id: str | None = self.media.get(ATTR_MEDIA_CAMERA_ENTITY_ID)
         delivery_config = self.delivery_data(delivery_name)
         jpeg_opts = self.media.get(ATTR_JPEG_OPTS, delivery_config.get(CONF_OPTIONS, {}).get(ATTR_JPEG_OPTS))
 
-        if not snapshot_url and not camera_entity_id:
+        source: str | None = snapshot_url or camera_entity_id
+        if not source:
             return None
 
-        image_path: Path | None = None
         if self.snapshot_image_path is not None:
             return self.snapshot_image_path
+        cache_key = self.context.media_cache.key(
+            source, ptz_preset=self.media.get(ATTR_MEDIA_CAMERA_PTZ_PRESET), jpeg_opts=jpeg_opts
+        )
+        image_path = await self.context.media_cache.fetch(
+            cache_key,
+            partial(self._capture_image, snapshot_url, camera_entity_id, jpeg_opts),
+            fresh=self.media.get(ATTR_MEDIA_FRESH, False),
+        )
+        if image_path is None:
+            _LOGGER.warning("SUPERNOTIFY No media available to attach (%s,%s)", snapshot_url, camera_entity_id)
+            return None
+        self.snapshot_image_path = image_path
+        if self.context.media_housekeeper is not None:
+            self.context.media_housekeeper.protect(image_path)
+        return image_path
+
+    def _snapshot_camera_config(self, snapshot_url: str, camera_entity_id: str | None) -> dict[str, Any]:
+        """Camera configuration for the notification's camera, or else whichever camera has the snapshot URL"""
+        if camera_entity_id and camera_entity_id in self.context.cameras:
+            return self.context.cameras[camera_entity_id]
+        for camera_config in self.context.cameras.values():
+            if camera_config.get(CONF_URL) == snapshot_url:
+                return camera_config
+        return {}
+
+    async def _capture_image(
+        self, snapshot_url: str | None, camera_entity_id: str | None, jpeg_opts: dict[str, Any] | None
+    ) -> Path | None:
+        image_path: Path | None = None
         if snapshot_url and self.context.media_path and self.context.hass:
+            camera_config = self._snapshot_camera_config(snapshot_url, camera_entity_id)
+            media_options = self.context.media_options
             image_path = await snapshot_from_url(
-                self.context.hass, snapshot_url, self.id, self.context.media_path, self.context.hass_internal_url, jpeg_opts
+                self.context.hass,
+                snapshot_url,
+                self.id,
+                self.context.media_path,
+                self.context.hass_internal_url,
+                connect_timeout=camera_config.get(
+                    CONF_CONNECT_TIMEOUT, media_options.get(CONF_CONNECT_TIMEOUT, SNAPSHOT_DEFAULT_CONNECT_TIMEOUT)
+                ),
+                read_timeout=camera_config.get(
+                    CONF_READ_TIMEOUT, media_options.get(CONF_READ_TIMEOUT, SNAPSHOT_DEFAULT_READ_TIMEOUT)
+                ),
+                total_timeout=camera_config.get(
+                    CONF_TOTAL_TIMEOUT, media_options.get(CONF_TOTAL_TIMEOUT, SNAPSHOT_DEFAULT_TOTAL_TIMEOUT)
+                ),
+                max_bytes=int(media_options[CONF_MEDIA_MAX_SNAPSHOT_MB] * 1024 * 1024)
+                if media_options.get(CONF_MEDIA_MAX_SNAPSHOT_MB)
+                else SNAPSHOT_DEFAULT_MAX_BYTES,
+                jpeg_opts=jpeg_opts,
             )
         elif camera_entity_id and camera_entity_id.startswith("image.") and self.context.hass and self.context.media_path:
             image_path = await snap_image(self.context, camera_entity_id, self.context.media_path, self.id, jpeg_opts)
@@ -618,27 +801,46 @@ class Notification(ArchivableObject):
                     camera_ptz_preset_default,
                     camera_delay,
                 )
-                if camera_ptz_preset:
-                    await move_camera_to_ptz_preset(
-                        self.context.hass, active_camera_entity_id, camera_ptz_preset, method=camera_ptz_method
+                # one capture per camera at a time, so concurrent PTZ moves can't fight
+                media_cache = self.context.media_cache
+                async with media_cache.camera_capture(active_camera_entity_id):
+                    # no need to move, or wait for the camera to settle, if already at the preset
+                    moved = camera_ptz_preset is not None and await media_cache.move_ptz(
+                        active_camera_entity_id,
+                        camera_ptz_preset,
+                        partial(
+                            move_camera_to_ptz_preset,
+                            self.context.hass,
+                            active_camera_entity_id,
+                            camera_ptz_preset,
+                            method=camera_ptz_method,
+                        ),
                     )
-                if camera_delay:
-                    _LOGGER.debug("SUPERNOTIFY Waiting %s secs before snapping", camera_delay)
-                    await asyncio.sleep(camera_delay)
-                image_path = await snap_camera(
-                    self.context.hass,
-                    active_camera_entity_id,
-                    media_path=self.context.media_path,
-                    max_camera_wait=15,
-                    jpeg_opts=jpeg_opts,
-                )
-                if camera_ptz_preset and camera_ptz_preset_default:
-                    await move_camera_to_ptz_preset(
-                        self.context.hass, active_camera_entity_id, camera_ptz_preset_default, method=camera_ptz_method
+                    if camera_delay and (moved or camera_ptz_preset is None):
+                        _LOGGER.debug("SUPERNOTIFY Waiting %s secs before snapping", camera_delay)
+                        await asyncio.sleep(camera_delay)
+                    started = time.monotonic()
+                    image_path = await snap_camera(
+                        self.context.hass,
+                        active_camera_entity_id,
+                        media_path=self.context.media_path,
+                        max_camera_wait=15,
+                        jpeg_opts=jpeg_opts,
                     )
-
-        if image_path is None:
-            _LOGGER.warning("SUPERNOTIFY No media available to attach (%s,%s)", snapshot_url, camera_entity_id)
-            return None
-        self.snapshot_image_path = image_path
+                    self.debug_trace.media["camera"] = active_camera_entity_id
+                    self.debug_trace.media["capture_latency"] = round(time.monotonic() - started, 3)
+                    if camera_ptz_preset is not None and camera_ptz_preset_default is not None:
+                        # debounced, so a burst of notifications makes one round trip
+                        media_cache.schedule_ptz_return(
+                            active_camera_entity_id,
+                            camera_ptz_preset_default,
+                            camera_config.get(CONF_PTZ_RETURN_DELAY, PTZ_DEFAULT_RETURN_DELAY),
+                            partial(
+                                move_camera_to_ptz_preset,
+                                self.context.hass,
+                                active_camera_entity_id,
+                                camera_ptz_preset_default,
+                                method=camera_ptz_method,
+                            ),
+                        )
         return image_path
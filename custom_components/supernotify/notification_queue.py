@@ -0,0 +1,136 @@
+"""Optional bounded queue so notify calls return before the delivery pipeline has run"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+
+from . import DOMAIN, OVERFLOW_BLOCK, OVERFLOW_DROP_NEWEST, OVERFLOW_DROP_OLDEST
+
+_LOGGER = logging.getLogger(__name__)
+
+QUEUE_DEFAULT_SIZE = 100
+QUEUE_DEFAULT_DRAIN_TIMEOUT = 10.0
+
+Job = Callable[[], Awaitable[None]]
+
+
+class NotificationQueue:
+    """Queue of pending notification jobs, drained by a pool of worker tasks"""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        enabled: bool = False,
+        size: int = QUEUE_DEFAULT_SIZE,
+        workers: int = 1,
+        overflow: str = OVERFLOW_BLOCK,
+        drain_timeout: float = QUEUE_DEFAULT_DRAIN_TIMEOUT,
+    ) -> None:
+        self.hass = hass
+        self.enabled = enabled
+        self.size = size
+        self.workers = max(workers, 1)
+        self.overflow = overflow
+        self.drain_timeout = drain_timeout
+        self.accepting = False
+        self.processed: int = 0
+        self.dropped: int = 0
+        self.last_wait: float = 0.0
+        self.max_wait: float = 0.0
+        self._queue: asyncio.Queue[tuple[float, Job]] = asyncio.Queue(maxsize=size)
+        self._workers: list[asyncio.Task[None]] = []
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        if not self.enabled or self._workers:
+            return
+        _LOGGER.info("SUPERNOTIFY Starting notification queue, size %s, %s workers", self.size, self.workers)
+        for i in range(self.workers):
+            self._workers.append(
+                self.hass.async_create_background_task(self._work(), name=f"{DOMAIN} notification queue worker {i}")
+            )
+        self.accepting = True
+        self.expose_entities()
+
+    async def enqueue(self, job: Job) -> bool:
+        """Queue a job, returning False if the queue isn't accepting work so caller can run it inline"""
+        if not self.accepting:
+            return False
+        item = (time.monotonic(), job)
+        if self._queue.full():
+            if self.overflow == OVERFLOW_DROP_NEWEST:
+                self.dropped += 1
+                _LOGGER.warning("SUPERNOTIFY Notification queue full, dropping new notification (%s dropped)", self.dropped)
+                self.expose_entities()
+                return True
+            if self.overflow == OVERFLOW_DROP_OLDEST:
+                self._queue.get_nowait()
+                self._queue.task_done()
+                self.dropped += 1
+                _LOGGER.warning("SUPERNOTIFY Notification queue full, dropping oldest notification (%s dropped)", self.dropped)
+        # for OVERFLOW_BLOCK, waits for a worker to free up space, applying backpressure to caller
+        await self._queue.put(item)
+        self.expose_entities()
+        return True
+
+    async def _work(self) -> None:
+        while True:
+            enqueued, job = await self._queue.get()
+            try:
+                self.last_wait = time.monotonic() - enqueued
+                self.max_wait = max(self.max_wait, self.last_wait)
+                self.expose_entities()
+                await job()
+                self.processed += 1
+            except Exception as e:
+                # jobs should have their own fault barrier, this keeps the worker alive regardless
+                _LOGGER.error("SUPERNOTIFY Notification queue job failed: %s", e, exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def drain(self) -> int:
+        """Stop accepting new jobs, and give pending ones until the drain timeout to complete
+
+        Returns the number of jobs abandoned
+        """
+        self.accepting = False
+        if not self._workers:
+            return 0
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=self.drain_timeout)
+        except TimeoutError:
+            _LOGGER.warning(
+                "SUPERNOTIFY Notification queue drain timed out after %ss, abandoning %s", self.drain_timeout, self.depth
+            )
+        abandoned = self.depth
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self.expose_entities()
+        return abandoned
+
+    def attributes(self) -> dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "size": self.size,
+            "workers": self.workers,
+            "overflow": self.overflow,
+            "processed": self.processed,
+            "dropped": self.dropped,
+        }
+
+    def expose_entities(self) -> None:
+        self.hass.states.async_set(f"{DOMAIN}.queue_depth", str(self.depth), self.attributes())
+        self.hass.states.async_set(
+            f"{DOMAIN}.queue_wait",
+            str(round(self.last_wait, 3)),
+            {"max_wait": round(self.max_wait, 3), "unit_of_measurement": "s"},
+        )
@@ -3,21 +3,26 @@
 import datetime as dt
 import json
 import logging
+import time
 from dataclasses import asdict
+from functools import partial
 from traceback import format_exception
 from typing import Any
 
-from cachetools import TTLCache
+from cachetools import TLRUCache
 from homeassistant.components.notify.legacy import BaseNotificationService
-from homeassistant.const import CONF_CONDITION, EVENT_HOMEASSISTANT_STOP, STATE_OFF, STATE_ON, STATE_UNKNOWN
+from homeassistant.const import CONF_CONDITION, CONF_ENABLED, EVENT_HOMEASSISTANT_STOP, STATE_OFF, STATE_ON, STATE_UNKNOWN
 from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, ServiceCall, SupportsResponse, callback
 from homeassistant.helpers.condition import async_validate_condition_config
-from homeassistant.helpers.event import async_track_time_change
+from homeassistant.helpers.event import async_track_time_change, async_track_time_interval
 from homeassistant.helpers.json import ExtendedJSONEncoder
 from homeassistant.helpers.reload import async_setup_reload_service
 from homeassistant.helpers.typing import ConfigType, DiscoveryInfoType
+from homeassistant.util import dt as dt_util
 
 from custom_components.supernotify.archive import ARCHIVE_PURGE_MIN_INTERVAL
+from custom_components.supernotify.archive_index import ARCHIVE_INDEX_DEFAULT_LIMIT
+from custom_components.supernotify.common import ensure_list
 from custom_components.supernotify.delivery_method import DeliveryMethod
 
 from . import (
@@ -29,20 +34,32 @@ from . import (
     CONF_ACTIONS,
     CONF_ARCHIVE,
     CONF_CAMERAS,
+    CONF_CONCURRENT_DELIVERY,
     CONF_DELIVERY,
+    CONF_DRAIN_TIMEOUT,
     CONF_DUPE_CHECK,
     CONF_DUPE_POLICY,
     CONF_HOUSEKEEPING,
     CONF_HOUSEKEEPING_TIME,
     CONF_LINKS,
+    CONF_MEDIA_HOUSEKEEPING_INTERVAL,
+    CONF_MEDIA_OPTIONS,
     CONF_MEDIA_PATH,
     CONF_METHODS,
+    CONF_OVERFLOW,
+    CONF_PERSISTENCE,
+    CONF_QUEUE,
+    CONF_RECENT_SIZE,
     CONF_RECIPIENTS,
+    CONF_SAVE_DELAY,
     CONF_SCENARIOS,
     CONF_SIZE,
     CONF_TEMPLATE_PATH,
     CONF_TTL,
+    CONF_WORKERS,
     DOMAIN,
+    METHOD_MOBILE_PUSH,
+    OVERFLOW_BLOCK,
     PLATFORMS,
     PRIORITY_MEDIUM,
     PRIORITY_VALUES,
@@ -50,6 +67,7 @@ from . import (
 )
 from . import SUPERNOTIFY_SCHEMA as PLATFORM_SCHEMA
 from .configuration import Context
+from .media_housekeeping import MEDIA_DEFAULT_INTERVAL
 from .methods.alexa_devices import AlexaDevicesDeliveryMethod
 from .methods.alexa_media_player import AlexaMediaPlayerDeliveryMethod
 from .methods.chime import ChimeDeliveryMethod
@@ -60,6 +78,9 @@ from .methods.mobile_push import MobilePushDeliveryMethod
 from .methods.persistent import PersistentDeliveryMethod
 from .methods.sms import SMSDeliveryMethod
 from .notification import Notification
+from .notification_queue import NotificationQueue
+from .persistence import PERSISTENCE_DEFAULT_SAVE_DELAY, StatePersistence
+from .recent import RECENT_DEFAULT_SIZE, RecentNotifications
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -111,6 +132,10 @@ async def async_get_service(
             CONF_METHODS: config.get(CONF_METHODS, {}),
             CONF_CAMERAS: config.get(CONF_CAMERAS, {}),
             CONF_DUPE_CHECK: config.get(CONF_DUPE_CHECK, {}),
+            CONF_CONCURRENT_DELIVERY: config.get(CONF_CONCURRENT_DELIVERY, False),
+            CONF_RECENT_SIZE: config.get(CONF_RECENT_SIZE, RECENT_DEFAULT_SIZE),
+            CONF_QUEUE: config.get(CONF_QUEUE, {}),
+            CONF_PERSISTENCE: config.get(CONF_PERSISTENCE, {}),
         },
     )
     hass.states.async_set(f"{DOMAIN}.failures", "0")
@@ -122,6 +147,7 @@ async def async_get_service(
         deliveries=config[CONF_DELIVERY],
         template_path=config[CONF_TEMPLATE_PATH],
         media_path=config[CONF_MEDIA_PATH],
+        media_options=config[CONF_MEDIA_OPTIONS],
         archive=config[CONF_ARCHIVE],
         housekeeping=config[CONF_HOUSEKEEPING],
         recipients=config[CONF_RECIPIENTS],
@@ -131,6 +157,10 @@ async def async_get_service(
         method_configs=config[CONF_METHODS],
         cameras=config[CONF_CAMERAS],
         dupe_check=config[CONF_DUPE_CHECK],
+        concurrent_delivery=config[CONF_CONCURRENT_DELIVERY],
+        recent_size=config[CONF_RECENT_SIZE],
+        queue=config[CONF_QUEUE],
+        persistence=config[CONF_PERSISTENCE],
     )
     await service.initialize()
 
@@ -141,7 +171,18 @@ async def async_get_service(
         return service.enquire_deliveries_by_scenario()
 
     def supplemental_action_enquire_last_notification(_call: ServiceCall) -> dict[str, Any]:
-        return service.last_notification.contents() if service.last_notification else {}
+        return service.recent.last_contents()
+
+    def supplemental_action_enquire_recent(call: ServiceCall) -> dict[str, Any]:
+        errored = call.data.get("errored")
+        return {
+            "notifications": service.recent.query(
+                priority=ensure_list(call.data.get("priority")) or None,
+                delivery=call.data.get("delivery"),
+                errored=None if errored is None else bool(errored),
+                limit=call.data.get("limit"),
+            )
+        }
 
     async def supplemental_action_enquire_active_scenarios(call: ServiceCall) -> dict[str, Any]:
         trace = call.data.get("trace", False)
@@ -178,6 +219,22 @@ async def async_get_service(
             "days": service.context.archive.archive_days if days is None else days,
         }
 
+    async def supplemental_action_enquire_archive(call: ServiceCall) -> dict[str, Any]:
+        if not service.context.archive.enabled:
+            return {"error": "No archive configured"}
+        try:
+            return await service.context.archive.query(
+                start=parse_datetime_field(call.data.get("start")),
+                end=parse_datetime_field(call.data.get("end")),
+                priority=ensure_list(call.data.get("priority")) or None,
+                delivery=call.data.get("delivery"),
+                outcome=call.data.get("outcome"),
+                before=call.data.get("before"),
+                limit=int(call.data.get("limit", ARCHIVE_INDEX_DEFAULT_LIMIT)),
+            )
+        except ValueError as e:
+            return {"error": str(e)}
+
     hass.services.async_register(
         DOMAIN,
         "enquire_deliveries_by_scenario",
@@ -190,6 +247,12 @@ async def async_get_service(
         supplemental_action_enquire_last_notification,
         supports_response=SupportsResponse.ONLY,
     )
+    hass.services.async_register(
+        DOMAIN,
+        "enquire_recent",
+        supplemental_action_enquire_recent,
+        supports_response=SupportsResponse.ONLY,
+    )
     hass.services.async_register(
         DOMAIN,
         "enquire_active_scenarios",
@@ -232,6 +295,12 @@ async def async_get_service(
         supplemental_action_purge_archive,
         supports_response=SupportsResponse.ONLY,
     )
+    hass.services.async_register(
+        DOMAIN,
+        "enquire_archive",
+        supplemental_action_enquire_archive,
+        supports_response=SupportsResponse.ONLY,
+    )
     hass.services.async_register(
         DOMAIN,
         "refresh_entities",
@@ -242,6 +311,15 @@ async def async_get_service(
     return service
 
 
+def parse_datetime_field(value: Any) -> dt.datetime | None:
+    if value is None or isinstance(value, dt.datetime):
+        return value
+    parsed = dt_util.parse_datetime(str(value))
+    if parsed is None:
+        raise ValueError(f"Invalid datetime {value}")
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=dt_util.get_default_time_zone())
+
+
 class SuperNotificationAction(BaseNotificationService):
     """Implement SuperNotification action."""
 
@@ -260,10 +338,15 @@ class SuperNotificationAction(BaseNotificationService):
         method_configs: dict[str, Any] | None = None,
         cameras: list[dict[str, Any]] | None = None,
         dupe_check: dict[str, Any] | None = None,
+        concurrent_delivery: bool = False,
+        queue: dict[str, Any] | None = None,
+        persistence: dict[str, Any] | None = None,
+        recent_size: int = RECENT_DEFAULT_SIZE,
+        media_options: dict[str, Any] | None = None,
     ) -> None:
         """Initialize the service."""
         self.hass: HomeAssistant = hass
-        self.last_notification: Notification | None = None
+        self.recent = RecentNotifications(recent_size)
         self.failures: int = 0
         self.housekeeping: dict[str, Any] = housekeeping or {}
         self.sent: int = 0
@@ -280,16 +363,38 @@ class SuperNotificationAction(BaseNotificationService):
             method_configs or {},
             cameras,
             METHODS,
+            concurrent_delivery,
+            media_options,
+        )
+        queue = queue or {}
+        self.queue = NotificationQueue(
+            hass,
+            enabled=queue.get(CONF_ENABLED, False),
+            size=queue.get(CONF_SIZE, 100),
+            workers=queue.get(CONF_WORKERS, 1),
+            overflow=queue.get(CONF_OVERFLOW, OVERFLOW_BLOCK),
+            drain_timeout=queue.get(CONF_DRAIN_TIMEOUT, 10),
         )
         self.unsubscribes: list[CALLBACK_TYPE] = []
+        self._media_housekeeping: bool = False
         self.dupe_check_config: dict[str, Any] = dupe_check or {}
         self.last_purge: dt.datetime | None = None
-        self.notification_cache: TTLCache[tuple[int, str], str] = TTLCache(
-            maxsize=self.dupe_check_config.get(CONF_SIZE, 100), ttl=self.dupe_check_config.get(CONF_TTL, 120)
+        self.dupe_ttl: int = self.dupe_check_config.get(CONF_TTL, 120)
+        # entries carry their own wall clock expiry, so they survive a restart with the right lifetime
+        self.notification_cache: TLRUCache[tuple[int, str], tuple[str, float]] = TLRUCache(
+            maxsize=self.dupe_check_config.get(CONF_SIZE, 100), ttu=lambda _key, value, _now: value[1], timer=time.time
+        )
+        persistence = persistence or {}
+        self.persistence = StatePersistence(
+            hass,
+            self.snapshot_state,
+            enabled=persistence.get(CONF_ENABLED, True),
+            save_delay=persistence.get(CONF_SAVE_DELAY, PERSISTENCE_DEFAULT_SAVE_DELAY),
         )
 
     async def initialize(self) -> None:
         await self.context.initialize()
+        self.restore_state(await self.persistence.load())
 
         self.expose_entities()
         self.unsubscribes.append(self.hass.bus.async_listen("mobile_app_notification_action", self.on_mobile_action))
@@ -306,18 +411,34 @@ class SuperNotificationAction(BaseNotificationService):
                 )
             )
 
+        if self.context.media_housekeeper is not None:
+            interval = self.context.media_options.get(CONF_MEDIA_HOUSEKEEPING_INTERVAL, MEDIA_DEFAULT_INTERVAL)
+            self.unsubscribes.append(
+                async_track_time_interval(self.hass, self.async_media_housekeeping, dt.timedelta(seconds=interval))
+            )
+
         self.unsubscribes.append(self.hass.bus.async_listen(EVENT_HOMEASSISTANT_STOP, self.async_shutdown))
+        self.queue.start()
 
     async def async_shutdown(self, event: Event) -> None:
         _LOGGER.info("SUPERNOTIFY shutting down, %s", event)
+        await self.queue.drain()
+        await self.context.archive_pipeline.stop()
+        await self.context.archive.stop()
+        await self.persistence.flush()
         self.shutdown()
 
     async def async_unregister_services(self) -> None:
         _LOGGER.info("SUPERNOTIFY unregistering")
+        await self.queue.drain()
+        await self.context.archive_pipeline.stop()
+        await self.context.archive.stop()
+        await self.persistence.flush()
         self.shutdown()
         return await super().async_unregister_services()
 
     def shutdown(self) -> None:
+        self.context.shutdown()
         for unsub in self.unsubscribes:
             try:
                 _LOGGER.debug("SUPERNOTIFY unsubscribing: %s", unsub)
@@ -357,13 +478,21 @@ class SuperNotificationAction(BaseNotificationService):
         if any((notification_hash, p) in self.notification_cache for p in same_or_higher_priority):
             _LOGGER.debug("SUPERNOTIFY Detected dupe notification")
             dupe = True
-        self.notification_cache[notification_hash, notification.priority] = notification.id
+        self.notification_cache[notification_hash, notification.priority] = (notification.id, time.time() + self.dupe_ttl)
         return dupe
 
     async def async_send_message(
         self, message: str = "", title: str | None = None, target: list[str] | str | None = None, **kwargs: Any
     ) -> None:
-        """Send a message via chosen method."""
+        """Send a message via chosen method, or queue it for a worker if queueing enabled"""
+        if await self.queue.enqueue(partial(self.process_message, message, title, target, **kwargs)):
+            return
+        await self.process_message(message, title, target, **kwargs)
+
+    async def process_message(
+        self, message: str = "", title: str | None = None, target: list[str] | str | None = None, **kwargs: Any
+    ) -> None:
+        """Run the full notification pipeline for a message"""
         data = kwargs.get(ATTR_DATA, {})
         notification = None
         _LOGGER.debug("Message: %s, target: %s, data: %s", message, target, data)
@@ -391,10 +520,9 @@ class SuperNotificationAction(BaseNotificationService):
             self.hass.states.async_set(f"{DOMAIN}.failures", str(self.failures))
 
         if notification is not None:
-            self.last_notification = notification
-            self.context.archive.archive(notification)
-            if self.context.archive_topic:
-                await self.context.archive_topic.publish(notification)
+            self.recent.record(notification)
+            self.context.archive_pipeline.archive(notification)
+            self.persistence.schedule_save()
 
             _LOGGER.debug(
                 "SUPERNOTIFY %s deliveries, %s errors, %s skipped",
@@ -403,6 +531,41 @@ class SuperNotificationAction(BaseNotificationService):
                 notification.skipped,
             )
 
+    @callback
+    def snapshot_state(self) -> dict[str, Any]:
+        """State worth keeping across a restart, called by the store when a save is due"""
+        self.notification_cache.expire()
+        mobile_push = self.context.methods.get(METHOD_MOBILE_PUSH)
+        return {
+            "sent": self.sent,
+            "failures": self.failures,
+            "snoozes": self.context.snoozer.dump(),
+            "dupes": [[h, p, nid, expiry] for (h, p), (nid, expiry) in self.notification_cache.items()],
+            "action_titles": dict(getattr(mobile_push, "action_titles", {})),
+            "media_references": self.context.media_housekeeper.dump() if self.context.media_housekeeper else {},
+        }
+
+    def restore_state(self, state: dict[str, Any]) -> None:
+        if not state:
+            return
+        self.sent = state.get("sent", self.sent)
+        self.failures = state.get("failures", self.failures)
+        self.hass.states.async_set(f"{DOMAIN}.sent", str(self.sent))
+        self.hass.states.async_set(f"{DOMAIN}.failures", str(self.failures))
+        snoozes = self.context.snoozer.restore(state.get("snoozes", []))
+        now = time.time()
+        dupes = 0
+        for notification_hash, priority, notification_id, expiry in state.get("dupes", []):
+            if expiry > now:
+                self.notification_cache[notification_hash, priority] = (notification_id, expiry)
+                dupes += 1
+        mobile_push = self.context.methods.get(METHOD_MOBILE_PUSH)
+        if isinstance(mobile_push, MobilePushDeliveryMethod):
+            mobile_push.action_titles.update(state.get("action_titles", {}))
+        if self.context.media_housekeeper is not None:
+            self.context.media_housekeeper.restore(state.get("media_references", {}))
+        _LOGGER.info("SUPERNOTIFY Restored state with %s snoozes, %s dupe check entries", snoozes, dupes)
+
     def enquire_deliveries_by_scenario(self) -> dict[str, list[str]]:
         return self.context.delivery_by_scenario
 
@@ -438,7 +601,9 @@ class SuperNotificationAction(BaseNotificationService):
         return self.context.snoozer.export()
 
     def clear_snoozes(self) -> int:
-        return self.context.snoozer.clear()
+        cleared = self.context.snoozer.clear()
+        self.persistence.schedule_save()
+        return cleared
 
     def enquire_people(self) -> list[dict[str, Any]]:
         return list(self.context.people.values())
@@ -462,10 +627,26 @@ class SuperNotificationAction(BaseNotificationService):
         if event_name is None or not event_name.startswith("SUPERNOTIFY_"):
             return  # event not intended for here
         self.context.snoozer.handle_command_event(event, self.context.people)
+        self.persistence.schedule_save()
+
+    async def async_media_housekeeping(self, _now: dt.datetime | None = None) -> None:
+        """Purge a time budget's worth of old media, continuing from the last run"""
+        housekeeper = self.context.media_housekeeper
+        if housekeeper is None or self._media_housekeeping:
+            return
+        self._media_housekeeping = True
+        try:
+            if await self.hass.async_add_executor_job(housekeeper.step):
+                self.hass.states.async_set(f"{DOMAIN}.media", str(housekeeper.files), housekeeper.attributes())
+        except Exception as e:
+            _LOGGER.warning("SUPERNOTIFY Media housekeeping failed: %s", e)
+        finally:
+            self._media_housekeeping = False
 
     @callback
     async def async_nightly_tasks(self, now: dt.datetime) -> None:
         _LOGGER.info("SUPERNOTIFY Housekeeping starting as scheduled at %s", now)
         await self.context.archive.cleanup()
         self.context.snoozer.purge_snoozes()
+        self.persistence.schedule_save()
         _LOGGER.info("SUPERNOTIFY Housekeeping completed")
@@ -0,0 +1,84 @@
+"""Occupancy of configured people, maintained from state change events"""
+
+import logging
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any
+
+from homeassistant.const import ATTR_STATE, STATE_HOME, STATE_NOT_HOME
+from homeassistant.core import CALLBACK_TYPE, Event, EventStateChangedData, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_state_change_event
+
+_LOGGER = logging.getLogger(__name__)
+
+OccupancySnapshot = Mapping[str, tuple[dict[str, Any], ...]]
+
+
+class OccupancyIndex:
+    """Home/away index of people, updated by state change listeners
+
+    Notifications read an immutable snapshot rather than the state machine, and never
+    see, or change, the shared person configuration
+    """
+
+    def __init__(self, hass: HomeAssistant | None) -> None:
+        self.hass: HomeAssistant | None = hass
+        self.people: dict[str, dict[str, Any]] = {}
+        self.states: dict[str, str | None] = {}
+        self.live: bool = False
+        self._snapshot: OccupancySnapshot = MappingProxyType({STATE_HOME: (), STATE_NOT_HOME: ()})
+        self._unsubscribe: CALLBACK_TYPE | None = None
+
+    def start(self, people: dict[str, dict[str, Any]]) -> None:
+        self.stop()
+        self.people = people
+        self.refresh()
+        if self.hass is None or not people:
+            return
+        try:
+            self._unsubscribe = async_track_state_change_event(self.hass, list(people), self._on_state_change)
+            self.live = True
+        except Exception as e:
+            # fall back to reading state machine for each snapshot
+            _LOGGER.warning("SUPERNOTIFY Unable to track occupancy changes: %s", e)
+
+    def stop(self) -> None:
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
+        self.live = False
+
+    def refresh(self) -> None:
+        """Read current state of all people from the state machine"""
+        self.states = {}
+        for person in self.people:
+            try:
+                tracker = self.hass.states.get(person) if self.hass else None
+                self.states[person] = tracker.state if tracker is not None else None
+            except Exception as e:
+                _LOGGER.warning("SUPERNOTIFY Unable to determine occupied status for %s: %s", person, e)
+                self.states[person] = None
+        self._rebuild()
+
+    @callback
+    def _on_state_change(self, event: Event[EventStateChangedData]) -> None:
+        entity_id = event.data["entity_id"]
+        new_state = event.data["new_state"]
+        self.states[entity_id] = new_state.state if new_state is not None else None
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        home: list[dict[str, Any]] = []
+        not_home: list[dict[str, Any]] = []
+        for person, person_config in self.people.items():
+            state = self.states.get(person)
+            person_snapshot = dict(person_config)
+            person_snapshot[ATTR_STATE] = state
+            # default to at home if unknown tracker
+            (home if state in (None, STATE_HOME) else not_home).append(person_snapshot)
+        self._snapshot = MappingProxyType({STATE_HOME: tuple(home), STATE_NOT_HOME: tuple(not_home)})
+
+    def snapshot(self) -> OccupancySnapshot:
+        if not self.live:
+            self.refresh()
+        return self._snapshot
@@ -0,0 +1,67 @@
+"""Warm start of runtime state across restarts, using Home Assistant storage"""
+
+import logging
+from collections.abc import Callable
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from . import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.state"
+PERSISTENCE_DEFAULT_SAVE_DELAY = 10.0
+
+
+class StatePersistence:
+    """Debounced snapshot of in-memory state, restored when the integration starts
+
+    Saves are batched by the store's delayed write, so the snapshot is built at most once
+    per delay window and written from the executor, with a final write at shutdown
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        snapshot: Callable[[], dict[str, Any]],
+        enabled: bool = True,
+        save_delay: float = PERSISTENCE_DEFAULT_SAVE_DELAY,
+    ) -> None:
+        self.hass = hass
+        self.enabled = enabled
+        self.save_delay = save_delay
+        self.saves_requested: int = 0
+        self._snapshot = snapshot
+        self._store: Store[dict[str, Any]] | None = None
+
+    async def load(self) -> dict[str, Any]:
+        """Read the last saved state, empty if none or persistence unavailable"""
+        if not self.enabled:
+            return {}
+        try:
+            store: Store[dict[str, Any]] = Store(self.hass, STORAGE_VERSION, STORAGE_KEY)
+            data = await store.async_load()
+        except Exception as e:
+            _LOGGER.warning("SUPERNOTIFY Unable to load saved state, starting cold: %s", e)
+            return {}
+        self._store = store
+        return data or {}
+
+    @callback
+    def schedule_save(self) -> None:
+        """Request a save, coalesced with any others in the delay window"""
+        if self._store is None:
+            return
+        self.saves_requested += 1
+        self._store.async_delay_save(self._snapshot, self.save_delay)
+
+    async def flush(self) -> None:
+        if self._store is None:
+            return
+        try:
+            await self._store.async_save(self._snapshot())
+        except Exception as e:
+            _LOGGER.warning("SUPERNOTIFY Unable to save state: %s", e)
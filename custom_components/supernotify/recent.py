@@ -0,0 +1,72 @@
+"""Ring buffer of recent notifications, for enquiries without reading the archive"""
+
+from __future__ import annotations
+
+import logging
+from collections import deque
+from typing import TYPE_CHECKING, Any
+
+import orjson
+
+from .archive import encode_json
+
+if TYPE_CHECKING:
+    from .notification import Notification
+
+_LOGGER = logging.getLogger(__name__)
+
+RECENT_DEFAULT_SIZE = 50
+
+
+class RecentNotifications:
+    """Compact JSON ready summaries of the last N notifications, oldest dropped first
+
+    Only the latest notification is held whole, and serialised to full contents only when asked for,
+    so recording stays cheap on the event loop
+    """
+
+    def __init__(self, size: int = RECENT_DEFAULT_SIZE) -> None:
+        self.summaries: deque[dict[str, Any]] = deque(maxlen=max(size, 1))
+        self.last_notification: Notification | None = None
+        self.last: dict[str, Any] | None = None
+
+    def record(self, notification: Notification) -> None:
+        summary = notification.summary()
+        summary["created"] = notification.created.isoformat()
+        self.summaries.append(summary)
+        self.last_notification = notification
+        self.last = None
+
+    def last_contents(self) -> dict[str, Any]:
+        if self.last is None:
+            notification = self.last_notification
+            if notification is None:
+                self.last = {}
+            else:
+                try:
+                    self.last = orjson.loads(encode_json(notification.contents(), compact=True))
+                except Exception as e:
+                    _LOGGER.warning("SUPERNOTIFY Unable to serialise notification %s, keeping summary: %s", notification.id, e)
+                    self.last = dict(self.summaries[-1])
+        return self.last
+
+    def query(
+        self,
+        priority: list[str] | None = None,
+        delivery: str | None = None,
+        errored: bool | None = None,
+        limit: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """Find matching summaries, newest first"""
+        results: list[dict[str, Any]] = []
+        for summary in reversed(self.summaries):
+            if priority and summary["priority"] not in priority:
+                continue
+            if delivery and delivery not in summary["deliveries"]:
+                continue
+            if errored is not None and (summary["errored"] > 0 or bool(summary["errors"])) != errored:
+                continue
+            results.append(summary)
+            if limit and len(results) >= limit:
+                break
+        return results
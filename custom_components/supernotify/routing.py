@@ -0,0 +1,129 @@
+"""Precomputed routing of notifications to deliveries"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from cachetools import LRUCache
+from homeassistant.const import CONF_ENABLED
+
+from . import (
+    CONF_SELECTION,
+    DELIVERY_SELECTION_FIXED,
+    DELIVERY_SELECTION_IMPLICIT,
+    SCENARIO_DEFAULT,
+    SELECTION_BY_SCENARIO,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from .configuration import Context
+
+_LOGGER = logging.getLogger(__name__)
+
+ROUTING_CACHE_SIZE = 256
+
+
+@dataclass(frozen=True)
+class DeliveryRouting:
+    """Deliveries selected for a combination of scenarios, selection mode and overrides"""
+
+    selected: tuple[str, ...]
+    scenario_enable_deliveries: tuple[str, ...]
+    default_enable_deliveries: tuple[str, ...]
+    scenario_disable_deliveries: tuple[str, ...]
+    override_enable_deliveries: tuple[str, ...]
+    override_disable_deliveries: tuple[str, ...]
+
+
+class DeliveryRouter:
+    """Routing table with each delivery as a bit, so selection reduces to a few mask operations
+
+    Compiled when the context initializes scenarios, or lazily after invalidate() when
+    deliveries or scenarios change, and results memoised for repeated combinations of
+    enabled scenarios, selection mode and delivery overrides
+    """
+
+    def __init__(self, context: Context, cache_size: int = ROUTING_CACHE_SIZE) -> None:
+        self.context = context
+        self.names: list[str] = []
+        self.ids: dict[str, int] = {}
+        self.scenario_masks: dict[str, int] = {}
+        self.by_scenario_mask: int = 0
+        self.valid_mask: int = 0
+        self.cache: LRUCache[Any, DeliveryRouting] = LRUCache(maxsize=cache_size)
+        self.compiled: bool = False
+
+    def compile(self) -> None:
+        deliveries = self.context.deliveries
+        delivery_by_scenario = self.context.delivery_by_scenario
+        names: dict[str, None] = dict.fromkeys(deliveries)
+        for scenario_deliveries in delivery_by_scenario.values():
+            names.update(dict.fromkeys(scenario_deliveries))
+        self.names = list(names)
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self.scenario_masks = {s: self.mask(ds) for s, ds in delivery_by_scenario.items()}
+        self.by_scenario_mask = self.mask(d for d, dc in deliveries.items() if dc.get(CONF_SELECTION) == SELECTION_BY_SCENARIO)
+        self.valid_mask = self.mask(deliveries)
+        self.cache.clear()
+        self.compiled = True
+        _LOGGER.debug("SUPERNOTIFY Compiled routing for %s deliveries, %s scenarios", len(self.names), len(self.scenario_masks))
+
+    def invalidate(self) -> None:
+        """Discard the routing table, to be recompiled on next selection"""
+        self.compiled = False
+        self.cache.clear()
+
+    def mask(self, names: Iterable[str]) -> int:
+        mask = 0
+        for name in names:
+            delivery_id = self.ids.get(name)
+            if delivery_id is not None:
+                mask |= 1 << delivery_id
+        return mask
+
+    def unmask(self, mask: int) -> tuple[str, ...]:
+        return tuple(name for i, name in enumerate(self.names) if mask >> i & 1)
+
+    def select(
+        self, enabled_scenarios: Iterable[str], delivery_selection: str | None, overrides: dict[str, Any]
+    ) -> DeliveryRouting:
+        if not self.compiled:
+            self.compile()
+        override_flags = frozenset(
+            (d, override is None or bool(override.get(CONF_ENABLED, True))) for d, override in overrides.items()
+        )
+        key = (frozenset(enabled_scenarios), delivery_selection, override_flags)
+        routing = self.cache.get(key)
+        if routing is None:
+            routing = self._route(key[0], delivery_selection, override_flags)
+            self.cache[key] = routing
+        return routing
+
+    def _route(
+        self, enabled_scenarios: frozenset[str], delivery_selection: str | None, override_flags: frozenset[tuple[str, bool]]
+    ) -> DeliveryRouting:
+        scenario_enable = default_enable = scenario_disable = 0
+        if delivery_selection != DELIVERY_SELECTION_FIXED:
+            for scenario_name in enabled_scenarios:
+                scenario_enable |= self.scenario_masks.get(scenario_name, 0)
+            if delivery_selection == DELIVERY_SELECTION_IMPLICIT:
+                default_enable = self.scenario_masks.get(SCENARIO_DEFAULT, 0)
+            scenario_disable = self.by_scenario_mask & ~scenario_enable
+
+        override_enable = self.mask(d for d, enabled in override_flags if enabled) & self.valid_mask
+        override_disable_names = tuple(sorted(d for d, enabled in override_flags if not enabled))
+        override_disable = self.mask(override_disable_names)
+
+        selected = (scenario_enable | default_enable | override_enable) & ~(scenario_disable | override_disable)
+        return DeliveryRouting(
+            selected=self.unmask(selected),
+            scenario_enable_deliveries=self.unmask(scenario_enable),
+            default_enable_deliveries=self.unmask(default_enable),
+            scenario_disable_deliveries=self.unmask(scenario_disable),
+            override_enable_deliveries=self.unmask(override_enable),
+            override_disable_deliveries=override_disable_names,
+        )
@@ -1,8 +1,7 @@
 import logging
 from collections.abc import Iterator
 from contextlib import contextmanager
-from dataclasses import asdict
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 import voluptuous as vol
 from homeassistant.components.trace import async_setup, async_store_trace  # type: ignore[attr-defined]
@@ -29,6 +28,9 @@ from . import (
     ConditionVariables,
 )
 
+if TYPE_CHECKING:
+    from homeassistant.helpers.condition import ConditionCheckerType
+
 _LOGGER = logging.getLogger(__name__)
 
 
@@ -44,7 +46,8 @@ class Scenario:
         self.delivery: dict[str, Any] = scenario_definition.get(CONF_DELIVERY) or {}
         self.default: bool = self.name == ATTR_DEFAULT
         self.last_trace: ActionTrace | None = None
-        self.condition_func = None
+        # compiled once at validation, and rebuilt only when scenario recreated on config reload
+        self.condition_func: ConditionCheckerType | None = None
 
     async def validate(self, valid_deliveries: list[str] | None = None, valid_action_groups: list[str] | None = None) -> bool:
         """Validate Home Assistant conditiion definition at initiation"""
@@ -52,7 +55,8 @@ class Scenario:
             error: str | None = None
             try:
                 cond: ConfigType = await condition.async_validate_condition_config(self.hass, self.condition)
-                if await condition.async_from_config(self.hass, cond) is None:
+                self.condition_func = await condition.async_from_config(self.hass, cond)
+                if self.condition_func is None:
                     _LOGGER.warning("SUPERNOTIFY Disabling scenario %s with failed condition %s", self.name, self.condition)
                     error = "Unable to build condition from definition"
             except vol.Invalid as vi:
@@ -139,15 +143,17 @@ class Scenario:
     async def evaluate(self, condition_variables: ConditionVariables | None = None) -> bool:
         """Evaluate scenario conditions"""
         if self.condition:
+            if self.condition_func is None:
+                # not validated, e.g. created outside of Context initialization
+                try:
+                    self.condition_func = await condition.async_from_config(self.hass, self.condition)
+                    if self.condition_func is None:
+                        raise Invalid(f"Empty condition generated for {self.name}")
+                except Exception as e:
+                    _LOGGER.error("SUPERNOTIFY Scenario %s condition create failed: %s", self.name, e)
+                    return False
             try:
-                test = await condition.async_from_config(self.hass, self.condition)
-                if test is None:
-                    raise Invalid(f"Empty condition generated for {self.name}")
-            except Exception as e:
-                _LOGGER.error("SUPERNOTIFY Scenario %s condition create failed: %s", self.name, e)
-                return False
-            try:
-                if test(self.hass, asdict(condition_variables) if condition_variables else None):
+                if self.condition_func(self.hass, condition_variables.variables() if condition_variables else None):
                     return True
             except Exception as e:
                 _LOGGER.error(
@@ -1,10 +1,11 @@
+import heapq
 import logging
 import time
 from typing import Any
 
 from homeassistant.core import Event
 
-from custom_components.supernotify.common import format_timestamp, update_dict_list
+from custom_components.supernotify.common import format_timestamp
 
 from . import (
     ATTR_ACTION,
@@ -34,6 +35,7 @@ class Snooze:
     recipient_type: RecipientType
     recipient: str | None
     reason: str | None = None
+    seq: int = 0
 
     def __init__(
         self,
@@ -91,6 +93,14 @@ class Snoozer:
 
     def __init__(self) -> None:
         self.snoozes: dict[str, Snooze] = {}
+        # indexes over snoozes, all keyed by snooze short key
+        self.by_type: dict[TargetType, dict[str, Snooze]] = {}
+        self.by_target: dict[tuple[TargetType, str | None], dict[str, Snooze]] = {}
+        self.by_recipient: dict[str, dict[str, Snooze]] = {}
+        self.global_snoozes: dict[TargetType, int] = dict.fromkeys(GlobalTargetType, 0)
+        self._seq: int = 0
+        self._expiry: list[tuple[float, int, str, Snooze]] = []
+        self._expiry_seq: int = 0
 
     def handle_command_event(self, event: Event, people: dict[str, Any] | None = None) -> None:
         people = people or {}
@@ -171,16 +181,12 @@ class Snoozer:
         reason: str = "User command",
     ) -> None:
         if cmd == CommandType.SNOOZE:
-            snooze = Snooze(target_type, recipient_type, target, recipient, snooze_for, reason=reason)
-            self.snoozes[snooze.short_key()] = snooze
+            self._add(Snooze(target_type, recipient_type, target, recipient, snooze_for, reason=reason))
         elif cmd == CommandType.SILENCE:
-            snooze = Snooze(target_type, recipient_type, target, recipient, reason=reason)
-            self.snoozes[snooze.short_key()] = snooze
+            self._add(Snooze(target_type, recipient_type, target, recipient, reason=reason))
         elif cmd == CommandType.NORMAL:
             anti_snooze = Snooze(target_type, recipient_type, target, recipient)
-            to_del = [k for k, v in self.snoozes.items() if v.short_key() == anti_snooze.short_key()]
-            for k in to_del:
-                del self.snoozes[k]
+            self._delete(anti_snooze.short_key())
         else:
             _LOGGER.warning(
                 "SUPERNOTIFY Invalid mobile cmd %s (target_type: %s, target: %s, recipient_type: %s)",
@@ -190,19 +196,128 @@ class Snoozer:
                 recipient_type,
             )
 
+    def _add(self, snooze: Snooze) -> None:
+        key = snooze.short_key()
+        existing = self.snoozes.get(key)
+        if existing is not None:
+            # replacement keeps its place in the order of snoozes
+            self._unindex(key, existing)
+            snooze.seq = existing.seq
+        else:
+            self._seq += 1
+            snooze.seq = self._seq
+        self.snoozes[key] = snooze
+        self.by_type.setdefault(snooze.target_type, {})[key] = snooze
+        self.by_target.setdefault((snooze.target_type, snooze.target), {})[key] = snooze
+        if snooze.recipient_type == RecipientType.USER and snooze.recipient:
+            self.by_recipient.setdefault(snooze.recipient, {})[key] = snooze
+        if snooze.target_type in GlobalTargetType:
+            self.global_snoozes[snooze.target_type] += 1
+        if snooze.snooze_until is not None:
+            self._expiry_seq += 1
+            heapq.heappush(self._expiry, (snooze.snooze_until, self._expiry_seq, key, snooze))
+
+    def _unindex(self, key: str, snooze: Snooze) -> None:
+        self.by_type.get(snooze.target_type, {}).pop(key, None)
+        self.by_target.get((snooze.target_type, snooze.target), {}).pop(key, None)
+        if snooze.recipient_type == RecipientType.USER and snooze.recipient:
+            self.by_recipient.get(snooze.recipient, {}).pop(key, None)
+        if snooze.target_type in GlobalTargetType:
+            self.global_snoozes[snooze.target_type] -= 1
+
+    def _delete(self, key: str) -> None:
+        snooze = self.snoozes.pop(key, None)
+        if snooze is not None:
+            self._unindex(key, snooze)
+
+    def _expire(self) -> None:
+        """Remove snoozes due to expire, cheap when nothing due"""
+        now = time.time()
+        while self._expiry and self._expiry[0][0] <= now:
+            _, _, key, snooze = heapq.heappop(self._expiry)
+            if self.snoozes.get(key) is snooze:
+                self._delete(key)
+
     def purge_snoozes(self) -> None:
-        to_del = [k for k, v in self.snoozes.items() if not v.active()]
-        for k in to_del:
-            del self.snoozes[k]
+        self._expire()
 
     def clear(self) -> int:
         cleared = len(self.snoozes)
         self.snoozes.clear()
+        self.by_type.clear()
+        self.by_target.clear()
+        self.by_recipient.clear()
+        self.global_snoozes = dict.fromkeys(GlobalTargetType, 0)
+        self._expiry.clear()
         return cleared
 
     def export(self) -> list[dict]:
         return [s.export() for s in self.snoozes.values()]
 
+    def dump(self) -> list[dict[str, Any]]:
+        """Raw state of current snoozes, in order, for persistence"""
+        self._expire()
+        return [
+            {
+                "target_type": s.target_type,
+                "target": s.target,
+                "recipient_type": s.recipient_type,
+                "recipient": s.recipient,
+                "reason": s.reason,
+                "snoozed_at": s.snoozed_at,
+                "snooze_until": s.snooze_until,
+            }
+            for s in sorted(self.snoozes.values(), key=lambda s: s.seq)
+        ]
+
+    def restore(self, dumped: list[dict[str, Any]]) -> int:
+        """Reinstate snoozes from a previous dump, skipping any expired since"""
+        restored = 0
+        for entry in dumped:
+            try:
+                target_type_name = entry["target_type"]
+                target_type: TargetType = (
+                    GlobalTargetType(target_type_name)
+                    if target_type_name in GlobalTargetType
+                    else QualifiedTargetType(target_type_name)
+                )
+                snooze = Snooze(
+                    target_type,
+                    RecipientType(entry["recipient_type"]),
+                    entry.get("target"),
+                    entry.get("recipient"),
+                    reason=entry.get("reason"),
+                )
+                snooze.snoozed_at = entry.get("snoozed_at") or snooze.snoozed_at
+                snooze.snooze_until = entry.get("snooze_until")
+            except (KeyError, ValueError) as e:
+                _LOGGER.warning("SUPERNOTIFY Unable to restore snooze %s: %s", entry, e)
+                continue
+            if snooze.active():
+                self._add(snooze)
+                restored += 1
+        return restored
+
+    def _in_scope(self, snooze: Snooze, priority: str, delivery_names: list[str], delivery_methods: set[str | None]) -> bool:
+        match snooze.target_type:
+            case GlobalTargetType.EVERYTHING:
+                return True
+            case GlobalTargetType.NONCRITICAL:
+                return priority != PRIORITY_CRITICAL
+            case QualifiedTargetType.DELIVERY:
+                return snooze.target in delivery_names
+            case QualifiedTargetType.PRIORITY:
+                return snooze.target == priority
+            case QualifiedTargetType.ACTION:
+                return True
+            case QualifiedTargetType.METHOD:
+                return snooze.target in delivery_methods
+            case QualifiedTargetType.CAMERA:
+                return True
+            case _:
+                _LOGGER.warning("SUPERNOTIFY Unhandled target type %s", snooze.target_type)
+        return False
+
     def current_snoozes(
         self,
         priority: str = PRIORITY_MEDIUM,
@@ -211,45 +326,30 @@ class Snoozer:
     ) -> list[Snooze]:
         delivery_names = delivery_names or []
         delivery_definitions = delivery_definitions or {}
-        inscope_snoozes: list[Snooze] = []
+        self._expire()
+        inscope_snoozes: dict[str, Snooze] = {}
 
-        for snooze in self.snoozes.values():
-            if snooze.active():
-                match snooze.target_type:
-                    case GlobalTargetType.EVERYTHING:
-                        inscope_snoozes.append(snooze)
-                    case GlobalTargetType.NONCRITICAL:
-                        if priority != PRIORITY_CRITICAL:
-                            inscope_snoozes.append(snooze)
-                    case QualifiedTargetType.DELIVERY:
-                        if snooze.target in delivery_names:
-                            inscope_snoozes.append(snooze)
-                    case QualifiedTargetType.PRIORITY:
-                        if snooze.target == priority:
-                            inscope_snoozes.append(snooze)
-                    case QualifiedTargetType.ACTION:
-                        inscope_snoozes.append(snooze)
-                    case QualifiedTargetType.METHOD:
-                        if snooze.target in [delivery_definitions.get(d, {}).get(CONF_METHOD) for d in delivery_names]:
-                            inscope_snoozes.append(snooze)
-                    case QualifiedTargetType.CAMERA:
-                        inscope_snoozes.append(snooze)
-                    case _:
-                        _LOGGER.warning("SUPERNOTIFY Unhandled target type %s", snooze.target_type)
-
-        return inscope_snoozes
+        def add_target(target_type: TargetType, target: str | None) -> None:
+            inscope_snoozes.update(self.by_target.get((target_type, target), {}))
 
-    def is_global_snooze(self, priority: str = PRIORITY_MEDIUM) -> bool:
-        for snooze in self.snoozes.values():
-            if snooze.active():
-                match snooze.target_type:
-                    case GlobalTargetType.EVERYTHING:
-                        return True
-                    case GlobalTargetType.NONCRITICAL:
-                        if priority != PRIORITY_CRITICAL:
-                            return True
+        inscope_snoozes.update(self.by_type.get(GlobalTargetType.EVERYTHING, {}))
+        if priority != PRIORITY_CRITICAL:
+            inscope_snoozes.update(self.by_type.get(GlobalTargetType.NONCRITICAL, {}))
+        for delivery_name in delivery_names:
+            add_target(QualifiedTargetType.DELIVERY, delivery_name)
+        for method in {delivery_definitions.get(d, {}).get(CONF_METHOD) for d in delivery_names}:
+            add_target(QualifiedTargetType.METHOD, method)
+        add_target(QualifiedTargetType.PRIORITY, priority)
+        inscope_snoozes.update(self.by_type.get(QualifiedTargetType.ACTION, {}))
+        inscope_snoozes.update(self.by_type.get(QualifiedTargetType.CAMERA, {}))
 
-        return False
+        return sorted(inscope_snoozes.values(), key=lambda s: s.seq)
+
+    def is_global_snooze(self, priority: str = PRIORITY_MEDIUM) -> bool:
+        self._expire()
+        if self.global_snoozes[GlobalTargetType.EVERYTHING] > 0:
+            return True
+        return priority != PRIORITY_CRITICAL and self.global_snoozes[GlobalTargetType.NONCRITICAL] > 0
 
     def filter_recipients(
         self,
@@ -260,7 +360,21 @@ class Snoozer:
         all_delivery_names: list[str],
         delivery_definitions: dict[str, Any],
     ) -> list[dict[str, Any]]:
-        inscope_snoozes = self.current_snoozes(priority, all_delivery_names, delivery_definitions)
+        self._expire()
+        # only snoozes for the recipients in hand matter, however many others are registered
+        recipient_snoozes: dict[str, Snooze] = {}
+        for recipient in recipients:
+            person: str | None = recipient.get(CONF_PERSON)
+            if person is not None:
+                recipient_snoozes.update(self.by_recipient.get(person, {}))
+        if not recipient_snoozes:
+            return recipients
+        delivery_methods = {delivery_definitions.get(d, {}).get(CONF_METHOD) for d in all_delivery_names}
+        inscope_snoozes = [
+            s
+            for s in sorted(recipient_snoozes.values(), key=lambda s: s.seq)
+            if self._in_scope(s, priority, all_delivery_names, delivery_methods)
+        ]
         for snooze in inscope_snoozes:
             if snooze.recipient_type == RecipientType.USER:
                 # assume the everyone checks are made before notification gets this far
@@ -300,5 +414,7 @@ class Snoozer:
                             to_remove.append(recipient)
                             to_add.append(alt_recipient)
                     if to_add or to_remove:
-                        recipients = update_dict_list(recipients, to_add, to_remove)
+                        removed = {id(r) for r in to_remove}
+                        recipients = [r for r in recipients if id(r) not in removed]
+                        recipients.extend(to_add)
         return recipients
@@ -1,3 +1,4 @@
+import asyncio
 from pathlib import Path
 from typing import Any
 
@@ -48,6 +49,41 @@ class BrokenDeliveryMethod(DeliveryMethod):
         raise OSError("a self-inflicted error has occurred")
 
 
+class GatedDeliveryMethod(DeliveryMethod):
+    """Deliveries only complete once `gate_size` of them are in flight at the same time
+
+    Start and end of each delivery are recorded, so tests can check ordering without timing
+    """
+
+    method = "gated"
+
+    def __init__(self, *args: Any, gate_size: int = 2, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.gate_size = gate_size
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.events: list[tuple[str, str]] = []
+        self.gate = asyncio.Event()
+
+    def validate_action(self, action: str | None) -> bool:
+        return True
+
+    async def deliver(self, envelope: Envelope) -> bool:
+        name = envelope.data.get("who", envelope.delivery_name)
+        self.events.append(("start", name))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        if self.in_flight >= self.gate_size:
+            self.gate.set()
+        await self.gate.wait()
+        # give any other delivery already dispatched the chance to start before this one ends
+        await asyncio.sleep(0)
+        self.in_flight -= 1
+        self.events.append(("end", name))
+        envelope.delivered = 1
+        return True
+
+
 class MockImageEntity(image.ImageEntity):
     _attr_name = "Test"
 
@@ -1,3 +1,4 @@
+import datetime as dt
 import json
 import tempfile
 import time
@@ -11,9 +12,23 @@ from homeassistant.const import CONF_ENABLED
 from homeassistant.core import HomeAssistant
 
 from custom_components.supernotify import (
+    ARCHIVE_FORMAT_SEGMENTS,
+    ARCHIVE_SCHEMA,
+    ARCHIVE_SEGMENT_HOURLY,
+    CONF_ARCHIVE_MAX_BYTES,
     CONF_ARCHIVE_PATH,
+    CONF_ARCHIVE_SAMPLING,
 )
-from custom_components.supernotify.archive import ArchivableObject, NotificationArchive
+from custom_components.supernotify.archive import (
+    ArchivableObject,
+    ArchiveSampler,
+    NotificationArchive,
+    SegmentStore,
+    fit_budget,
+    serialise,
+)
+from custom_components.supernotify.archive_sinks import ArchivePipeline, FileArchiveSink
+from custom_components.supernotify.configuration import Context
 from custom_components.supernotify.notify import SuperNotificationAction
 
 
@@ -25,6 +40,14 @@ class ArchiveCrashDummy(ArchivableObject):
         return "testing"
 
 
+class NumberedDummy(ArchiveCrashDummy):
+    def __init__(self, n: int) -> None:
+        self.n = n
+
+    def base_filename(self) -> str:
+        return f"testing_{self.n}"
+
+
 async def test_integration_archive(mock_hass: HomeAssistant) -> None:
     with tempfile.TemporaryDirectory() as archive:
         uut = SuperNotificationAction(
@@ -34,15 +57,15 @@ async def test_integration_archive(mock_hass: HomeAssistant) -> None:
         )
         await uut.initialize()
         await uut.async_send_message("just a test", target="person.bob")
-        assert uut.last_notification is not None
-        obj_path: anyio.Path = anyio.Path(archive) / f"{uut.last_notification.base_filename()}.json"
+        last = uut.recent.last_contents()
+        obj_path: anyio.Path = anyio.Path(archive) / f"{last['created'][:16]}_{last['id']}.json"
         assert await obj_path.exists()
         async with aiofiles.open(obj_path) as stream:
             blob: str = "".join(await stream.readlines())
             reobj = json.loads(blob)
         assert reobj["_message"] == "just a test"
         assert reobj["target"] == ["person.bob"]
-        assert reobj["delivered_envelopes"] == uut.last_notification.delivered_envelopes
+        assert reobj["delivered_envelopes"] == last["delivered_envelopes"]
 
 
 async def test__archive() -> None:
@@ -60,8 +83,8 @@ async def test__archive() -> None:
         assert reobj["a_int"] == 984
 
 
-async def test_cleanup_archive() -> None:
-    archive = "config/archive/test"
+async def test_cleanup_archive(tmp_path: Path) -> None:
+    archive = str(tmp_path / "archive")
     uut = NotificationArchive(True, archive, "7")
     uut.initialize()
     old_time = Mock(return_value=Mock(st_ctime=time.time() - (8 * 24 * 60 * 60)))
@@ -90,3 +113,158 @@ async def test_archive_size() -> None:
         async with aiofiles.open(Path(tmp_path) / "test.foo", mode="w") as f:
             await f.write("{}")
         assert await uut.size() == 1
+
+
+async def test_background_archive_writer(hass: HomeAssistant) -> None:
+    with tempfile.TemporaryDirectory() as archive:
+        uut = NotificationArchive(True, archive, "7")
+        uut.initialize()
+        writer = FileArchiveSink(hass, uut, flush_interval=0.05)
+        pipeline = ArchivePipeline(uut, [writer])
+        pipeline.start()
+        assert writer.running
+        for n in range(3):
+            assert pipeline.archive(NumberedDummy(n))
+        await writer.flush()
+        assert writer.written == 3
+        assert writer.batches >= 1
+        for n in range(3):
+            assert json.loads((Path(archive) / f"testing_{n}.json").read_text())["a_int"] == 984
+
+        assert pipeline.archive(NumberedDummy(4))
+        await pipeline.stop()
+        assert not writer.running
+        assert (Path(archive) / "testing_4.json").exists()
+        await hass.async_block_till_done()
+        assert hass.states.get("supernotify.archive_file").attributes["written"] == 4  # type: ignore
+
+
+async def test_background_archive_writer_drops_when_full(hass: HomeAssistant) -> None:
+    writer = FileArchiveSink(hass, NotificationArchive(False, None, None), queue_size=1)
+    record = serialise(ArchiveCrashDummy())
+    assert record is not None
+    assert writer.submit(record)
+    assert not writer.submit(record)
+    assert writer.dropped == 1
+    assert hass.states.get("supernotify.archive_file").attributes["dropped"] == 1  # type: ignore
+
+
+def test_segment_store_append_roll_and_compress(tmp_path: Path) -> None:
+    uut = SegmentStore(tmp_path, ARCHIVE_SEGMENT_HOURLY, compress=True)
+    yesterday = time.time() - 24 * 60 * 60
+    uut.append([b'{"n": 1}\n', b'{"n": 2}\n'], when=yesterday)
+    uut.append([b'{"n": 3}\n'])
+    files = uut.segment_files()
+    assert len(files) == 2
+    first, current = files.values()
+    assert first.name.endswith(".jsonl.gz")
+    assert current.name.endswith(".jsonl")
+    assert [r["n"] for r in uut.iter_records()] == [1, 2, 3]
+    assert uut.count() == 3
+    uut.append([b'{"n": 4}\n'])
+    assert uut.count() == 4
+
+    assert uut.purge(dt.datetime.now(dt.UTC)) == 2
+    assert uut.count() == 2
+    assert [r["n"] for r in uut.iter_records()] == [3, 4]
+
+
+def test_segment_store_counts_survive_restart(tmp_path: Path) -> None:
+    uut = SegmentStore(tmp_path, ARCHIVE_SEGMENT_HOURLY)
+    uut.append([b'{"n": 1}\n', b'{"n": 2}\n'], when=time.time() - 24 * 60 * 60)
+    uut.append([b'{"n": 3}\n'])
+    assert uut.count() == 3
+
+    restarted = SegmentStore(tmp_path, ARCHIVE_SEGMENT_HOURLY)
+    with patch.object(SegmentStore, "read_lines", wraps=SegmentStore.read_lines) as read_lines:
+        assert restarted.count() == 3
+    # only the open segment is read, closed ones come from saved counts
+    assert [c.args[0].name for c in read_lines.call_args_list] == [f"supernotify_{uut.current}.jsonl"]
+    assert restarted.purge(dt.datetime.now(dt.UTC)) == 2
+    assert SegmentStore(tmp_path, ARCHIVE_SEGMENT_HOURLY).count() == 1
+
+
+def test_segment_store_skips_partial_record(tmp_path: Path) -> None:
+    uut = SegmentStore(tmp_path, ARCHIVE_SEGMENT_HOURLY)
+    uut.append([b'{"n": 1}\n'])
+    current = next(iter(uut.segment_files().values()))
+    with current.open("ab") as f:
+        f.write(b'{"n": 2, "trunc')
+    assert [r["n"] for r in uut.iter_records()] == [1]
+
+
+async def test_segmented_archive(hass: HomeAssistant) -> None:
+    with tempfile.TemporaryDirectory() as archive:
+        uut = NotificationArchive(True, archive, "7", archive_format=ARCHIVE_FORMAT_SEGMENTS)
+        uut.initialize()
+        assert uut.archive(NumberedDummy(1))
+        assert uut.archive(NumberedDummy(2))
+        assert await uut.size() == 2
+        assert [r["a_int"] for r in uut.iter_records()] == [984, 984]
+        assert uut.segments is not None
+        assert len(uut.segments.segment_files()) == 1
+        assert await uut.cleanup(force=True) == 0
+
+        background = NotificationArchive(True, archive, "7", archive_format=ARCHIVE_FORMAT_SEGMENTS)
+        background.initialize()
+        writer = FileArchiveSink(hass, background, flush_interval=0.01)
+        pipeline = ArchivePipeline(background, [writer])
+        pipeline.start()
+        assert pipeline.archive(NumberedDummy(3))
+        await pipeline.stop()
+        assert writer.written == 1
+        assert await background.size() == 3
+
+
+def test_fit_budget_truncates_largest_fields() -> None:
+    contents = {"id": "abc", "created": "2026-01-01", "big": "x" * 500, "medium": "y" * 100, "small": "z"}
+    assert fit_budget(contents, None) == fit_budget(contents, 10000)
+    truncated = json.loads(fit_budget(contents, 250))
+    assert truncated["id"] == "abc"
+    assert truncated["big"] == "<truncated 502 bytes>"
+    assert truncated["medium"] == "y" * 100
+    assert truncated["_truncated"] == {"big": 502}
+    assert json.loads(fit_budget(contents, 10))["_truncated"] == {"big": 502, "medium": 102, "small": 3}
+
+
+def test_serialise_forensic_overrides_profile_and_budget() -> None:
+    class Failed(NumberedDummy):
+        forensic = True
+
+    assert serialise(NumberedDummy(1), max_bytes=5) is not None
+    assert json.loads(serialise(NumberedDummy(1), max_bytes=5).payload)["_truncated"]  # type: ignore
+    assert "_truncated" not in json.loads(serialise(Failed(1), max_bytes=5).payload)  # type: ignore
+
+
+def test_archive_sampler() -> None:
+    class Prioritised(NumberedDummy):
+        def __init__(self, n: int, priority: str, forensic: bool = False) -> None:
+            super().__init__(n)
+            self.priority = priority
+            self.failed = forensic
+
+        @property
+        def forensic(self) -> bool:
+            return self.failed
+
+    uut = ArchiveSampler({"low": {"every": 3}, "medium": {"every": 1, "per_minute": 2}})
+    assert [uut.keep(Prioritised(n, "low")) for n in range(7)] == [True, False, False, True, False, False, True]
+    assert all(uut.keep(Prioritised(n, "high")) for n in range(5))
+    assert uut.keep(Prioritised(1, "low", forensic=True))
+    assert [uut.keep(Prioritised(n, "medium")) for n in range(4)] == [True, True, False, False]
+    assert uut.sampled_out == {"low": 4, "medium": 2}
+    assert uut.total_sampled_out == 6
+    with patch("time.time", return_value=time.time() + 60):
+        assert uut.keep(Prioritised(5, "medium"))
+
+
+def test_sampling_and_budget_configured_from_schema(tmp_path: Path) -> None:
+    config = ARCHIVE_SCHEMA({
+        CONF_ENABLED: True,
+        CONF_ARCHIVE_PATH: str(tmp_path),
+        CONF_ARCHIVE_MAX_BYTES: 2048,
+        CONF_ARCHIVE_SAMPLING: {"low": {"every": "5"}},
+    })
+    uut = Context(archive_config=config)
+    assert uut.archive.max_bytes == 2048
+    assert uut.archive.sampler.policies == {"low": {"every": 5}}
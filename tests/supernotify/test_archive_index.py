@@ -0,0 +1,83 @@
+import datetime as dt
+from pathlib import Path
+from typing import Any
+
+from homeassistant.const import CONF_ENABLED
+from homeassistant.core import HomeAssistant
+from homeassistant.util.ulid import ulid_at_time
+
+from custom_components.supernotify import (
+    CONF_ARCHIVE_INDEX,
+    CONF_ARCHIVE_PATH,
+    CONF_METHOD,
+    OUTCOME_ERRORED,
+    OUTCOME_UNDELIVERED,
+)
+from custom_components.supernotify.archive_index import ARCHIVE_INDEX_FILE, ArchiveIndex
+from custom_components.supernotify.notify import SuperNotificationAction
+from tests.supernotify.doubles_lib import DummyDeliveryMethod
+
+NOW = dt.datetime.now(dt.UTC)
+
+
+def summary(hours_ago: int, priority: str = "medium", deliveries: list[str] | None = None, **kwargs: Any) -> dict[str, Any]:
+    created = NOW - dt.timedelta(hours=hours_ago)
+    return {
+        "id": ulid_at_time(created.timestamp()),
+        "created": created,
+        "priority": priority,
+        "delivered": 1,
+        "errored": 0,
+        "skipped": 0,
+        "deliveries": deliveries or ["email"],
+        "scenarios": [],
+        "targets": [],
+    } | kwargs
+
+
+def test_query_filters_and_pages(tmp_path: Path) -> None:
+    uut = ArchiveIndex(tmp_path / ARCHIVE_INDEX_FILE)
+    assert uut.open()
+    assert uut.add([summary(h) for h in range(10)]) == 10
+    uut.add([summary(1, priority="high", deliveries=["sms", "email"], delivered=0, errored=2)])
+
+    assert len(uut.query(limit=100)["results"]) == 11
+    in_range = uut.query(start=NOW - dt.timedelta(hours=3, minutes=30), end=NOW - dt.timedelta(minutes=30))
+    assert len(in_range["results"]) == 4
+    assert [r["priority"] for r in uut.query(priority=["high"])["results"]] == ["high"]
+    assert len(uut.query(delivery="sms")["results"]) == 1
+    assert len(uut.query(outcome=OUTCOME_ERRORED)["results"]) == 1
+    assert uut.query(outcome=OUTCOME_UNDELIVERED)["results"][0]["deliveries"] == ["sms", "email"]
+
+    first = uut.query(limit=4)
+    second = uut.query(limit=4, before=first["next"])
+    third = uut.query(limit=4, before=second["next"])
+    assert len(first["results"]) == 4
+    assert third["next"] is None
+    ids = [r["id"] for page in (first, second, third) for r in page["results"]]
+    assert ids == sorted(ids, reverse=True)
+    assert len(set(ids)) == 11
+
+    assert uut.purge(NOW - dt.timedelta(hours=5, minutes=30)) == 4
+    assert len(uut.query(limit=100)["results"]) == 7
+    uut.close()
+
+
+async def test_archive_indexed(hass: HomeAssistant, tmp_path: Path) -> None:
+    uut = SuperNotificationAction(
+        hass,
+        deliveries={"dummy": {CONF_METHOD: "dummy"}},
+        archive={CONF_ENABLED: True, CONF_ARCHIVE_PATH: str(tmp_path), CONF_ARCHIVE_INDEX: True},
+    )
+    uut.context.configure_for_tests(method_instances=[DummyDeliveryMethod(hass, uut.context)])
+    await uut.initialize()
+    await uut.async_send_message("testing 123", data={"delivery": ["dummy"], "priority": "high"})
+    await uut.async_send_message("testing 456", data={"delivery": ["dummy"]})
+    await uut.context.archive_pipeline.flush()
+
+    response = await uut.context.archive.query(delivery="dummy")
+    assert [r["priority"] for r in response["results"]] == ["medium", "high"]
+    assert response["results"][0]["id"] == uut.recent.last_contents()["id"]
+    # index is not counted as an archived notification
+    assert await uut.context.archive.size() == 2
+    await uut.context.archive.stop()
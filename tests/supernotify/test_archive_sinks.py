@@ -0,0 +1,192 @@
+import datetime as dt
+import gzip
+import json
+from pathlib import Path
+from typing import Any
+from unittest.mock import AsyncMock, Mock, patch
+
+from homeassistant.core import Event, HomeAssistant
+
+from custom_components.supernotify.archive import ArchivableObject, ArchiveRecord, NotificationArchive, serialise
+from custom_components.supernotify.archive_sinks import (
+    EVENT_NOTIFICATION_ARCHIVED,
+    ArchivePipeline,
+    EventArchiveSink,
+    FileArchiveSink,
+    IndexArchiveSink,
+    MqttArchiveSink,
+    ThreadedArchiveSink,
+)
+
+
+class SummarisedDummy(ArchivableObject):
+    def __init__(self, n: int) -> None:
+        self.n = n
+
+    def contents(self, minimal: bool = False) -> Any:
+        return {"n": self.n}
+
+    def base_filename(self) -> str:
+        return f"testing_{self.n}"
+
+    def summary(self) -> dict[str, Any] | None:
+        return {
+            "id": f"01J00000000000000000000{self.n:03d}",
+            "created": dt.datetime(2026, 1, 1, tzinfo=dt.UTC),
+            "priority": "medium",
+            "deliveries": ["dummy"],
+        }
+
+
+class ProfiledDummy(SummarisedDummy):
+    def contents(self, minimal: bool = False) -> Any:
+        return {"n": self.n, "minimal": minimal}
+
+    def projection(self, profile: str) -> Any:
+        return {"n": self.n, "profile": profile}
+
+
+class BrokenSink(ThreadedArchiveSink):
+    name = "broken"
+
+    def write_batch(self, records: list[ArchiveRecord]) -> int:
+        raise OSError("disk on fire")
+
+
+async def test_pipeline_serialises_once_for_all_sinks(hass: HomeAssistant, tmp_path: Path) -> None:
+    archive = NotificationArchive(True, str(tmp_path), "7", indexed=True)
+    archive.initialize()
+    events: list[Event] = []
+    hass.bus.async_listen(EVENT_NOTIFICATION_ARCHIVED, events.append)
+    mqtt_sink = MqttArchiveSink(hass, "supernotify/archive", flush_interval=0.01)
+    sinks = [
+        FileArchiveSink(hass, archive, flush_interval=0.01),
+        IndexArchiveSink(hass, archive, flush_interval=0.01),
+        mqtt_sink,
+        EventArchiveSink(hass, flush_interval=0.01),
+    ]
+    uut = ArchivePipeline(archive, sinks)  # type: ignore[arg-type]
+    uut.start()
+    assert [s.name for s in uut.sinks] == ["file", "index", "mqtt", "event"]
+
+    with patch("custom_components.supernotify.archive_sinks.mqtt.async_publish", new=AsyncMock()) as publish:
+        assert uut.archive(SummarisedDummy(1))
+        await uut.flush()
+        publish.assert_awaited_once_with(hass, "supernotify/archive", b'{"n":1}\n', qos=0, retain=True)
+    await uut.stop()
+    await hass.async_block_till_done()
+
+    assert (tmp_path / "testing_1.json").read_bytes() == b'{"n":1}\n'
+    assert [r["id"] for r in (await archive.query())["results"]] == ["01J00000000000000000000001"]
+    assert len(events) == 1
+    assert events[0].data["created"] == "2026-01-01T00:00:00+00:00"
+    assert all(s.written == 1 for s in sinks)
+    assert hass.states.get("supernotify.archive_mqtt").attributes["written"] == 1  # type: ignore
+    await archive.stop()
+
+
+async def test_pipeline_isolates_sink_failures(hass: HomeAssistant, tmp_path: Path) -> None:
+    archive = NotificationArchive(True, str(tmp_path), "7")
+    archive.initialize()
+    broken = BrokenSink(hass, flush_interval=0.01)
+    refusing = EventArchiveSink(hass)
+    refusing.submit = Mock(side_effect=RuntimeError("refused"))  # type: ignore[method-assign]
+    uut = ArchivePipeline(archive, [broken, refusing])
+    uut.start()
+
+    assert uut.archive(SummarisedDummy(2))
+    await uut.flush()
+    await uut.stop()
+
+    # files still written inline when there's no background file sink
+    assert (tmp_path / "testing_2.json").exists()
+    assert broken.failed == 1
+    assert broken.written == 0
+
+
+async def test_pipeline_skips_unavailable_sinks(hass: HomeAssistant) -> None:
+    archive = NotificationArchive(False, None, None)
+    uut = ArchivePipeline(archive, [FileArchiveSink(hass, archive), IndexArchiveSink(hass, archive)])
+    uut.start()
+    assert uut.sinks == []
+    assert not uut.archive(SummarisedDummy(3))
+
+
+async def test_mqtt_sink_coalesces_retained(hass: HomeAssistant) -> None:
+    uut = MqttArchiveSink(hass, "supernotify/archive")
+    records = [r for r in (serialise(SummarisedDummy(n)) for n in range(3)) if r is not None]
+    with patch("custom_components.supernotify.archive_sinks.mqtt.async_publish", new=AsyncMock()) as publish:
+        assert await uut.write_batch(records) == 3
+    assert [c.kwargs["retain"] for c in publish.await_args_list] == [False, False, True]
+    assert uut.publishes == 3
+    assert uut.retained == 1
+
+
+async def test_mqtt_sink_payload(hass: HomeAssistant, tmp_path: Path) -> None:
+    archive = NotificationArchive(True, str(tmp_path), "7")
+    archive.initialize()
+    minimal_sink = MqttArchiveSink(hass, "supernotify/minimal", flush_interval=0.01)
+    archived_sink = MqttArchiveSink(hass, "supernotify/archived", payload="archive", flush_interval=0.01)
+    assert minimal_sink.minimal_payload
+    assert not archived_sink.minimal_payload
+    uut = ArchivePipeline(archive, [minimal_sink, archived_sink])
+    uut.start()
+    with patch("custom_components.supernotify.archive_sinks.mqtt.async_publish", new=AsyncMock()) as publish:
+        assert uut.archive(ProfiledDummy(1))
+        await uut.flush()
+    payloads = {c.args[1]: json.loads(c.args[2]) for c in publish.await_args_list}
+    assert payloads == {
+        "supernotify/minimal": {"n": 1, "minimal": True},
+        "supernotify/archived": {"n": 1, "profile": "standard"},
+    }
+    await uut.stop()
+    # minimal contents only encoded when a sink wants them
+    record = serialise(ProfiledDummy(2))
+    assert record is not None
+    assert record.minimal is None
+    assert minimal_sink.payload(record) == record.payload
+
+
+async def test_mqtt_sink_batches_and_compresses(hass: HomeAssistant) -> None:
+    uut = MqttArchiveSink(hass, "supernotify/archive", batch=True, compress=True)
+    records = [r for r in (serialise(SummarisedDummy(n)) for n in range(3)) if r is not None]
+    with patch("custom_components.supernotify.archive_sinks.mqtt.async_publish", new=AsyncMock()) as publish:
+        assert await uut.write_batch(records) == 3
+    assert publish.await_count == 2
+    batch_call, latest_call = publish.await_args_list
+    assert batch_call.args[1] == "supernotify/archive"
+    assert not batch_call.kwargs["retain"]
+    assert [s["id"] for s in json.loads(gzip.decompress(batch_call.args[2]))] == [
+        "01J00000000000000000000000",
+        "01J00000000000000000000001",
+        "01J00000000000000000000002",
+    ]
+    assert latest_call.args[1] == "supernotify/archive/latest"
+    assert latest_call.kwargs["retain"]
+    assert json.loads(gzip.decompress(latest_call.args[2])) == {"n": 2}
+    assert uut.attributes()["publishes"] == 2
+
+
+async def test_mqtt_sink_counts_failed_publish(hass: HomeAssistant) -> None:
+    uut = MqttArchiveSink(hass, "supernotify/archive")
+    record = serialise(SummarisedDummy(1))
+    assert record is not None
+    with patch(
+        "custom_components.supernotify.archive_sinks.mqtt.async_publish", new=AsyncMock(side_effect=OSError("no broker"))
+    ):
+        assert await uut.write_batch([record]) == 0
+    assert uut.publishes == 0
+
+
+async def test_pipeline_samples_before_serialising(hass: HomeAssistant, tmp_path: Path) -> None:
+    archive = NotificationArchive(True, str(tmp_path), "7", sampling={"low": {"every": 2}})
+    archive.initialize()
+    uut = ArchivePipeline(archive, [], hass)
+    uut.start()
+    chatter = [SummarisedDummy(n) for n in range(4)]
+    for dummy in chatter:
+        dummy.priority = "low"
+    assert [uut.archive(d) for d in chatter] == [True, False, True, False]
+    await uut.flush()
+    assert [(tmp_path / f"testing_{n}.json").exists() for n in range(4)] == [True, False, True, False]
+    assert hass.states.get("supernotify.archive_sampling").state == "2"  # type: ignore
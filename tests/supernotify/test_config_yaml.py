@@ -48,7 +48,7 @@ def test_schema() -> None:
     assert PLATFORM_SCHEMA(SIMPLE_CONFIG)
 
 
-async def test_reload(hass: HomeAssistant) -> None:
+async def test_reload(hass: HomeAssistant, tmp_path: pathlib.Path) -> None:
     hass.states.async_set("alarm_control_panel.home_alarm_control", "")
 
     assert await async_setup_component(hass, NOTIFY_DOMAIN, {NOTIFY_DOMAIN: [SIMPLE_CONFIG]})
@@ -57,7 +57,10 @@ async def test_reload(hass: HomeAssistant) -> None:
 
     assert hass.services.has_service(NOTIFY_DOMAIN, DOMAIN)
 
-    with patch.object(hass_config, "YAML_CONFIG_FILE", FIXTURE):
+    # keep the archive written by the example out of the working tree
+    config_file = tmp_path / "configuration.yaml"
+    config_file.write_text(FIXTURE.read_text().replace("config/archive/supernotify", str(tmp_path / "archive")))
+    with patch.object(hass_config, "YAML_CONFIG_FILE", config_file):
         await hass.services.async_call(
             DOMAIN,
             SERVICE_RELOAD,
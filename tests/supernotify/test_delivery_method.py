@@ -1,7 +1,9 @@
 from typing import TYPE_CHECKING, Any
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 
-from homeassistant.const import CONF_ACTION, CONF_NAME, CONF_TARGET
+import pytest
+import voluptuous as vol
+from homeassistant.const import CONF_ACTION, CONF_CONDITION, CONF_NAME, CONF_OPTIONS, CONF_TARGET
 from homeassistant.core import HomeAssistant
 
 if TYPE_CHECKING:
@@ -9,14 +11,18 @@ if TYPE_CHECKING:
 from custom_components.supernotify import (
     CONF_METHOD,
     CONF_SELECTION,
+    DELIVERY_SCHEMA,
     METHOD_ALEXA,
     METHOD_ALEXA_MEDIA_PLAYER,
     METHOD_CHIME,
     METHOD_EMAIL,
     METHOD_GENERIC,
     METHOD_PERSISTENT,
+    METHOD_SCHEMA,
     METHOD_SMS,
+    PRIORITY_HIGH,
     SELECTION_BY_SCENARIO,
+    ConditionVariables,
 )
 from custom_components.supernotify.configuration import Context
 from custom_components.supernotify.methods.generic import GenericDeliveryMethod
@@ -95,3 +101,67 @@ async def test_device_discovery(hass: HomeAssistant) -> None:
     uut = GenericDeliveryMethod(hass, ctx, {}, device_domain=["unit_testing"], device_discovery=True)
     await uut.initialize()
     assert uut.default[CONF_TARGET] == [dev.id]
+
+
+async def test_identical_delivery_conditions_shared(hass: HomeAssistant) -> None:
+    cond = {"condition": "template", "value_template": "{{is_state('alarm_control_panel.home_alarm_control','armed_away')}}"}
+    delivery = {
+        "chat_1": DELIVERY_SCHEMA({CONF_METHOD: METHOD_GENERIC, CONF_ACTION: "notify.chat_1", CONF_CONDITION: cond}),
+        "chat_2": DELIVERY_SCHEMA({CONF_METHOD: METHOD_GENERIC, CONF_ACTION: "notify.chat_2", CONF_CONDITION: cond}),
+        "chat_3": DELIVERY_SCHEMA({
+            CONF_METHOD: METHOD_GENERIC,
+            CONF_ACTION: "notify.chat_3",
+            CONF_CONDITION: {"condition": "template", "value_template": "{{notification_priority == 'high'}}"},
+        }),
+    }
+    context = Context(hass, deliveries=delivery)
+    uut = GenericDeliveryMethod(hass, context, delivery)
+    context.configure_for_tests(method_instances=[uut])
+    await context.initialize()
+    assert len(context.compiled_conditions) == 2
+    assert uut.delivery_conditions["chat_1"] == uut.delivery_conditions["chat_2"]
+
+    hass.states.async_set("alarm_control_panel.home_alarm_control", "armed_away")
+    cvars = ConditionVariables([], [], [], PRIORITY_HIGH, {})
+    results: dict[str, bool] = {}
+    with patch.object(cvars, "variables", wraps=cvars.variables) as variables:
+        assert await uut.evaluate_delivery_conditions(uut.delivery_config("chat_1"), cvars, results)
+        hass.states.async_set("alarm_control_panel.home_alarm_control", "disarmed")
+        # shared condition not evaluated again for same notification
+        assert await uut.evaluate_delivery_conditions(uut.delivery_config("chat_2"), cvars, results)
+        assert await uut.evaluate_delivery_conditions(uut.delivery_config("chat_3"), cvars, results)
+        assert variables.call_count == 2
+    assert len(results) == 2
+
+    # next notification evaluates afresh
+    assert not await uut.evaluate_delivery_conditions(uut.delivery_config("chat_2"), cvars, {})
+
+
+async def test_media_profiles_validated_once(hass: HomeAssistant) -> None:
+    deliveries = {
+        "small_mail": {
+            CONF_METHOD: METHOD_GENERIC,
+            CONF_ACTION: "notify.smtp",
+            CONF_OPTIONS: {"media_profile": {"max_width": "640", "format": "jpeg"}},
+        },
+        "broken_mail": {
+            CONF_METHOD: METHOD_GENERIC,
+            CONF_ACTION: "notify.smtp",
+            CONF_OPTIONS: {"media_profile": {"quality": 500}},
+        },
+        "plain_mail": {CONF_METHOD: METHOD_GENERIC, CONF_ACTION: "notify.smtp"},
+    }
+    uut = GenericDeliveryMethod(hass, Context(), deliveries, default={CONF_OPTIONS: {"media_profile": {"max_width": 320}}})
+    await uut.initialize()
+    assert list(uut.valid_deliveries) == ["small_mail", "plain_mail"]
+    assert uut.media_profile("small_mail") == {"max_width": 640, "format": "JPEG"}
+    assert uut.media_profile("plain_mail") == {"max_width": 320}
+
+
+def test_media_profile_rejected_at_config_load() -> None:
+    with pytest.raises(vol.Invalid, match="quality"):
+        DELIVERY_SCHEMA({CONF_METHOD: METHOD_EMAIL, CONF_OPTIONS: {"media_profile": {"quality": 500}}})
+    with pytest.raises(vol.Invalid, match="format"):
+        METHOD_SCHEMA({"default": {CONF_OPTIONS: {"media_profile": {"format": "bmp"}}}})
+    validated = DELIVERY_SCHEMA({CONF_METHOD: METHOD_EMAIL, CONF_OPTIONS: {"media_profile": {"format": "png"}, "other": 1}})
+    assert validated[CONF_OPTIONS] == {"media_profile": {"format": "PNG"}, "other": 1}
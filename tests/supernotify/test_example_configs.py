@@ -10,7 +10,14 @@ from homeassistant.core import HomeAssistant
 from homeassistant.setup import async_setup_component
 from pytest_unordered import unordered
 
-from custom_components.supernotify import CONF_DELIVERY, CONF_NOTIFY, CONF_SELECTION, SELECTION_DEFAULT
+from custom_components.supernotify import (
+    CONF_ARCHIVE,
+    CONF_ARCHIVE_PATH,
+    CONF_DELIVERY,
+    CONF_NOTIFY,
+    CONF_SELECTION,
+    SELECTION_DEFAULT,
+)
 
 EXAMPLES_ROOT = "examples"
 
@@ -18,11 +25,14 @@ examples = [str(p.name) for p in Path(EXAMPLES_ROOT).iterdir()]
 
 
 @pytest.mark.parametrize("config_name", examples)
-async def test_examples(hass: HomeAssistant, config_name: str) -> None:
+async def test_examples(hass: HomeAssistant, config_name: str, tmp_path: Path) -> None:
     config_path: Path = Path(EXAMPLES_ROOT) / config_name
     config = await hass.async_add_executor_job(load_yaml_config_file, str(config_path))
 
     uut_config = config[CONF_NOTIFY][0]
+    if CONF_ARCHIVE_PATH in uut_config.get(CONF_ARCHIVE, {}):
+        # keep the archive written by the example out of the working tree
+        uut_config[CONF_ARCHIVE][CONF_ARCHIVE_PATH] = str(tmp_path / "archive")
     service_name = uut_config[CONF_NAME]
     platform = uut_config[CONF_PLATFORM]
     assert await async_setup_component(hass, DOMAIN, config)
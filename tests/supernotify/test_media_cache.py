@@ -0,0 +1,162 @@
+import asyncio
+import time
+from pathlib import Path
+from unittest.mock import AsyncMock
+
+import pytest
+
+from custom_components.supernotify.media_cache import MediaCache
+
+
+async def test_fetch_reuses_within_ttl() -> None:
+    uut = MediaCache(ttl=10)
+    capture = AsyncMock(return_value=Path("a.jpg"))
+    key = uut.key("camera.lobby", ptz_preset=1, jpeg_opts={"quality": 50})
+    assert await uut.fetch(key, capture) == Path("a.jpg")
+    assert await uut.fetch(key, capture) == Path("a.jpg")
+    assert capture.await_count == 1
+    assert await uut.fetch(uut.key("camera.lobby", ptz_preset=2, jpeg_opts={"quality": 50}), capture)
+    assert capture.await_count == 2
+    assert uut.attributes() == {
+        "ttl": 10,
+        "hits": 1,
+        "misses": 2,
+        "refreshes": 0,
+        "joined": 0,
+        "capture_waits": 0,
+        "max_camera_captures": 2,
+        "ptz_positions": {},
+        "ptz_moves": 0,
+        "ptz_skipped": 0,
+        "ptz_returns": 0,
+    }
+
+
+async def test_fetch_expires_and_refreshes() -> None:
+    uut = MediaCache(ttl=10)
+    capture = AsyncMock(return_value=Path("a.jpg"))
+    key = uut.key("http://cam/snap.jpg")
+    await uut.fetch(key, capture)
+    await uut.fetch(key, capture, fresh=True)
+    assert capture.await_count == 2
+    assert uut._entries is not None
+    uut._entries.expire(time.monotonic() + 11)
+    await uut.fetch(key, capture)
+    assert capture.await_count == 3
+
+
+async def test_fetch_does_not_cache_failures_or_when_disabled() -> None:
+    failing = MediaCache(ttl=10)
+    capture = AsyncMock(return_value=None)
+    key = failing.key("camera.lobby")
+    assert await failing.fetch(key, capture) is None
+    assert await failing.fetch(key, capture) is None
+    assert capture.await_count == 2
+
+    disabled = MediaCache(ttl=0)
+    capture = AsyncMock(return_value=Path("a.jpg"))
+    await disabled.fetch(key, capture)
+    await disabled.fetch(key, capture)
+    assert capture.await_count == 2
+
+
+async def test_concurrent_fetches_join_in_flight_capture() -> None:
+    uut = MediaCache(ttl=0)
+    release = asyncio.Event()
+
+    async def slow_capture() -> Path:
+        await release.wait()
+        return Path("a.jpg")
+
+    capture = AsyncMock(side_effect=slow_capture)
+    key = uut.key("camera.lobby")
+    waiters = [asyncio.create_task(uut.fetch(key, capture)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    assert await asyncio.gather(*waiters) == [Path("a.jpg")] * 3
+    assert capture.await_count == 1
+    assert uut.joined == 2
+
+
+async def test_failed_capture_releases_joiners() -> None:
+    uut = MediaCache()
+    release = asyncio.Event()
+
+    async def broken_capture() -> Path:
+        await release.wait()
+        raise OSError("camera offline")
+
+    key = uut.key("camera.lobby")
+    first = asyncio.create_task(uut.fetch(key, broken_capture))
+    await asyncio.sleep(0)
+    joiner = asyncio.create_task(uut.fetch(key, broken_capture))
+    await asyncio.sleep(0)
+    release.set()
+    with pytest.raises(OSError, match="camera offline"):
+        await first
+    assert await joiner is None
+    assert key not in uut._inflight
+
+
+async def test_camera_captures_limited() -> None:
+    uut = MediaCache(max_camera_captures=2)
+    active: list[str] = []
+    peak: dict[str, int] = {"all": 0, "camera.lobby": 0}
+
+    async def capture(camera: str) -> None:
+        async with uut.camera_capture(camera):
+            active.append(camera)
+            peak["all"] = max(peak["all"], len(active))
+            peak["camera.lobby"] = max(peak["camera.lobby"], active.count("camera.lobby"))
+            await asyncio.sleep(0.01)
+            active.remove(camera)
+
+    await asyncio.gather(*(capture(c) for c in ["camera.lobby", "camera.lobby", "camera.porch", "camera.yard"]))
+    assert peak == {"all": 2, "camera.lobby": 1}
+    assert uut.capture_waits >= 2
+
+
+async def test_move_ptz_skips_when_already_there() -> None:
+    uut = MediaCache()
+    move = AsyncMock(return_value=True)
+    assert await uut.move_ptz("camera.lobby", "door", move)
+    assert not await uut.move_ptz("camera.lobby", "door", move)
+    assert move.await_count == 1
+    assert uut.ptz_positions == {"camera.lobby": "door"}
+    assert uut.ptz_skipped == 1
+
+    failing = AsyncMock(return_value=False)
+    assert not await uut.move_ptz("camera.lobby", "gate", failing)
+    # position unknown, so next move not skipped
+    assert await uut.move_ptz("camera.lobby", "door", move)
+
+
+async def test_ptz_return_debounced() -> None:
+    uut = MediaCache()
+    to_door = AsyncMock(return_value=True)
+    to_home = AsyncMock(return_value=True)
+    for _ in range(3):
+        async with uut.camera_capture("camera.lobby"):
+            await uut.move_ptz("camera.lobby", "door", to_door)
+            uut.schedule_ptz_return("camera.lobby", "home", 0.05, to_home)
+    assert to_door.await_count == 1
+    to_home.assert_not_awaited()
+    await asyncio.sleep(0.1)
+    assert to_home.await_count == 1
+    assert uut.ptz_positions == {"camera.lobby": "home"}
+    assert uut.ptz_returns == 1
+
+    # no return needed when already at the default
+    uut.schedule_ptz_return("camera.lobby", "home", 0, to_home)
+    await asyncio.sleep(0.01)
+    assert to_home.await_count == 1
+
+
+async def test_ptz_return_cancelled_on_stop() -> None:
+    uut = MediaCache()
+    to_home = AsyncMock(return_value=True)
+    await uut.move_ptz("camera.lobby", "door", AsyncMock(return_value=True))
+    uut.schedule_ptz_return("camera.lobby", "home", 0.01, to_home)
+    uut.stop()
+    await asyncio.sleep(0.05)
+    to_home.assert_not_awaited()
@@ -1,24 +1,33 @@
+import asyncio
 import io
 import tempfile
-from collections.abc import Callable
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from unittest.mock import Mock
+from typing import Any
+from unittest.mock import Mock, patch
 
+import anyio
 import pytest
 from homeassistant.const import STATE_HOME
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_component import EntityComponent
 from PIL import Image, ImageChops
 from pytest_httpserver import BlockingHTTPServer
+from werkzeug import Request, Response
 
 from custom_components.supernotify import PTZ_METHOD_FRIGATE
 from custom_components.supernotify.configuration import Context
 from custom_components.supernotify.media_grab import (
+    derive_image,
     move_camera_to_ptz_preset,
+    reencode_image,
     select_avail_camera,
     snap_camera,
     snap_image,
     snapshot_from_url,
+    wait_for_file,
 )
 from tests.supernotify.doubles_lib import MockImageEntity
 
@@ -69,6 +78,119 @@ async def test_snapshot_url_with_jpeg_opts(hass: HomeAssistant, local_server: Bl
     assert retrieved_image.info.get("progressive") == 1
 
 
+@pytest.mark.enable_socket
+async def test_snapshot_url_refuses_stream(hass: HomeAssistant, local_server: BlockingHTTPServer, tmp_path: Path) -> None:
+    local_server.expect_request("/mjpeg").respond_with_data(  # type: ignore
+        b"--frame\r\n", content_type="multipart/x-mixed-replace; boundary=frame"
+    )
+    assert await snapshot_from_url(hass, local_server.url_for("/mjpeg"), "notify-uuid-1", tmp_path, None) is None
+    assert not await anyio.Path(tmp_path / "snapshot" / "notify-uuid-1.img").exists()
+
+
+@pytest.mark.enable_socket
+async def test_snapshot_url_refuses_declared_oversize(
+    hass: HomeAssistant, local_server: BlockingHTTPServer, tmp_path: Path
+) -> None:
+    local_server.expect_request("/huge").respond_with_data(b"x" * 2048, content_type="image/jpeg")  # type: ignore
+    assert await snapshot_from_url(hass, local_server.url_for("/huge"), "notify-uuid-1", tmp_path, None, max_bytes=1024) is None
+
+
+@pytest.mark.enable_socket
+async def test_snapshot_url_abandons_streamed_oversize(
+    hass: HomeAssistant, local_server: BlockingHTTPServer, tmp_path: Path
+) -> None:
+    def endless(request: Request) -> Response:
+        # chunked, so no content length to check up front
+        return Response((b"x" * 1024 for _ in range(100)), content_type="image/jpeg")
+
+    local_server.expect_request("/endless").respond_with_handler(endless)  # type: ignore
+    assert (
+        await snapshot_from_url(hass, local_server.url_for("/endless"), "notify-uuid-1", tmp_path, None, max_bytes=4096) is None
+    )
+    snapshot_dir = anyio.Path(tmp_path / "snapshot")
+    assert [p async for p in snapshot_dir.iterdir()] == []
+
+
+@pytest.mark.enable_socket
+async def test_snapshot_url_abandons_trickle(hass: HomeAssistant, local_server: BlockingHTTPServer, tmp_path: Path) -> None:
+    def trickle(request: Request) -> Response:
+        def chunks() -> Iterator[bytes]:
+            image = JPEG_PATH.read_bytes()
+            step = len(image) // 10 + 1
+            for offset in range(0, len(image), step):
+                time.sleep(0.2)
+                yield image[offset : offset + step]
+
+        # each chunk inside the read timeout, but never finishing within the total
+        return Response(chunks(), content_type="image/jpeg")
+
+    local_server.expect_request("/trickle").respond_with_handler(trickle)  # type: ignore
+    assert (
+        await snapshot_from_url(
+            hass, local_server.url_for("/trickle"), "notify-uuid-1", tmp_path, None, read_timeout=1, total_timeout=0.5
+        )
+        is None
+    )
+    assert [p async for p in anyio.Path(tmp_path / "snapshot").iterdir()] == []
+
+
+def test_derive_image_reduces_and_converts(tmp_path: Path) -> None:
+    source = tmp_path / "snap.png"
+    source.write_bytes(PNG_PATH.read_bytes())
+    derived = derive_image(source, {"max_width": 200, "max_height": 200, "format": "JPEG", "quality": 50}, "small")
+    assert derived == tmp_path / "snap_small.jpg"
+    with Image.open(derived) as image:
+        assert image.format == "JPEG"
+        assert image.mode == "RGB"
+        assert max(image.size) == 200
+        assert image.size[0] < image.size[1]
+
+
+def test_derive_image_keeps_smaller_original(tmp_path: Path) -> None:
+    source = tmp_path / "snap.jpg"
+    Image.open(JPEG_PATH).save(source, "JPEG", quality=10)
+    assert derive_image(source, {"quality": 95}, "hq") == source
+    assert not (tmp_path / "snap_hq.jpg").exists()
+    assert list(tmp_path.iterdir()) == [source]
+
+
+def test_derive_image_concurrent_same_profile(tmp_path: Path) -> None:
+    source = tmp_path / "snap.jpg"
+    source.write_bytes(JPEG_PATH.read_bytes())
+    profile = {"max_width": 100}
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        derived = list(pool.map(lambda _: derive_image(source, profile, "small"), range(8)))
+    assert set(derived) == {tmp_path / "snap_small.jpg"}
+    with Image.open(derived[0]) as image:
+        assert image.width == 100
+    # no temporary files left behind
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["snap.jpg", "snap_small.jpg"]
+
+
+def test_reencode_image_keeps_clean_image() -> None:
+    original = PNG_PATH.read_bytes()
+    assert reencode_image(original) == (original, "PNG")
+
+
+def test_reencode_image_strips_metadata() -> None:
+    buffer = io.BytesIO()
+    Image.open(JPEG_PATH).save(buffer, "JPEG", comment="cctv channel 3")
+    tagged = buffer.getvalue()
+    content, image_format = reencode_image(tagged, "JPEG")
+    assert image_format == "JPEG"
+    assert content != tagged
+    with Image.open(io.BytesIO(content)) as stripped:
+        assert "comment" not in stripped.info
+        assert stripped.size == Image.open(JPEG_PATH).size
+
+
+def test_reencode_image_applies_jpeg_opts_only_to_jpeg() -> None:
+    content, _ = reencode_image(JPEG_PATH.read_bytes(), "JPEG", jpeg_opts={"progressive": True})
+    assert Image.open(io.BytesIO(content)).info.get("progressive") == 1
+    original = PNG_PATH.read_bytes()
+    assert reencode_image(original, "PNG", jpeg_opts={"progressive": True})[0] == original
+
+
 async def test_snapshot_url_with_broken_url(hass: HomeAssistant) -> None:
     media_path: Path = Path(tempfile.mkdtemp())
     snapshot_url = "http://no-such-domain.local:9494/snapshot_image_hass"
@@ -76,14 +198,49 @@ async def test_snapshot_url_with_broken_url(hass: HomeAssistant) -> None:
     assert retrieved_image_path is None
 
 
-async def test_snap_camera(mock_hass) -> None:
-    with tempfile.TemporaryDirectory() as tmp_dir:
-        tmp_path: Path = Path(tmp_dir)
+async def test_snap_camera_file_never_appears(mock_hass, tmp_path: Path) -> None:
+    image_path = await snap_camera(mock_hass, "camera.xunit", media_path=tmp_path, max_camera_wait=0.1)
+    assert image_path is None
+    mock_hass.services.async_call.assert_awaited_once()
+    service_data = mock_hass.services.async_call.call_args.kwargs["service_data"]
+    assert service_data["entity_id"] == "camera.xunit"
+    assert not await anyio.Path(service_data["filename"]).exists()
+
+
+async def test_snap_camera_returns_once_written(mock_hass, tmp_path: Path) -> None:
+    async def snapshot(domain: str, service: str, service_data: dict[str, Any], blocking: bool = False) -> None:
+        await anyio.Path(service_data["filename"]).write_bytes(b"jpeg")
+
+    mock_hass.services.async_call.side_effect = snapshot
+    with patch("custom_components.supernotify.media_grab.asyncio.sleep") as mock_sleep:
         image_path = await snap_camera(mock_hass, "camera.xunit", media_path=tmp_path, max_camera_wait=1)
     assert image_path is not None
-    mock_hass.services.async_call.assert_awaited_once_with(
-        "camera", "snapshot", service_data={"entity_id": "camera.xunit", "filename": image_path}
-    )
+    assert await anyio.Path(image_path).exists()
+    mock_sleep.assert_not_called()
+
+
+async def test_snap_camera_times_out_hung_camera(mock_hass, tmp_path: Path) -> None:
+    async def hang(*_args: Any, **_kwargs: Any) -> None:
+        await asyncio.sleep(60)
+
+    mock_hass.services.async_call.side_effect = hang
+    assert await snap_camera(mock_hass, "camera.xunit", media_path=tmp_path, max_camera_wait=0.1) is None
+
+
+async def test_wait_for_file_backs_off(tmp_path: Path) -> None:
+    path = tmp_path / "late.jpg"
+    delays: list[float] = []
+
+    async def late_write(delay: float) -> None:
+        delays.append(delay)
+        if len(delays) == 3:
+            await anyio.Path(path).write_bytes(b"jpeg")
+
+    with patch("custom_components.supernotify.media_grab.asyncio.sleep", side_effect=late_write):
+        assert await wait_for_file(path, time.monotonic() + 10)
+    assert delays == [0.05, 0.1, 0.2]
+    with patch("custom_components.supernotify.media_grab.asyncio.sleep", side_effect=late_write):
+        assert not await wait_for_file(tmp_path / "never.jpg", time.monotonic() - 1)
 
 
 async def test_snap_image(mock_context: Context) -> None:
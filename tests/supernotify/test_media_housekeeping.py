@@ -0,0 +1,87 @@
+import os
+import time
+from pathlib import Path
+
+import anyio
+from homeassistant.core import HomeAssistant
+
+from custom_components.supernotify import CONF_MEDIA_MAX_AGE_DAYS
+from custom_components.supernotify.media_housekeeping import SECONDS_PER_DAY, MediaHousekeeper
+from custom_components.supernotify.notify import SuperNotificationAction
+
+
+def make_media(media_path: Path, subdir: str, name: str, size: int, age_days: float) -> Path:
+    directory = media_path / subdir
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / name
+    path.write_bytes(b"x" * size)
+    mtime = time.time() - age_days * SECONDS_PER_DAY
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def run_cycle(uut: MediaHousekeeper) -> int:
+    steps = 1
+    while not uut.step():
+        steps += 1
+    return steps
+
+
+def test_purges_by_age(tmp_path: Path) -> None:
+    old = make_media(tmp_path, "snapshot", "old.jpg", 10, 40)
+    new = make_media(tmp_path, "camera", "new.jpg", 10, 1)
+    unmanaged = make_media(tmp_path, "other", "old.txt", 10, 400)
+    uut = MediaHousekeeper(tmp_path, max_age_days=30)
+    assert run_cycle(uut) == 1
+    assert not old.exists()
+    assert new.exists()
+    assert unmanaged.exists()
+    assert uut.purged == 1
+    assert uut.files == 1
+    assert uut.total_bytes == 10
+
+
+def test_purges_oldest_over_size_cap(tmp_path: Path) -> None:
+    files = [make_media(tmp_path, "image", f"{n}.png", 512 * 1024, 10 - n) for n in range(5)]
+    uut = MediaHousekeeper(tmp_path, max_age_days=None, max_size_mb=1)
+    run_cycle(uut)
+    assert [f.exists() for f in files] == [False, False, False, True, True]
+    assert uut.total_bytes == 1024 * 1024
+    assert uut.purged_bytes == 3 * 512 * 1024
+
+
+def test_incremental_within_budget(tmp_path: Path) -> None:
+    files = [make_media(tmp_path, "snapshot", f"{n}.jpg", 10, 50) for n in range(4)]
+    uut = MediaHousekeeper(tmp_path, max_age_days=30, time_budget=0)
+    # one entry scanned or purged per step
+    assert run_cycle(uut) == 8
+    assert not any(f.exists() for f in files)
+    assert uut.cycles == 1
+
+
+def test_protects_archived_references(tmp_path: Path) -> None:
+    referenced = make_media(tmp_path, "snapshot", "referenced.jpg", 10, 40)
+    unreferenced = make_media(tmp_path, "snapshot", "unreferenced.jpg", 10, 40)
+    uut = MediaHousekeeper(tmp_path, max_age_days=30, protect_days=3)
+    uut.protect(referenced)
+    run_cycle(uut)
+    assert referenced.exists()
+    assert not unreferenced.exists()
+    assert uut.protected == 1
+
+    restored = MediaHousekeeper(tmp_path, max_age_days=30, protect_days=3)
+    assert restored.restore(uut.dump()) == 1
+    assert restored.restore({"expired.jpg": time.time() - 1}) == 1
+    run_cycle(restored)
+    assert referenced.exists()
+
+
+async def test_scheduled_housekeeping(hass: HomeAssistant, tmp_path: Path) -> None:
+    old = await hass.async_add_executor_job(make_media, tmp_path, "snapshot", "old.jpg", 10, 400)
+    uut = SuperNotificationAction(hass, media_path=str(tmp_path), media_options={CONF_MEDIA_MAX_AGE_DAYS: 7})
+    await uut.initialize()
+    assert uut.context.media_housekeeper is not None
+    await uut.async_media_housekeeping()
+    assert not await anyio.Path(old).exists()
+    assert hass.states.get("supernotify.media").attributes["purged"] == 1  # type: ignore
+    uut.shutdown()
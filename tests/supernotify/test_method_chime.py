@@ -226,3 +226,10 @@ async def test_deliver_to_group(mock_hass) -> None:  # type: ignore
         ],
         any_order=True,
     )
+
+
+def test_shared_device_ignores_concurrency(mock_hass) -> None:  # type: ignore
+    context = Mock()
+    uut = ChimeDeliveryMethod(mock_hass, context, {"chimes": {CONF_METHOD: METHOD_CHIME}}, concurrency=4)
+    assert not uut.parallel_safe
+    assert uut.concurrency == 1
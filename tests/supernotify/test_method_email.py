@@ -1,6 +1,9 @@
+import io
 from pathlib import Path
 
-from homeassistant.const import CONF_ACTION, CONF_DEFAULT, CONF_EMAIL, CONF_METHOD
+import anyio
+from homeassistant.const import CONF_ACTION, CONF_DEFAULT, CONF_EMAIL, CONF_METHOD, CONF_OPTIONS
+from PIL import Image
 
 from custom_components.supernotify import ATTR_DATA, ATTR_DELIVERY, CONF_PERSON, CONF_TEMPLATE, METHOD_EMAIL
 from custom_components.supernotify.configuration import Context
@@ -8,6 +11,8 @@ from custom_components.supernotify.envelope import Envelope
 from custom_components.supernotify.methods.email import EmailDeliveryMethod
 from custom_components.supernotify.notification import Notification
 
+JPEG_PATH: Path = Path("tests") / "supernotify" / "fixtures" / "media" / "example_image.jpg"
+
 
 async def test_deliver(mock_hass) -> None:  # type: ignore
     """Test on_notify_email."""
@@ -137,6 +142,44 @@ async def test_deliver_with_preformatted_html_and_image(mock_hass) -> None:  # t
     )
 
 
+async def test_deliver_with_media_profile(mock_hass, tmp_path: Path) -> None:  # type: ignore
+    context = Context(hass=mock_hass)
+    uut = EmailDeliveryMethod(
+        mock_hass,
+        context,
+        {
+            "default": {
+                CONF_METHOD: METHOD_EMAIL,
+                CONF_ACTION: "notify.smtp",
+                CONF_DEFAULT: True,
+                CONF_OPTIONS: {"media_profile": {"max_width": 120, "quality": 60}},
+            }
+        },
+    )
+    await uut.initialize()
+    context.configure_for_tests([uut])
+    await context.initialize()
+    notification = Notification(
+        context,
+        message="hello there",
+        target=["tester9@assert.com"],
+        action_data={"media": {"camera_entity_id": "camera.lobby"}},
+    )
+    await notification.initialize()
+    snapshot = anyio.Path(tmp_path) / "camera" / "snapshot.jpg"
+    await snapshot.parent.mkdir()
+    await snapshot.write_bytes(await anyio.Path(JPEG_PATH).read_bytes())
+    notification.snapshot_image_path = Path(snapshot)
+    await uut.deliver(Envelope("default", notification, targets=notification.target))
+
+    attached = anyio.Path(mock_hass.services.async_call.call_args.kwargs["service_data"]["data"]["images"][0])
+    assert attached.parent == snapshot.parent
+    assert attached != snapshot
+    assert Image.open(io.BytesIO(await attached.read_bytes())).width == 120
+    assert (await attached.stat()).st_size < (await snapshot.stat()).st_size
+    assert list(notification.media_derivatives.values()) == [Path(attached)]
+
+
 def test_good_email_addresses(mock_hass):  # type: ignore
     """Test good email addresses."""
     uut = EmailDeliveryMethod(mock_hass, Context(), {})
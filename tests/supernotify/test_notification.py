@@ -1,21 +1,35 @@
+import asyncio
 import tempfile
 from pathlib import Path
 from typing import Any
 from unittest.mock import patch
 
-from homeassistant.const import CONF_ACTION, CONF_EMAIL, CONF_METHOD, CONF_TARGET
+from homeassistant.const import CONF_ACTION, CONF_EMAIL, CONF_METHOD, CONF_TARGET, CONF_URL
 from pytest_unordered import unordered
 
 from custom_components.supernotify import (
+    ARCHIVE_PROFILE_FORENSIC,
+    ARCHIVE_PROFILE_STANDARD,
+    ARCHIVE_PROFILE_SUMMARY,
     ATTR_DATA,
+    ATTR_JPEG_OPTS,
     ATTR_MEDIA,
     ATTR_MEDIA_CAMERA_DELAY,
     ATTR_MEDIA_CAMERA_ENTITY_ID,
+    ATTR_MEDIA_CAMERA_PTZ_PRESET,
+    ATTR_MEDIA_FRESH,
     ATTR_MEDIA_SNAPSHOT_URL,
     ATTR_SCENARIOS_APPLY,
+    CONF_CAMERA,
+    CONF_CONNECT_TIMEOUT,
     CONF_DELIVERY,
     CONF_DELIVERY_SELECTION,
     CONF_MEDIA,
+    CONF_MEDIA_MAX_SNAPSHOT_MB,
+    CONF_PTZ_DELAY,
+    CONF_PTZ_PRESET_DEFAULT,
+    CONF_PTZ_RETURN_DELAY,
+    CONF_READ_TIMEOUT,
     CONF_RECIPIENTS,
     DELIVERY_SELECTION_EXPLICIT,
     DELIVERY_SELECTION_IMPLICIT,
@@ -181,6 +195,35 @@ async def test_snapshot_url(mock_context: Context) -> None:
         mock_snapshot.assert_not_called()
 
 
+async def test_snapshot_url_passes_jpeg_opts(mock_context: Context) -> None:
+    uut = Notification(
+        mock_context,
+        "testing 123",
+        action_data={CONF_MEDIA: {ATTR_MEDIA_SNAPSHOT_URL: "/my_local_image", ATTR_JPEG_OPTS: {"quality": 30}}},
+    )
+    await uut.initialize()
+    with patch("custom_components.supernotify.notification.snapshot_from_url", return_value=None) as mock_snapshot:
+        await uut.grab_image("example")
+    assert mock_snapshot.call_args.kwargs["jpeg_opts"] == {"quality": 30}
+
+
+async def test_snapshot_url_timeouts_from_camera(mock_context: Context) -> None:
+    mock_context.media_options = {CONF_READ_TIMEOUT: 20, CONF_CONNECT_TIMEOUT: 3, CONF_MEDIA_MAX_SNAPSHOT_MB: 1}
+    mock_context.cameras = {
+        "camera.porch": {CONF_CAMERA: "camera.porch", CONF_URL: "http://porch/snap.jpg", CONF_CONNECT_TIMEOUT: 1.5}
+    }
+    uut = Notification(
+        mock_context, "testing 123", action_data={CONF_MEDIA: {ATTR_MEDIA_SNAPSHOT_URL: "http://porch/snap.jpg"}}
+    )
+    await uut.initialize()
+    with patch("custom_components.supernotify.notification.snapshot_from_url", return_value=None) as mock_snapshot:
+        await uut.grab_image("example")
+    assert mock_snapshot.call_args.kwargs["connect_timeout"] == 1.5
+    assert mock_snapshot.call_args.kwargs["read_timeout"] == 20
+    assert mock_snapshot.call_args.kwargs["total_timeout"] == 30
+    assert mock_snapshot.call_args.kwargs["max_bytes"] == 1024 * 1024
+
+
 async def test_camera_entity(mock_context: Context) -> None:
     uut = Notification(mock_context, "testing 123", action_data={CONF_MEDIA: {ATTR_MEDIA_CAMERA_ENTITY_ID: "camera.lobby"}})
     await uut.initialize()
@@ -194,6 +237,71 @@ async def test_camera_entity(mock_context: Context) -> None:
         assert retrieved_image_path == original_image_path
         # notification caches image for multiple deliveries
         mock_snap_cam.assert_not_called()
+    assert uut.debug_trace.media["camera"] == "camera.lobby"
+    assert uut.debug_trace.media["capture_latency"] >= 0
+
+
+async def test_camera_ptz_moves_skipped_and_return_debounced(mock_context: Context) -> None:
+    mock_context.cameras = {
+        "camera.lobby": {
+            CONF_CAMERA: "camera.lobby",
+            CONF_PTZ_PRESET_DEFAULT: "home",
+            CONF_PTZ_DELAY: 2,
+            CONF_PTZ_RETURN_DELAY: 0.05,
+        }
+    }
+    media = {ATTR_MEDIA_CAMERA_ENTITY_ID: "camera.lobby", ATTR_MEDIA_CAMERA_PTZ_PRESET: "door", ATTR_MEDIA_FRESH: True}
+    with (
+        patch("custom_components.supernotify.notification.snap_camera", return_value=Path("lobby.jpg")),
+        patch("custom_components.supernotify.notification.move_camera_to_ptz_preset", return_value=True) as mock_move,
+        patch("custom_components.supernotify.notification.asyncio.sleep") as mock_sleep,
+    ):
+        for n in range(2):
+            uut = Notification(mock_context, f"motion {n}", action_data={CONF_MEDIA: media})
+            await uut.initialize()
+            assert await uut.grab_image("example") == Path("lobby.jpg")
+        # second snap found the camera already at the preset, so no move or settling
+        assert [c.args[2] for c in mock_move.await_args_list] == ["door"]
+        mock_sleep.assert_awaited_once_with(2)
+    await asyncio.sleep(0.1)
+    assert mock_context.media_cache.ptz_positions == {"camera.lobby": "home"}
+    assert mock_context.media_cache.ptz_returns == 1
+
+
+async def test_media_profile_derived_once(mock_context: Context, tmp_path: Path) -> None:
+    uut = Notification(mock_context, "testing 123", action_data={CONF_MEDIA: {ATTR_MEDIA_CAMERA_ENTITY_ID: "camera.lobby"}})
+    await uut.initialize()
+    uut.snapshot_image_path = tmp_path / "lobby.jpg"
+    profile = {"max_width": 320}
+    with patch(
+        "custom_components.supernotify.notification.derive_image", return_value=tmp_path / "lobby_small.jpg"
+    ) as mock_derive:
+        assert await uut.grab_image("email", profile) == tmp_path / "lobby_small.jpg"
+        assert await uut.grab_image("smtp_relay", {"max_width": 320}) == tmp_path / "lobby_small.jpg"
+        assert await uut.grab_image("chime") == tmp_path / "lobby.jpg"
+    mock_derive.assert_called_once()
+    assert list(uut.media_derivatives.values()) == [tmp_path / "lobby_small.jpg"]
+
+
+async def test_camera_snapshot_shared_across_notifications(mock_context: Context) -> None:
+    media = {ATTR_MEDIA_CAMERA_ENTITY_ID: "camera.lobby"}
+    burst = [Notification(mock_context, f"motion {n}", action_data={CONF_MEDIA: media}) for n in range(3)]
+    forced = Notification(mock_context, "motion again", action_data={CONF_MEDIA: media | {ATTR_MEDIA_FRESH: True}})
+    elsewhere = Notification(mock_context, "motion", action_data={CONF_MEDIA: {ATTR_MEDIA_CAMERA_ENTITY_ID: "camera.porch"}})
+    image_path: Path = Path(tempfile.gettempdir()) / "image_c.jpg"
+    with patch("custom_components.supernotify.notification.snap_camera", return_value=image_path) as mock_snap_cam:
+        for notification in burst:
+            await notification.initialize()
+            assert await notification.grab_image("example") == image_path
+        assert mock_snap_cam.call_count == 1
+        await forced.initialize()
+        await forced.grab_image("example")
+        assert mock_snap_cam.call_count == 2
+        await elsewhere.initialize()
+        await elsewhere.grab_image("example")
+        assert mock_snap_cam.call_count == 3
+    assert mock_context.media_cache.hits == 2
+    assert mock_context.media_cache.refreshes == 1
 
 
 async def test_merge(mock_context: Context) -> None:
@@ -217,3 +325,33 @@ async def test_merge(mock_context: Context) -> None:
         "snapshot_url": "/foo/123",
     }
     assert uut.merge(ATTR_DATA, "plain_email") == {}
+
+
+async def test_archive_profiles(mock_context: Context) -> None:
+    mock_context.deliveries = {"plain_email": {}}
+    mock_context.delivery_by_scenario = {"DEFAULT": ["plain_email"]}
+    uut = Notification(mock_context, "testing 123", target="person.bob")
+    await uut.initialize()
+    uut.delivered_envelopes.append(Envelope("plain_email", uut, targets=["bob@example.com"]))
+
+    assert uut.projection(ARCHIVE_PROFILE_SUMMARY) == uut.summary()
+    standard = uut.projection(ARCHIVE_PROFILE_STANDARD)
+    assert standard["_message"] == "testing 123"
+    assert "debug_trace" not in standard
+    assert "people_by_occupancy" not in standard
+    assert standard["delivered_envelopes"] == [
+        {
+            "delivery_name": "plain_email",
+            "targets": ["bob@example.com"],
+            "delivered": 0,
+            "errored": 0,
+            "skipped": 0,
+            "delivery_error": None,
+            "calls": 0,
+            "failedcalls": [],
+        }
+    ]
+    assert "debug_trace" in uut.projection(ARCHIVE_PROFILE_FORENSIC)
+    assert not uut.forensic
+    uut.errored = 1
+    assert uut.forensic
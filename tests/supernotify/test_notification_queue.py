@@ -0,0 +1,139 @@
+import asyncio
+from functools import partial
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.supernotify import (
+    CONF_DRAIN_TIMEOUT,
+    CONF_ENABLED,
+    CONF_METHOD,
+    CONF_OVERFLOW,
+    CONF_SIZE,
+    CONF_WORKERS,
+    OVERFLOW_DROP_NEWEST,
+    OVERFLOW_DROP_OLDEST,
+)
+from custom_components.supernotify.notification_queue import NotificationQueue
+from custom_components.supernotify.notify import SuperNotificationAction
+from tests.supernotify.doubles_lib import DummyDeliveryMethod
+
+
+async def test_disabled_queue_not_accepting(hass: HomeAssistant) -> None:
+    uut = NotificationQueue(hass)
+    uut.start()
+
+    async def job() -> None:
+        pass
+
+    assert await uut.enqueue(job) is False
+    assert await uut.drain() == 0
+
+
+async def test_workers_process_jobs(hass: HomeAssistant) -> None:
+    uut = NotificationQueue(hass, enabled=True, workers=2)
+    uut.start()
+    done: list[int] = []
+
+    async def job(i: int) -> None:
+        done.append(i)
+
+    for i in range(5):
+        assert await uut.enqueue(partial(job, i))
+    assert await uut.drain() == 0
+    assert sorted(done) == [0, 1, 2, 3, 4]
+    assert uut.processed == 5
+    assert hass.states.get("supernotify.queue_depth").state == "0"  # type: ignore
+    assert hass.states.get("supernotify.queue_depth").attributes["processed"] == 5  # type: ignore
+    assert hass.states.get("supernotify.queue_wait") is not None
+
+
+async def test_failing_job_does_not_kill_worker(hass: HomeAssistant) -> None:
+    uut = NotificationQueue(hass, enabled=True)
+    uut.start()
+    done: list[str] = []
+
+    async def bad_job() -> None:
+        raise ValueError("boom")
+
+    async def good_job() -> None:
+        done.append("ok")
+
+    await uut.enqueue(bad_job)
+    await uut.enqueue(good_job)
+    await uut.drain()
+    assert done == ["ok"]
+
+
+async def test_overflow_drop_newest(hass: HomeAssistant) -> None:
+    uut = NotificationQueue(hass, enabled=True, size=1, overflow=OVERFLOW_DROP_NEWEST)
+    release = asyncio.Event()
+    done: list[int] = []
+
+    async def job(i: int) -> None:
+        await release.wait()
+        done.append(i)
+
+    uut.start()
+    await uut.enqueue(lambda: job(0))
+    await asyncio.sleep(0)  # let worker pick up first job
+    await uut.enqueue(lambda: job(1))
+    await uut.enqueue(lambda: job(2))
+    assert uut.dropped == 1
+    release.set()
+    await uut.drain()
+    assert done == [0, 1]
+
+
+async def test_overflow_drop_oldest(hass: HomeAssistant) -> None:
+    uut = NotificationQueue(hass, enabled=True, size=1, overflow=OVERFLOW_DROP_OLDEST)
+    release = asyncio.Event()
+    done: list[int] = []
+
+    async def job(i: int) -> None:
+        await release.wait()
+        done.append(i)
+
+    uut.start()
+    await uut.enqueue(lambda: job(0))
+    await asyncio.sleep(0)
+    await uut.enqueue(lambda: job(1))
+    await uut.enqueue(lambda: job(2))
+    assert uut.dropped == 1
+    release.set()
+    await uut.drain()
+    assert done == [0, 2]
+
+
+async def test_drain_abandons_after_timeout(hass: HomeAssistant) -> None:
+    uut = NotificationQueue(hass, enabled=True, drain_timeout=0.05)
+    uut.start()
+
+    async def stuck_job() -> None:
+        await asyncio.sleep(10)
+
+    await uut.enqueue(stuck_job)
+    await uut.enqueue(stuck_job)
+    assert await uut.drain() == 1
+    assert await uut.enqueue(stuck_job) is False
+
+
+async def test_queued_send_message(hass: HomeAssistant) -> None:
+    uut = SuperNotificationAction(
+        hass,
+        deliveries={"dummy": {CONF_METHOD: "dummy"}},
+        queue={CONF_ENABLED: True, CONF_SIZE: 10, CONF_WORKERS: 1, CONF_OVERFLOW: OVERFLOW_DROP_NEWEST, CONF_DRAIN_TIMEOUT: 5},
+    )
+    dummy = DummyDeliveryMethod(hass, uut.context)
+    uut.context.configure_for_tests(method_instances=[dummy])
+    await uut.initialize()
+
+    await uut.async_send_message("testing 123", data={"delivery": ["dummy"]})
+    await uut.async_send_message("testing 456", data={"delivery": ["dummy"]})
+    await uut.queue.drain()
+    assert [e.message for e in dummy.test_calls] == ["testing 123", "testing 456"]
+    assert uut.sent == 2
+
+    # once drained, messages are processed inline
+    await uut.async_send_message("testing 789", data={"delivery": ["dummy"]})
+    assert uut.recent.last_contents()["_message"] == "testing 789"
+    assert dummy.test_calls[-1].message == "testing 789"
@@ -12,6 +12,7 @@ from custom_components.supernotify import (
     CONF_DUPE_POLICY,
     CONF_METHOD,
     CONF_OPTIONS,
+    CONF_PERSON,
     CONF_PHONE_NUMBER,
     CONF_PRIORITY,
     CONF_SELECTION,
@@ -31,10 +32,9 @@ from custom_components.supernotify import (
     SELECTION_FALLBACK,
 )
 from custom_components.supernotify.configuration import Context
-from custom_components.supernotify.envelope import Envelope
 from custom_components.supernotify.notification import Notification
 from custom_components.supernotify.notify import SuperNotificationAction
-from tests.supernotify.doubles_lib import BrokenDeliveryMethod, DummyDeliveryMethod
+from tests.supernotify.doubles_lib import BrokenDeliveryMethod, DummyDeliveryMethod, GatedDeliveryMethod
 
 DELIVERY: dict[str, dict] = {
     "email": {CONF_METHOD: METHOD_EMAIL, CONF_ACTION: "notify.smtp"},
@@ -116,10 +116,11 @@ async def test_recipient_delivery_data_override(mock_hass: HomeAssistant) -> Non
     )
 
     assert len(dummy.test_calls) == 2
-    assert dummy.test_calls == [
-        Envelope("dummy", uut.last_notification, targets=["dummy.new_home_owner", "xyz123"], data={"emoji_id": 912393}),
-        Envelope("dummy", uut.last_notification, targets=["dummy.bidey_in", "abc789"]),
+    assert [(e.delivery_name, e.targets, e.data) for e in dummy.test_calls] == [
+        ("dummy", ["dummy.new_home_owner", "xyz123"], {"emoji_id": 912393}),
+        ("dummy", ["dummy.bidey_in", "abc789"], {}),
     ]
+    assert {e.notification_id for e in dummy.test_calls} == {uut.recent.last_contents()["id"]}
 
 
 async def test_broken_delivery(mock_hass: HomeAssistant) -> None:
@@ -134,13 +135,96 @@ async def test_broken_delivery(mock_hass: HomeAssistant) -> None:
         message="testing 123",
         data={"delivery_selection": DELIVERY_SELECTION_EXPLICIT, "delivery": {"broken"}},
     )
-    notification = uut.last_notification
-    assert notification is not None
-    assert len(notification.undelivered_envelopes) == 1
-    assert isinstance(notification.undelivered_envelopes[0], Envelope)
-    assert isinstance(notification.undelivered_envelopes[0].delivery_error, list)
-    assert len(notification.undelivered_envelopes[0].delivery_error) == 4
-    assert notification.undelivered_envelopes[0].delivery_error[3] == "OSError: a self-inflicted error has occurred\n"
+    notification = uut.recent.last_contents()
+    assert len(notification["undelivered_envelopes"]) == 1
+    assert notification["undelivered_envelopes"][0]["delivery_name"] == "broken"
+    assert isinstance(notification["undelivered_envelopes"][0]["delivery_error"], list)
+    assert len(notification["undelivered_envelopes"][0]["delivery_error"]) == 4
+    assert notification["undelivered_envelopes"][0]["delivery_error"][3] == "OSError: a self-inflicted error has occurred\n"
+
+
+async def test_concurrent_delivery(mock_hass: HomeAssistant) -> None:
+    delivery_config = {
+        "gate_1": {CONF_METHOD: "gated"},
+        "gate_2": {CONF_METHOD: "gated"},
+        "backup": {CONF_METHOD: METHOD_GENERIC, CONF_SELECTION: SELECTION_FALLBACK, CONF_ACTION: "notify.backup"},
+    }
+    uut = SuperNotificationAction(
+        mock_hass, deliveries=delivery_config, method_configs=METHOD_DEFAULTS, concurrent_delivery=True
+    )
+    gated = GatedDeliveryMethod(mock_hass, uut.context, delivery_config)
+    uut.context.configure_for_tests(method_instances=[gated])
+    await uut.initialize()
+
+    await uut.async_send_message("testing 123", data={"delivery": ["gate_1", "gate_2"]})
+    notification = uut.recent.last_contents()
+    assert notification["delivered"] == 2
+    assert notification["errored"] == 0
+    assert len(notification["delivered_envelopes"]) == 2
+    # both started before either finished
+    assert gated.max_in_flight == 2
+    assert [event for event, _ in gated.events] == ["start", "start", "end", "end"]
+    mock_hass.services.async_call.assert_not_called()  # type: ignore
+
+
+async def test_serial_delivery(mock_hass: HomeAssistant) -> None:
+    delivery_config = {"gate_1": {CONF_METHOD: "gated"}, "gate_2": {CONF_METHOD: "gated"}}
+    uut = SuperNotificationAction(mock_hass, deliveries=delivery_config, method_configs=METHOD_DEFAULTS)
+    gated = GatedDeliveryMethod(mock_hass, uut.context, delivery_config, gate_size=1)
+    uut.context.configure_for_tests(method_instances=[gated])
+    await uut.initialize()
+
+    await uut.async_send_message("testing 123", data={"delivery": ["gate_1", "gate_2"]})
+    notification = uut.recent.last_contents()
+    assert notification["delivered"] == 2
+    # each delivery finished before the next started
+    assert gated.max_in_flight == 1
+    assert gated.events == [("start", "gate_1"), ("end", "gate_1"), ("start", "gate_2"), ("end", "gate_2")]
+
+
+async def test_concurrent_envelopes(mock_hass: HomeAssistant) -> None:
+    delivery_config = {"gated": {CONF_METHOD: "gated"}}
+    recipients = [
+        {CONF_PERSON: f"person.{name}", CONF_DELIVERY: {"gated": {CONF_TARGET: [name], CONF_DATA: {"who": name}}}}
+        for name in ("alice", "bob", "carol")
+    ]
+    uut = SuperNotificationAction(mock_hass, deliveries=delivery_config, recipients=recipients, method_configs=METHOD_DEFAULTS)
+    gated = GatedDeliveryMethod(mock_hass, uut.context, delivery_config, gate_size=2, concurrency=2)
+    uut.context.configure_for_tests(method_instances=[gated])
+    await uut.initialize()
+
+    await uut.async_send_message("testing 123", data={"delivery": ["gated"]})
+    notification = uut.recent.last_contents()
+    assert notification["delivered"] == 3
+    assert notification["errored"] == 0
+    assert [e["data"]["who"] for e in notification["delivered_envelopes"]] == ["alice", "bob", "carol"]
+    # bounded by concurrency, carol only starts once alice or bob is done
+    assert gated.max_in_flight == 2
+    assert gated.events[:2] == [("start", "alice"), ("start", "bob")]
+    assert gated.events[2][0] == "end"
+    assert gated.events.index(("start", "carol")) > 2
+
+
+async def test_parallel_unsafe_method_delivers_envelopes_serially(mock_hass: HomeAssistant) -> None:
+    class UnsafeGatedDeliveryMethod(GatedDeliveryMethod):
+        parallel_safe = False
+
+    delivery_config = {"gated": {CONF_METHOD: "gated"}}
+    recipients = [
+        {CONF_PERSON: f"person.{name}", CONF_DELIVERY: {"gated": {CONF_TARGET: [name], CONF_DATA: {"who": name}}}}
+        for name in ("alice", "bob")
+    ]
+    uut = SuperNotificationAction(mock_hass, deliveries=delivery_config, recipients=recipients, method_configs=METHOD_DEFAULTS)
+    gated = UnsafeGatedDeliveryMethod(mock_hass, uut.context, delivery_config, gate_size=1, concurrency=2)
+    uut.context.configure_for_tests(method_instances=[gated])
+    await uut.initialize()
+    assert gated.concurrency == 1
+
+    await uut.async_send_message("testing 123", data={"delivery": ["gated"]})
+    notification = uut.recent.last_contents()
+    assert notification["delivered"] == 2
+    assert gated.max_in_flight == 1
+    assert gated.events == [("start", "alice"), ("end", "alice"), ("start", "bob"), ("end", "bob")]
 
 
 async def test_null_delivery(mock_hass: HomeAssistant) -> None:
@@ -0,0 +1,48 @@
+from homeassistant.const import ATTR_STATE, STATE_HOME, STATE_NOT_HOME
+from homeassistant.core import HomeAssistant
+
+from custom_components.supernotify import CONF_PERSON
+from custom_components.supernotify.occupancy import OccupancyIndex
+
+
+async def test_occupancy_tracks_state_changes(hass: HomeAssistant) -> None:
+    hass.states.async_set("person.alice", STATE_HOME)
+    hass.states.async_set("person.bob", STATE_NOT_HOME)
+    people = {"person.alice": {CONF_PERSON: "person.alice"}, "person.bob": {CONF_PERSON: "person.bob"}}
+    uut = OccupancyIndex(hass)
+    uut.start(people)
+    assert uut.live
+
+    snapshot = uut.snapshot()
+    assert [p[CONF_PERSON] for p in snapshot[STATE_HOME]] == ["person.alice"]
+    assert [p[CONF_PERSON] for p in snapshot[STATE_NOT_HOME]] == ["person.bob"]
+    # shared person config untouched
+    assert ATTR_STATE not in people["person.alice"]
+
+    hass.states.async_set("person.bob", STATE_HOME)
+    await hass.async_block_till_done()
+    assert [p[CONF_PERSON] for p in uut.snapshot()[STATE_HOME]] == ["person.alice", "person.bob"]
+    # earlier snapshot unchanged
+    assert [p[CONF_PERSON] for p in snapshot[STATE_NOT_HOME]] == ["person.bob"]
+
+    uut.stop()
+    hass.states.async_set("person.alice", STATE_NOT_HOME)
+    await hass.async_block_till_done()
+    assert [p[CONF_PERSON] for p in uut.snapshot()[STATE_NOT_HOME]] == ["person.alice"]
+
+
+async def test_unknown_person_defaults_to_home(hass: HomeAssistant) -> None:
+    uut = OccupancyIndex(hass)
+    uut.start({"person.nobody": {CONF_PERSON: "person.nobody"}})
+    assert uut.snapshot()[STATE_HOME] == ({CONF_PERSON: "person.nobody", ATTR_STATE: None},)
+    hass.states.async_set("person.nobody", STATE_NOT_HOME)
+    await hass.async_block_till_done()
+    assert uut.snapshot()[STATE_HOME] == ()
+    uut.stop()
+
+
+async def test_no_hass() -> None:
+    uut = OccupancyIndex(None)
+    uut.start({"person.nobody": {CONF_PERSON: "person.nobody"}})
+    assert not uut.live
+    assert len(uut.snapshot()[STATE_HOME]) == 1
@@ -0,0 +1,69 @@
+import time
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.supernotify import (
+    CONF_ENABLED,
+    CONF_METHOD,
+    CONF_SAVE_DELAY,
+    CommandType,
+    QualifiedTargetType,
+    RecipientType,
+)
+from custom_components.supernotify.methods.mobile_push import MobilePushDeliveryMethod
+from custom_components.supernotify.notify import SuperNotificationAction
+from custom_components.supernotify.persistence import STORAGE_KEY, STORAGE_VERSION
+from tests.supernotify.doubles_lib import DummyDeliveryMethod
+
+
+async def build_service(hass: HomeAssistant, persistence: dict[str, Any] | None = None) -> SuperNotificationAction:
+    uut = SuperNotificationAction(
+        hass,
+        deliveries={"dummy": {CONF_METHOD: "dummy"}, "push": {CONF_METHOD: "mobile_push"}},
+        persistence=persistence,
+    )
+    uut.context.configure_for_tests(
+        method_instances=[DummyDeliveryMethod(hass, uut.context), MobilePushDeliveryMethod(hass, uut.context, {})]
+    )
+    await uut.initialize()
+    return uut
+
+
+async def test_state_survives_restart(hass: HomeAssistant, hass_storage: dict[str, Any]) -> None:
+    uut = await build_service(hass)
+    await uut.async_send_message("testing 123", data={"delivery": ["dummy"]})
+    uut.context.snoozer.register_snooze(
+        CommandType.SNOOZE, QualifiedTargetType.ACTION, "mobile_app_nophone", RecipientType.USER, "person.bob", 24 * 60 * 60
+    )
+    uut.context.methods["mobile_push"].action_titles["http://example.com"] = "Example"  # type: ignore
+    assert uut.persistence.saves_requested == 1
+    await uut.persistence.flush()
+    assert hass_storage[STORAGE_KEY]["version"] == STORAGE_VERSION
+
+    restarted = await build_service(hass)
+    assert restarted.sent == 1
+    assert hass.states.get("supernotify.sent").state == "1"  # type: ignore
+    assert list(restarted.context.snoozer.snoozes) == list(uut.context.snoozer.snoozes)
+    assert restarted.context.methods["mobile_push"].action_titles == {"http://example.com": "Example"}  # type: ignore
+    await restarted.async_send_message("testing 123", data={"delivery": ["dummy"]})
+    assert restarted.recent.last_contents()["globally_disabled"]
+    assert restarted.sent == 1
+
+
+async def test_expired_dupes_not_restored(hass: HomeAssistant, hass_storage: dict[str, Any]) -> None:
+    hass_storage[STORAGE_KEY] = {
+        "version": STORAGE_VERSION,
+        "key": STORAGE_KEY,
+        "data": {"dupes": [[1, "medium", "old", time.time() - 1], [2, "medium", "new", time.time() + 60]]},
+    }
+    uut = await build_service(hass)
+    assert list(uut.notification_cache) == [(2, "medium")]
+
+
+async def test_disabled_persistence(hass: HomeAssistant, hass_storage: dict[str, Any]) -> None:
+    hass_storage[STORAGE_KEY] = {"version": STORAGE_VERSION, "key": STORAGE_KEY, "data": {"sent": 99}}
+    uut = await build_service(hass, {CONF_ENABLED: False, CONF_SAVE_DELAY: 1})
+    assert uut.sent == 0
+    await uut.async_send_message("testing 123", data={"delivery": ["dummy"]})
+    assert uut.persistence.saves_requested == 0
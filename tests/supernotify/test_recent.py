@@ -0,0 +1,41 @@
+from unittest.mock import patch
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.supernotify import CONF_METHOD
+from custom_components.supernotify.notify import SuperNotificationAction
+from tests.supernotify.doubles_lib import BrokenDeliveryMethod, DummyDeliveryMethod
+
+
+async def test_recent_notifications(hass: HomeAssistant) -> None:
+    uut = SuperNotificationAction(
+        hass, deliveries={"dummy": {CONF_METHOD: "dummy"}, "broken": {CONF_METHOD: "broken"}}, recent_size=3
+    )
+    uut.context.configure_for_tests(
+        method_instances=[DummyDeliveryMethod(hass, uut.context), BrokenDeliveryMethod(hass, uut.context)]
+    )
+    await uut.initialize()
+    assert uut.recent.last_contents() == {}
+
+    for i in range(3):
+        await uut.async_send_message(f"testing {i}", data={"delivery": ["dummy"]})
+    await uut.async_send_message("critical", data={"delivery": ["dummy"], "priority": "critical"})
+    with patch("custom_components.supernotify.recent.encode_json") as encode:
+        await uut.async_send_message("broken", data={"delivery": {"broken": None}})
+    # full contents are only serialised when asked for
+    encode.assert_not_called()
+
+    assert [s["message"] for s in uut.recent.query()] == ["broken", "critical", "testing 2"]
+    assert [s["message"] for s in uut.recent.query(priority=["critical"])] == ["critical"]
+    assert [s["message"] for s in uut.recent.query(delivery="broken")] == ["broken"]
+    assert [s["message"] for s in uut.recent.query(errored=True)] == ["broken"]
+    assert [s["message"] for s in uut.recent.query(errored=False, limit=1)] == ["critical"]
+    assert uut.recent.query()[0]["errors"] == ["broken"]
+
+    last = uut.recent.last_contents()
+    assert last["_message"] == "broken"
+    assert list(last["delivery_errors"]) == ["broken"]
+    # serialised copy, not the live notification's contents
+    assert isinstance(last["created"], str)
+    assert "context" not in last
+    assert uut.recent.last_contents() is last
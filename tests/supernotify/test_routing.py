@@ -0,0 +1,65 @@
+from custom_components.supernotify import (
+    CONF_ENABLED,
+    CONF_METHOD,
+    CONF_SELECTION,
+    DELIVERY_SELECTION_EXPLICIT,
+    DELIVERY_SELECTION_FIXED,
+    DELIVERY_SELECTION_IMPLICIT,
+    SCENARIO_DEFAULT,
+    SELECTION_BY_SCENARIO,
+)
+from custom_components.supernotify.configuration import Context
+from custom_components.supernotify.routing import DeliveryRouter
+
+
+def routed_context(mock_context: Context) -> Context:
+    mock_context.deliveries = {
+        "email": {CONF_METHOD: "email"},
+        "mobile": {CONF_METHOD: "mobile_push"},
+        "chime": {CONF_METHOD: "chime", CONF_SELECTION: SELECTION_BY_SCENARIO},
+        "siren": {CONF_METHOD: "generic", CONF_SELECTION: SELECTION_BY_SCENARIO},
+    }
+    mock_context.delivery_by_scenario = {
+        SCENARIO_DEFAULT: ["email", "mobile"],
+        "alarm": ["chime", "siren"],
+        "doorbell": ["chime"],
+    }
+    return mock_context
+
+
+def test_implicit_selection(mock_context: Context) -> None:
+    uut = DeliveryRouter(routed_context(mock_context))
+    assert uut.select([], DELIVERY_SELECTION_IMPLICIT, {}).selected == ("email", "mobile")
+    routing = uut.select(["doorbell"], DELIVERY_SELECTION_IMPLICIT, {})
+    assert routing.selected == ("email", "mobile", "chime")
+    assert routing.scenario_disable_deliveries == ("siren",)
+    assert uut.select(["doorbell", "alarm"], DELIVERY_SELECTION_IMPLICIT, {}).selected == ("email", "mobile", "chime", "siren")
+
+
+def test_explicit_and_fixed_selection(mock_context: Context) -> None:
+    uut = DeliveryRouter(routed_context(mock_context))
+    assert uut.select(["alarm"], DELIVERY_SELECTION_EXPLICIT, {"email": None}).selected == ("email", "chime", "siren")
+    assert uut.select(["alarm"], DELIVERY_SELECTION_FIXED, {"email": None}).selected == ("email",)
+    # by scenario deliveries stay disabled unless a scenario enables them
+    assert uut.select([], DELIVERY_SELECTION_EXPLICIT, {"chime": None}).selected == ()
+
+
+def test_overrides(mock_context: Context) -> None:
+    uut = DeliveryRouter(routed_context(mock_context))
+    routing = uut.select([], DELIVERY_SELECTION_IMPLICIT, {"mobile": {CONF_ENABLED: False}, "nosuch": None})
+    assert routing.selected == ("email",)
+    assert routing.override_disable_deliveries == ("mobile",)
+    assert routing.override_enable_deliveries == ()
+
+
+def test_memoised_and_recompiled(mock_context: Context) -> None:
+    context = routed_context(mock_context)
+    uut = DeliveryRouter(context)
+    first = uut.select(["alarm", "doorbell"], DELIVERY_SELECTION_IMPLICIT, {})
+    assert uut.select(["doorbell", "alarm"], DELIVERY_SELECTION_IMPLICIT, {}) is first
+    assert len(uut.cache) == 1
+
+    context.delivery_by_scenario = {SCENARIO_DEFAULT: ["email"]}
+    uut.invalidate()
+    assert uut.select([], DELIVERY_SELECTION_IMPLICIT, {}).selected == ("email",)
+    assert len(uut.cache) == 1
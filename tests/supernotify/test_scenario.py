@@ -1,8 +1,11 @@
 import logging
+import time
+from unittest.mock import patch
 
 from homeassistant.const import CONF_ALIAS, CONF_CONDITION
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers import issue_registry as ir
+from homeassistant.helpers.condition import async_from_config
 from pytest_unordered import unordered
 
 from custom_components.supernotify import (
@@ -270,7 +273,8 @@ async def test_secondary_scenario(hass: HomeAssistant) -> None:
     assert not uut.default
     assert await uut.validate()
     assert not await uut.evaluate(cvars)
-    cvars.applied_scenarios.append("scenario-possible-danger")
+    # condition variables are fixed once evaluated, so a later notification gets its own
+    cvars = ConditionVariables(["scenario-no-danger", "sunny", "scenario-possible-danger"], [], [], PRIORITY_MEDIUM, {})
     assert await uut.evaluate(cvars)
 
 
@@ -287,3 +291,48 @@ async def test_trace(hass: HomeAssistant) -> None:
     assert await uut.trace(ConditionVariables(["scenario-alert"], [], [], PRIORITY_MEDIUM, {"AT_HOME": [{"name": "bob"}]}))
     assert uut.last_trace is not None
     _LOGGER.info("trace: %s", uut.last_trace.as_dict())
+
+
+async def test_condition_compiled_once(hass: HomeAssistant) -> None:
+    """Benchmark of per notification scenario evaluation, with conditions compiled at validation"""
+    scenarios = [
+        Scenario(
+            f"scenario_{i}",
+            SCENARIO_SCHEMA({
+                CONF_CONDITION: {
+                    "condition": "and",
+                    "conditions": [
+                        {"condition": "state", "entity_id": "alarm_control_panel.home_alarm_control", "state": "armed_away"},
+                        {"condition": "template", "value_template": f"{{{{notification_priority == 'p{i}'}}}}"},
+                    ],
+                }
+            }),
+            hass,
+        )
+        for i in range(40)
+    ]
+    for scenario in scenarios:
+        assert await scenario.validate()
+        assert scenario.condition_func is not None
+    cvars = ConditionVariables([], [], [], PRIORITY_MEDIUM, {})
+
+    with patch("custom_components.supernotify.scenario.condition.async_from_config", wraps=async_from_config) as compiler:
+        start = time.perf_counter()
+        for _ in range(10):
+            assert not any([await s.evaluate(cvars) for s in scenarios])
+        compiled_elapsed = time.perf_counter() - start
+        assert compiler.call_count == 0
+
+        start = time.perf_counter()
+        for _ in range(10):
+            for s in scenarios:
+                s.condition_func = None  # force the old compile per evaluation behaviour
+                await s.evaluate(cvars)
+        uncompiled_elapsed = time.perf_counter() - start
+        assert compiler.call_count >= 400
+
+    _LOGGER.info(
+        "Scenario evaluation per notification: compiled %.2fms, recompiled %.2fms",
+        compiled_elapsed * 100,
+        uncompiled_elapsed * 100,
+    )
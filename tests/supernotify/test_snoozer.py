@@ -1,3 +1,6 @@
+import time
+from unittest.mock import Mock, patch
+
 from homeassistant.core import Event
 
 from custom_components.supernotify import (
@@ -81,3 +84,72 @@ async def test_check_notification_for_snooze_qualified(mock_context: Context):
         Snooze(QualifiedTargetType.CAMERA, RecipientType.EVERYONE, "Yard"),
         Snooze(QualifiedTargetType.METHOD, RecipientType.EVERYONE, "email"),
     ]
+
+
+async def test_expired_snoozes_removed() -> None:
+    uut: Snoozer = Snoozer()
+    uut.register_snooze(CommandType.SNOOZE, GlobalTargetType.EVERYTHING, None, RecipientType.EVERYONE, None, 10)
+    uut.register_snooze(CommandType.SNOOZE, QualifiedTargetType.DELIVERY, "chime", RecipientType.USER, "person.bidey_in", 20)
+    uut.register_snooze(CommandType.SILENCE, QualifiedTargetType.CAMERA, "camera.yard", RecipientType.EVERYONE, None, None)
+    assert uut.is_global_snooze()
+    assert len(uut.snoozes) == 3
+
+    with patch("custom_components.supernotify.snoozer.time.time", return_value=time.time() + 15):
+        assert not uut.is_global_snooze()
+        assert uut.global_snoozes[GlobalTargetType.EVERYTHING] == 0
+        assert len(uut.snoozes) == 2
+    with patch("custom_components.supernotify.snoozer.time.time", return_value=time.time() + 25):
+        uut.purge_snoozes()
+        assert list(uut.snoozes.values()) == [Snooze(QualifiedTargetType.CAMERA, RecipientType.EVERYONE, "camera.yard")]
+        assert uut.by_recipient["person.bidey_in"] == {}
+
+
+async def test_resnooze_replaces_expiry() -> None:
+    uut: Snoozer = Snoozer()
+    uut.register_snooze(CommandType.SNOOZE, GlobalTargetType.EVERYTHING, None, RecipientType.EVERYONE, None, 10)
+    uut.register_snooze(CommandType.SILENCE, GlobalTargetType.EVERYTHING, None, RecipientType.EVERYONE, None, None)
+    with patch("custom_components.supernotify.snoozer.time.time", return_value=time.time() + 15):
+        # stale expiry entry for the replaced snooze is ignored
+        assert uut.is_global_snooze()
+    uut.register_snooze(CommandType.NORMAL, GlobalTargetType.EVERYTHING, None, RecipientType.EVERYONE, None, None)
+    assert not uut.is_global_snooze()
+    assert uut.global_snoozes[GlobalTargetType.EVERYTHING] == 0
+
+
+async def test_per_notification_cost_flat_with_many_snoozes(mock_context: Context) -> None:
+    """Snoozes examined per snooze check don't grow with thousands of camera snoozes, as from a busy doorbell"""
+    recipients = list(mock_context.people.values())
+
+    def snoozes_examined(uut: Snoozer) -> int:
+        with patch.object(Snoozer, "_in_scope", autospec=True, side_effect=Snoozer._in_scope) as in_scope:
+            assert not uut.is_global_snooze(PRIORITY_MEDIUM)
+            filtered = uut.filter_recipients(
+                list(recipients), PRIORITY_MEDIUM, "chime", Mock(method="chime"), ["chime"], mock_context.deliveries
+            )
+        assert filtered == [{CONF_PERSON: "person.new_home_owner"}]
+        return in_scope.call_count
+
+    uut: Snoozer = Snoozer()
+    uut.register_snooze(CommandType.SNOOZE, QualifiedTargetType.DELIVERY, "chime", RecipientType.USER, "person.bidey_in", 3600)
+    baseline = snoozes_examined(uut)
+    for i in range(5000):
+        uut.register_snooze(
+            CommandType.SNOOZE, QualifiedTargetType.CAMERA, f"camera.door_{i}", RecipientType.EVERYONE, None, 3600
+        )
+    assert baseline == 1
+    assert snoozes_examined(uut) == baseline
+
+
+def test_dump_and_restore_snoozes() -> None:
+    uut = Snoozer()
+    uut.register_snooze(CommandType.SNOOZE, QualifiedTargetType.METHOD, "email", RecipientType.EVERYONE, None, 60)
+    uut.register_snooze(CommandType.SILENCE, GlobalTargetType.NONCRITICAL, None, RecipientType.USER, "person.bob", None)
+    dumped = uut.dump()
+    dumped.append({**dumped[0], "target": "sms", "snooze_until": time.time() - 1})
+
+    restored = Snoozer()
+    assert restored.restore(dumped) == 2
+    assert [s.short_key() for s in restored.snoozes.values()] == [s.short_key() for s in uut.snoozes.values()]
+    assert restored.snoozes["METHOD_email_EVERYONE"].snooze_until == uut.snoozes["METHOD_email_EVERYONE"].snooze_until
+    assert restored.global_snoozes == uut.global_snoozes
+    assert restored.by_recipient["person.bob"]